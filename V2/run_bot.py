@@ -1,59 +1,58 @@
 import pandas as pd
-import numpy as np
-import ccxt
 import pandas_ta as ta
-from scipy.signal import find_peaks
 import os
-import time
-import requests
 import configparser
-import datetime
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services import exchange_pool
+from services.data_service import fetch_ohlcv_range
+from services.bar_aggregator import BarAggregator
+from services.alert_dispatcher import AlertDispatcher
+from services.swing_detector import SwingDetector
+from services.candle_scheduler import CandleScheduler
+
+_dispatcher = None
+_channel_id = None
+# Swing points are tracked across cycles; each cycle only feeds the H1 candles closed since the last one
+_swing_detector = SwingDetector(distance=5)
+# M15 candles kept across cycles; the H1 and H4 candles are built from them
+_bars = BarAggregator('15m', ('1h', '4h'), max_base_bars=100 * 96 + 1000)
 
 def send_telegram_notification(message):
-    print("   Attempting to send Telegram notification...")
+    """ Queues the message on one background dispatcher (config.ini is read once per run). """
+    global _dispatcher, _channel_id
+    print("   Queueing Telegram notification...")
     try:
-        config = configparser.ConfigParser()
-        config.read('config.ini')
-        bot_token = config['telegram']['bot_token']
-        channel_id = config['telegram']['channel_id']
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        payload = {'chat_id': channel_id, 'text': message, 'parse_mode': 'Markdown'}
-        response = requests.post(url, json=payload, timeout=10)
-        if response.status_code == 200:
-            print("   Telegram notification sent successfully!")
-        else:
-            print(f"   Failed to send Telegram notification. Status: {response.status_code}, Response: {response.text}")
+        if _dispatcher is None:
+            config = configparser.ConfigParser()
+            config.read('config.ini')
+            _channel_id = config['telegram']['channel_id']
+            _dispatcher = AlertDispatcher(config['telegram']['bot_token'])
+            _dispatcher.start()
+        _dispatcher.enqueue(_channel_id, message, parse_mode='Markdown')
     except Exception as e:
-        print(f"   An error occurred while sending Telegram notification: {e}")
+        print(f"   An error occurred while queueing Telegram notification: {e}")
 
 def run_bot_cycle():
     print(f"\n===== CYCLE START: {pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%d %H:%M:%S UTC')} =====")
     try:
         print("   Fetching latest data from exchange...")
-        exchange = ccxt.coinbaseadvanced()
+        # Shared client: markets and HTTP connections are reused across cycles
+        exchange = exchange_pool.get_exchange('coinbaseadvanced')
         exchange.proxies = {'http': None, 'https': None}
         symbol_input = 'BTC/USD'; ccxt_symbol = symbol_input.replace('/', '-')
 
         # --- METODE FETCHING BARU YANG CEPAT & ANDAL ---
-        # Hitung timestamp untuk 100 hari terakhir (2400 jam)
-        since_timestamp = exchange.milliseconds() - (100 * 24 * 60 * 60 * 1000) 
-        
-        # Ambil data H1 dengan "mini loop"
-        all_ohlcv_h1 = []
-        while since_timestamp < exchange.milliseconds():
-            ohlcv_chunk = exchange.fetch_ohlcv(ccxt_symbol, '1h', since=since_timestamp, limit=300)
-            if not ohlcv_chunk: break
-            all_ohlcv_h1.extend(ohlcv_chunk)
-            since_timestamp = ohlcv_chunk[-1][0] + 1
-            time.sleep(exchange.rateLimit / 1000)
-        df_h1 = pd.DataFrame(all_ohlcv_h1, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']); df_h1['timestamp'] = pd.to_datetime(df_h1['timestamp'], unit='ms'); df_h1.set_index('timestamp', inplace=True)
-        
-        agg_dict = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
-        df_h4 = df_h1.resample('4H', origin='start_day').agg(agg_dict).dropna()
-
-        # Ambil 1000 lilin M15 terakhir (ini sudah cukup dengan satu panggilan)
-        ohlcv_m15 = exchange.fetch_ohlcv(ccxt_symbol, '15m', limit=1000)
-        df_m15 = pd.DataFrame(ohlcv_m15, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']); df_m15['timestamp'] = pd.to_datetime(df_m15['timestamp'], unit='ms')
+        # 100 hari terakhir (2400 jam) H1 + 1000 lilin M15, semuanya dibangun dari lilin M15.
+        # Setelah siklus pertama hanya lilin M15 baru yang diambil (biasanya satu request).
+        since_timestamp = exchange.milliseconds() - (100 * 24 * 60 * 60 * 1000)
+        fetch_since = since_timestamp if _bars.last_timestamp is None else max(_bars.last_timestamp, since_timestamp)
+        _bars.update(fetch_ohlcv_range(exchange, ccxt_symbol, '15m', fetch_since))
+
+        df_h1 = _bars.frame('1h', since=since_timestamp)
+        df_h4 = _bars.frame('4h', since=since_timestamp)
+        df_m15 = _bars.frame('15m').iloc[-1000:].reset_index()
         
         print("   Data fetch complete.")
 
@@ -62,9 +61,9 @@ def run_bot_cycle():
         df_h4['EMA_200'] = ta.ema(df_h4['close'], length=200)
     
         df_h1['RSI_14'] = ta.rsi(df_h1['close'], length=14); df_h1['ATR_14'] = ta.atr(df_h1['high'], df_h1['low'], df_h1['close'], length=14)
-        peak_indices, _ = find_peaks(df_h1['high'], distance=5, prominence=df_h1['ATR_14'].mean()); trough_indices, _ = find_peaks(-df_h1['low'], distance=5, prominence=df_h1['ATR_14'].mean())
-        df_h1['swing_high'] = np.nan; df_h1.loc[df_h1.index[peak_indices], 'swing_high'] = df_h1['high'].iloc[peak_indices]
-        df_h1['swing_low'] = np.nan; df_h1.loc[df_h1.index[trough_indices], 'swing_low'] = df_h1['low'].iloc[trough_indices]
+        # Same swings as find_peaks(high / -low, distance=5, prominence=mean ATR) over this window
+        swing_prominence = df_h1['ATR_14'].mean(); swing_window_start = df_h1.index[0]
+        forming_h1 = _swing_detector.sync(df_h1)
     
         df_m15['EMA_9'] = ta.ema(df_m15['close'], length=9)
         df_m15['EMA_21'] = ta.ema(df_m15['close'], length=21)
@@ -90,42 +89,36 @@ def run_bot_cycle():
         is_uptrend = h4_check['close'].iloc[-1] > h4_check['EMA_55'].iloc[-1]
         h1_check = df_h1[df_h1.index < current_time]
         if not h1_check.empty:
+            swings = _swing_detector.last_swing_pair("up" if is_uptrend else "down", swing_prominence, window_start=swing_window_start,
+                                                     lookup_start=h1_check.index[0], lookup_end=current_time, provisional=forming_h1)
             if is_uptrend:
-                last_highs = h1_check[h1_check['swing_high'].notna()]; last_lows = h1_check[h1_check['swing_low'].notna()]
-                if not last_highs.empty and not last_lows.empty:
-                    last_high_idx = last_highs.index[-1]; relevant_lows = last_lows[last_lows.index < last_high_idx]
-                    if not relevant_lows.empty:
-                        last_low_idx = relevant_lows.index[-1]
-                        sh, sl = h1_check['swing_high'].loc[last_high_idx], h1_check['swing_low'].loc[last_low_idx]
-                        if sh > sl:
-                            f_0618 = sh - (sh - sl) * 0.618
-                            if h1_check['close'].iloc[-1] <= f_0618 and h1_check['RSI_14'].iloc[-1] < 45:
-                                ema_cross_up = latest_m15['close'] > latest_m15['EMA_21'] and previous_m15['close'] <= previous_m15['EMA_21']
-                                macd_state_bullish = latest_m15['MACD_12_26_9'] > latest_m15['MACDs_12_26_9']
-                                if ema_cross_up and macd_state_bullish:
-                                    entry_price = latest_m15['close']; current_atr = latest_m15['ATR_14']
-                                    stop_loss = entry_price - (2.0 * current_atr); take_profit = entry_price + (4.0 * current_atr)
-                                    message = (f"PULLBACK BUY BTC/USD\n\nEntry: ${entry_price:,.2f}\nSL: ${stop_loss:,.2f}\nTP: ${take_profit:,.2f}")
-                                    send_telegram_notification(message)
-                                    signal_found = True
+                if swings is not None:
+                    sh, sl = swings['swing_high'], swings['swing_low']
+                    if sh > sl:
+                        f_0618 = sh - (sh - sl) * 0.618
+                        if h1_check['close'].iloc[-1] <= f_0618 and h1_check['RSI_14'].iloc[-1] < 45:
+                            ema_cross_up = latest_m15['close'] > latest_m15['EMA_21'] and previous_m15['close'] <= previous_m15['EMA_21']
+                            macd_state_bullish = latest_m15['MACD_12_26_9'] > latest_m15['MACDs_12_26_9']
+                            if ema_cross_up and macd_state_bullish:
+                                entry_price = latest_m15['close']; current_atr = latest_m15['ATR_14']
+                                stop_loss = entry_price - (2.0 * current_atr); take_profit = entry_price + (4.0 * current_atr)
+                                message = (f"PULLBACK BUY BTC/USD\n\nEntry: ${entry_price:,.2f}\nSL: ${stop_loss:,.2f}\nTP: ${take_profit:,.2f}")
+                                send_telegram_notification(message)
+                                signal_found = True
             else:
-                last_highs = h1_check[h1_check['swing_high'].notna()]; last_lows = h1_check[h1_check['swing_low'].notna()]
-                if not last_highs.empty and not last_lows.empty:
-                    last_low_idx = last_lows.index[-1]; relevant_highs = last_highs[last_highs.index < last_low_idx]
-                    if not relevant_highs.empty:
-                        last_high_idx = relevant_highs.index[-1]
-                        sh, sl = h1_check['swing_high'].loc[last_high_idx], h1_check['swing_low'].loc[last_low_idx]
-                        if sh > sl:
-                            f_0618 = sl + (sh - sl) * 0.618
-                            if h1_check['close'].iloc[-1] >= f_0618 and h1_check['RSI_14'].iloc[-1] > 55:
-                                ema_cross_down = latest_m15['close'] < latest_m15['EMA_21'] and previous_m15['close'] >= previous_m15['EMA_21']
-                                macd_state_bearish = latest_m15['MACD_12_26_9'] < latest_m15['MACDs_12_26_9']
-                                if ema_cross_down and macd_state_bearish:
-                                    entry_price = latest_m15['close']; current_atr = latest_m15['ATR_14']
-                                    stop_loss = entry_price + (2.0 * current_atr); take_profit = entry_price - (4.0 * current_atr)
-                                    message = (f"PULLBACK SELL BTC/USD\n\nEntry: ${entry_price:,.2f}\nSL: ${stop_loss:,.2f}\nTP: ${take_profit:,.2f}")
-                                    send_telegram_notification(message)
-                                    signal_found = True
+                if swings is not None:
+                    sh, sl = swings['swing_high'], swings['swing_low']
+                    if sh > sl:
+                        f_0618 = sl + (sh - sl) * 0.618
+                        if h1_check['close'].iloc[-1] >= f_0618 and h1_check['RSI_14'].iloc[-1] > 55:
+                            ema_cross_down = latest_m15['close'] < latest_m15['EMA_21'] and previous_m15['close'] >= previous_m15['EMA_21']
+                            macd_state_bearish = latest_m15['MACD_12_26_9'] < latest_m15['MACDs_12_26_9']
+                            if ema_cross_down and macd_state_bearish:
+                                entry_price = latest_m15['close']; current_atr = latest_m15['ATR_14']
+                                stop_loss = entry_price + (2.0 * current_atr); take_profit = entry_price - (4.0 * current_atr)
+                                message = (f"PULLBACK SELL BTC/USD\n\nEntry: ${entry_price:,.2f}\nSL: ${stop_loss:,.2f}\nTP: ${take_profit:,.2f}")
+                                send_telegram_notification(message)
+                                signal_found = True
         
         if not signal_found:
             strong_uptrend = h4_check['close'].iloc[-1] > h4_check['EMA_55'].iloc[-1] and h4_check['EMA_55'].iloc[-1] > h4_check['EMA_200'].iloc[-1]
@@ -157,30 +150,10 @@ def run_bot_cycle():
         print(f"   An error occurred during the cycle: {e}")
 
 if __name__ == '__main__':
-    while True:
-        try:
-            run_bot_cycle()
-            now = datetime.datetime.now(datetime.timezone.utc)
-            next_run_minute = (now.minute // 15 + 1) * 15
-            
-            if next_run_minute >= 60:
-                next_run_time = now.replace(minute=0, second=1, microsecond=0) + datetime.timedelta(hours=1)
-            else:
-                next_run_time = now.replace(minute=next_run_minute, second=1, microsecond=0)
-
-            if next_run_time <= now:
-                 next_run_time += datetime.timedelta(minutes=15)
-
-            sleep_duration = (next_run_time - now).total_seconds()
-            
-            if sleep_duration > 0:
-                print(f"===== CYCLE END. Sleeping for {sleep_duration:.2f} seconds until {next_run_time.strftime('%H:%M:%S')} UTC =====")
-                time.sleep(sleep_duration)
-
-        except KeyboardInterrupt:
-            print("\nBot stopped by user.")
-            break
-        except Exception as e:
-            print(f"FATAL ERROR in main loop: {e}")
-            print("Restarting cycle in 1 minute...")
-            time.sleep(60)
\ No newline at end of file
+    # One cycle right away, then one just after every M15 close
+    scheduler = CandleScheduler()
+    scheduler.every('15m', lambda close_ms: run_bot_cycle(), name='m15_cycle', run_on_start=True)
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        print("\nBot stopped by user.")
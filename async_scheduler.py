@@ -0,0 +1,147 @@
+# async_scheduler.py - Concurrent multi-symbol version of main_scheduler.py
+#
+# Every symbol's management check, H4 bias run and H1 entry hunt runs as its own asyncio task.
+# Exchange requests share one global request budget and every task has a timeout, so a slow
+# symbol cannot hold up trade management for the others.
+
+import asyncio
+import configparser
+
+from services.async_data_service import AsyncDataService
+from services.indicator_service import IndicatorService
+from services.heuristic_service import HeuristicService
+from services.telegram_service import TelegramService
+from services.trade_manager import TradeManagerService
+from services.model_registry import get_registry
+from services.market_stream_service import MarketStreamService
+from services.state_store import get_state_store, HUNTING, WATCHING_FOR_ENTRY
+from services.trade_journal import get_trade_journal
+from services.metrics import get_metrics
+from services.clock import get_clock
+from services.candle_scheduler import CandleScheduler, DEFAULT_SETTLE_SECONDS
+from main_scheduler import process_h4_bias, process_h1_entry, start_metrics
+
+async def run_h4_bias_check_async(config, symbol: str, data_svc, telegram_svc, indicator_svc, state_store, is_startup_run: bool = False):
+    print(f"\n[{get_clock().now()}] --- Running H4 Bias Hunter ({symbol}) ---")
+    market_df_h4 = await data_svc.get_market_data(symbol=symbol, timeframe='4h', is_startup_run=is_startup_run)
+    # Indicators, inference and the Telegram call are blocking, so they run in a worker thread
+    await asyncio.to_thread(process_h4_bias, config, symbol, market_df_h4, telegram_svc, indicator_svc, state_store)
+
+async def run_h1_entry_hunt_async(config, symbol: str, data_svc, telegram_svc, heuristic_svc, state_store):
+    print(f"\n[{get_clock().now()}] --- Running H1 Entry Scout ({symbol}) ---")
+    market_df_h1 = await data_svc.get_market_data(symbol=symbol, timeframe='1h', limit=5)
+    await asyncio.to_thread(process_h1_entry, config, symbol, market_df_h1, telegram_svc, heuristic_svc, state_store)
+
+async def run_strategy_async(config, symbol: str, data_svc, telegram_svc, indicator_svc, heuristic_svc, state_store, h4_due: bool, h1_due: bool):
+    """ One symbol's strategy step, in the same order as the sync loop (H4 bias first, then the H1 hunt). """
+    if h4_due and state_store.get_state(symbol) == HUNTING:
+        # Scheduled runs are NOT startup runs
+        await run_h4_bias_check_async(config, symbol, data_svc, telegram_svc, indicator_svc, state_store, is_startup_run=False)
+    if h1_due and state_store.get_state(symbol) == WATCHING_FOR_ENTRY:
+        await run_h1_entry_hunt_async(config, symbol, data_svc, telegram_svc, heuristic_svc, state_store)
+
+async def check_open_trade_async(manager: TradeManagerService, data_svc):
+    trade = manager.get_open_trade()
+    if trade is None or manager.is_streaming(trade):
+        return
+    print(f"TradeManagerService ({manager.symbol}): Open trade detected. Checking status...")
+    latest_data = await data_svc.get_market_data(symbol=manager.symbol, timeframe='1m', limit=2)
+    await asyncio.to_thread(manager.evaluate_trade, trade, latest_data)
+
+async def run_with_timeout(name: str, coro, timeout: float):
+    try:
+        await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"AsyncScheduler: Task '{name}' timed out after {timeout:.0f}s and was cancelled.")
+    except Exception as e:
+        print(f"AsyncScheduler: Task '{name}' failed: {e}")
+
+async def main(config):
+    symbols_to_trade = [symbol.strip() for symbol in config['parameters']['symbols'].split(',')]
+    max_concurrent_requests = config.getint('parameters', 'max_concurrent_requests', fallback=5)
+    task_timeout = config.getfloat('parameters', 'task_timeout_seconds', fallback=45.0)
+
+    data_svc = AsyncDataService(max_concurrent_requests=max_concurrent_requests)
+    if not await data_svc.initialize():
+        await data_svc.close()
+        return
+
+    start_metrics(config)
+    telegram_svc = TelegramService(bot_token=config['telegram']['bot_token'], channel_id=config['telegram']['channel_id'])
+    heuristic_svc = HeuristicService()
+    indicator_svc = IndicatorService()
+    state_store = get_state_store(config.get('parameters', 'state_db', fallback='strategy_state.db'))
+    journal = get_trade_journal(config.get('parameters', 'trade_journal_db', fallback='trade_journal.db'))
+    get_registry().preload([f"models/{s.replace('/', '_').lower()}_h4.pkl" for s in symbols_to_trade])
+    market_stream = None
+    if config.getboolean('parameters', 'use_websocket', fallback=True):
+        market_stream = MarketStreamService()
+        market_stream.start()
+    trade_managers = [TradeManagerService(None, telegram_svc, journal, state_store, s, market_stream=market_stream) for s in symbols_to_trade]
+
+    # Strategy tasks run in the background; at most one per symbol at a time
+    strategy_tasks = {}
+    def start_strategy_task(symbol: str, name: str, coro):
+        running = strategy_tasks.get(symbol)
+        if running is not None and not running.done():
+            print(f"AsyncScheduler: Previous strategy task for {symbol} still running. Skipping this run.")
+            coro.close()
+            return
+        strategy_tasks[symbol] = asyncio.create_task(run_with_timeout(name, coro, task_timeout))
+
+    print("\n" + "="*50)
+    print("--- Running the first BIAS CHECK for all strategies concurrently ---")
+    print("="*50)
+    await asyncio.gather(*(
+        run_with_timeout(f"startup H4 {s}", run_h4_bias_check_async(config, s, data_svc, telegram_svc, indicator_svc, state_store, is_startup_run=True), task_timeout)
+        for s in symbols_to_trade
+    ))
+
+    # Same candle-close schedule as main_scheduler; the jobs are run here so they can be awaited
+    scheduler = CandleScheduler(settle_seconds=config.getfloat('parameters', 'candle_settle_seconds', fallback=DEFAULT_SETTLE_SECONDS))
+    scheduler.every('1m', name='management', run_on_start=True)
+    scheduler.every('4h', name='h4_bias') # Covered by the startup bias check above
+    scheduler.every('1h', name='h1_entry', run_on_start=True)
+
+    try:
+        while True:
+            due = {job.name for job, _ in scheduler.pop_due()}
+
+            # 1. HIGH-FREQUENCY MANAGEMENT (Every M1 close, all symbols at once)
+            if 'management' in due:
+                print(f"[{get_clock().now().strftime('%H:%M:%S')}] Running management cycle...")
+                await asyncio.gather(*(
+                    run_with_timeout(f"manage {m.symbol}", check_open_trade_async(m, data_svc), task_timeout)
+                    for m in trade_managers
+                ))
+
+            # 2./3. H4 bias and H1 entry hunt, as background tasks per symbol
+            h4_due, h1_due = 'h4_bias' in due, 'h1_entry' in due
+            if h4_due or h1_due:
+                for symbol in symbols_to_trade:
+                    start_strategy_task(symbol, f"strategy {symbol}", run_strategy_async(config, symbol, data_svc, telegram_svc, indicator_svc, heuristic_svc, state_store, h4_due, h1_due))
+
+            await asyncio.sleep(scheduler.seconds_until_next())
+    finally:
+        for task in strategy_tasks.values():
+            task.cancel()
+        if market_stream is not None:
+            market_stream.stop()
+        await data_svc.close()
+        state_store.close()
+        journal.close()
+        telegram_svc.close()
+        get_metrics().stop()
+
+if __name__ == '__main__':
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+
+    if 'YOUR_TELEGRAM_BOT_TOKEN_HERE' in config['telegram']['bot_token']:
+        print("FATAL ERROR: Please set your Telegram bot token in config.ini before running.")
+        exit()
+
+    try:
+        asyncio.run(main(config))
+    except (KeyboardInterrupt, SystemExit):
+        print("\nBot stopped.")
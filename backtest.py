@@ -0,0 +1,51 @@
+# backtest.py - Replays the main_scheduler strategy over historical data
+
+import argparse
+import configparser
+
+from services.data_service import DataService
+from services.ml_service import MLService
+from services.backtest_service import BacktestService
+from services.feature_cache import FeatureCache
+from services.trade_journal import TradeJournal
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backtest the H4 bias / H1 entry strategy on historical 1h candles.")
+    parser.add_argument('--start', default='2022-01-01', help="First date of history to replay (YYYY-MM-DD).")
+    parser.add_argument('--symbols', default=None, help="Comma separated symbols. Defaults to config.ini [parameters] symbols.")
+    parser.add_argument('--watch-expiry-hours', type=int, default=None, help="Abandon an unconfirmed H4 bias after this many hours (live behaviour: never).")
+    parser.add_argument('--output', default=None, help="Optional CSV path for the trade list.")
+    parser.add_argument('--journal', default=None, help="Optional trade journal database to append the trades to (e.g. trade_journal.db).")
+    parser.add_argument('--label', default=None, help="Journal source label for this run (default: backtest:<start>:<symbols>).")
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    symbols = [s.strip() for s in (args.symbols or config['parameters']['symbols']).split(',')]
+    confidence_threshold = float(config['parameters']['confidence_threshold'])
+
+    data_svc = DataService()
+    frames_h1 = {}
+    ml_services = {}
+    for symbol in symbols:
+        df_h1 = data_svc.get_all_historical_data(symbol, '1h', args.start)
+        if df_h1 is None or df_h1.empty:
+            print(f"Backtest: No history for {symbol}. Skipping.")
+            continue
+        frames_h1[symbol] = df_h1
+        ml_services[symbol] = MLService(model_path=f"models/{symbol.replace('/', '_').lower()}_h4.pkl", confidence_threshold=confidence_threshold)
+
+    result = BacktestService(watch_expiry_hours=args.watch_expiry_hours, feature_cache=FeatureCache()).run(frames_h1, ml_services)
+
+    print("\n--- Backtest Statistics ---")
+    print(result['stats'].to_string())
+    if args.output:
+        result['trades'].to_csv(args.output, index=False)
+        print(f"\nTrade list saved to '{args.output}'.")
+    if args.journal:
+        journal = TradeJournal(args.journal)
+        label = args.label or f"backtest:{args.start}:{','.join(frames_h1)}"
+        journal.record_trades(result['trades'], source=label)
+        print(f"\n--- Journal Statistics ({label}, all runs with this label) ---")
+        print(journal.stats(source=label).to_string())
+        journal.close()
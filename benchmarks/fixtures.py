@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+TIMEFRAME_MS = {'1m': 60_000, '15m': 900_000, '1h': 3_600_000, '4h': 14_400_000}
+
+def synthetic_ohlcv(n: int, timeframe: str = '1h', seed: int = 0, start: str = '2020-01-01', start_price: float = 30000.0) -> pd.DataFrame:
+    """
+    Deterministic OHLCV candles: a geometric random walk with regime-switching volatility,
+    so indicators, swings and patterns behave roughly like a real crypto market.
+    The same (n, timeframe, seed) always gives the same frame.
+    """
+    rng = np.random.default_rng(seed)
+    volatility = 0.004 * np.exp(np.cumsum(rng.normal(0, 0.02, n)).clip(-1.5, 1.5))
+    log_returns = rng.normal(0, 1, n) * volatility
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.r_[start_price, close[:-1]]
+    wick = np.abs(rng.normal(0, 1, (2, n))) * volatility * close * 0.5
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+    volume = rng.lognormal(3, 1, n)
+    index = pd.date_range(start, periods=n, freq=pd.Timedelta(milliseconds=TIMEFRAME_MS[timeframe]), name='timestamp')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+def synthetic_symbols(count: int, n: int, timeframe: str = '1h') -> dict:
+    """ `count` independent symbols (SYM0/USD, SYM1/USD, ...) of `n` candles each. """
+    return {f"SYM{i}/USD": synthetic_ohlcv(n, timeframe, seed=i + 1) for i in range(count)}
+
+class FakeExchange:
+    """
+    Stands in for the ccxt client: serves fixture candles through fetch_ohlcv, with the
+    clock set half a candle after the last 1h candle (i.e. that candle is still forming).
+    """
+    id = 'benchmark'
+
+    def __init__(self, frames: dict):
+        """ frames: timeframe -> OHLCV DataFrame (same symbol for every timeframe). """
+        self.rows = {tf: np.column_stack([df.index.asi8 // 1_000_000, df.to_numpy()]).tolist() for tf, df in frames.items()}
+        self.timestamps = {tf: np.array([row[0] for row in rows], dtype=np.int64) for tf, rows in self.rows.items()}
+        self.now = int(self.timestamps['1h'][-1]) + TIMEFRAME_MS['1h'] // 2
+        self.markets = {'BTC/USD': {}}
+        self.proxies = None
+        self.calls = 0
+
+    def milliseconds(self) -> int:
+        return self.now
+
+    def parse_timeframe(self, timeframe: str) -> int:
+        return TIMEFRAME_MS[timeframe] // 1000
+
+    def parse8601(self, text: str) -> int:
+        return int(pd.Timestamp(text).value // 1_000_000)
+
+    def iso8601(self, timestamp: int) -> str:
+        return pd.Timestamp(timestamp, unit='ms').isoformat()
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str, since: int | None = None, limit: int = 300) -> list:
+        self.calls += 1
+        rows = self.rows[timeframe]
+        if since is None:
+            return rows[-limit:]
+        start = int(np.searchsorted(self.timestamps[timeframe], since))
+        return rows[start:start + limit]
@@ -0,0 +1,360 @@
+# benchmarks/run_benchmarks.py - Timing harness for the signal pipeline
+#
+# Usage (from the repository root):
+#   python -m benchmarks.run_benchmarks
+#   python -m benchmarks.run_benchmarks --sizes 1000,100000 --symbols 20 --baseline benchmarks/results/<file>.json
+#
+# Every benchmark runs on deterministic synthetic candles (benchmarks/fixtures.py) with the
+# exchange mocked out, so numbers are comparable between runs and machines differ only in speed.
+# Results are written as JSON; with --baseline the median of every benchmark is compared.
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import FakeExchange, synthetic_ohlcv, synthetic_symbols
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(REPO_ROOT, 'models', 'btc_usd_h4.pkl')
+
+@contextlib.contextmanager
+def quiet():
+    """ The services print a lot; keep it out of the timings' output. """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def measure(fn, repeat: int, warmup: int = 1) -> dict:
+    with quiet():
+        for _ in range(warmup):
+            fn()
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - start)
+    return {
+        'runs': repeat,
+        'min_s': min(runs),
+        'median_s': float(np.median(runs)),
+        'mean_s': float(np.mean(runs)),
+    }
+
+# --- Benchmarks -------------------------------------------------------------------------------
+# Each one does its setup and returns the zero-argument callable to time.
+
+def bench_indicators_full(n: int):
+    from services.indicator_service import IndicatorService
+    with quiet():
+        indicator_svc = IndicatorService()
+    df = synthetic_ohlcv(n, '4h')
+    return lambda: indicator_svc.add_all_indicators(df.copy())
+
+def bench_indicators_streaming_prime(n: int):
+    from services.indicator_service import IndicatorService
+    df = synthetic_ohlcv(n, '4h')
+    def run():
+        IndicatorService().add_all_indicators(df, symbol='BTC/USD')
+    return run
+
+def bench_indicators_streaming_update(window: int = 1000, steps: int = 200):
+    """ One new candle on an already primed engine, with the live sliding window. """
+    from services.indicator_service import IndicatorService
+    df = synthetic_ohlcv(window + steps + 10, '4h')
+    with quiet():
+        indicator_svc = IndicatorService()
+        indicator_svc.add_all_indicators(df.iloc[:window], symbol='BTC/USD')
+    offsets = iter(range(1, steps + 10))
+    def run():
+        i = next(offsets)
+        indicator_svc.add_all_indicators(df.iloc[i:i + window], symbol='BTC/USD')
+    return run
+
+def bench_indicators_many_symbols(count: int, n: int = 1000):
+    from services.indicator_service import IndicatorService
+    with quiet():
+        indicator_svc = IndicatorService()
+    frames = synthetic_symbols(count, n, '4h')
+    def run():
+        for df in frames.values():
+            indicator_svc.add_all_indicators(df.copy())
+    return run
+
+def bench_indicators_batch(count: int, n: int = 1000):
+    from services.indicator_service import IndicatorService
+    with quiet():
+        indicator_svc = IndicatorService()
+    frames = synthetic_symbols(count, n, '4h')
+    return lambda: indicator_svc.add_all_indicators_batch(frames)
+
+def bench_resample_4h(n: int):
+    from services.bar_aggregator import resample_ohlcv
+    df_1h = synthetic_ohlcv(n, '1h')
+    return lambda: resample_ohlcv(df_1h, '4h')
+
+def _labeling_frame(n: int) -> pd.DataFrame:
+    df = synthetic_ohlcv(n, '4h')
+    df['ATRr_14'] = (df['high'] - df['low']).rolling(14).mean()
+    return df
+
+def bench_labeling(n: int):
+    """ Triple-barrier labels (TP 3 ATR, SL 1.5 ATR, 30 candles) over the whole frame. """
+    from services.labeling import define_target
+    df = _labeling_frame(n)
+    return lambda: define_target(df)
+
+def bench_bar_aggregator_update(window: int = 9600, steps: int = 200):
+    """ Incremental 1h/4h bars: one new 15m candle (plus the re-sent forming one) per step on a warm aggregator. """
+    from services.bar_aggregator import BarAggregator, frame_rows
+    rows = frame_rows(synthetic_ohlcv(window + steps, '15m'))
+    def run():
+        aggregator = BarAggregator('15m', ('1h', '4h'))
+        aggregator.update(rows[:window])
+        for end in range(window + 1, window + steps + 1):
+            aggregator.update(rows[end - 2:end])
+    return run
+
+def _unthrottled(exchange_id: str):
+    from services import exchange_pool
+    limiter = exchange_pool.get_rate_limiter(exchange_id)
+    limiter.rate = limiter.capacity = limiter.tokens = 1e12
+
+def bench_data_service_4h():
+    """ DataService.get_market_data('4h') on a warm candle store: sync the tail, load, resample. """
+    from services.candle_store import CandleStore
+    from services import data_service, exchange_pool
+    # DataService asks for the last 1000 hours of wall-clock time, so the fixture ends now
+    start = pd.Timestamp.now(tz='UTC').floor('h').tz_localize(None) - pd.Timedelta(hours=1199)
+    fake = FakeExchange({'1h': synthetic_ohlcv(1200, '1h', start=str(start))})
+    _unthrottled(fake.id)
+    with mock.patch.object(exchange_pool, 'get_exchange', return_value=fake), quiet():
+        svc = data_service.DataService(candle_store=CandleStore(tempfile.mkdtemp(prefix='bench_candles_')))
+        svc.get_market_data('BTC/USD', '4h') # Fills the store
+    return lambda: svc.get_market_data('BTC/USD', '4h')
+
+def _feature_frames(count: int, rows: int = 300) -> tuple:
+    from services.model_registry import get_registry
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(MODEL_PATH)
+    with quiet():
+        _, feature_names = get_registry().get(MODEL_PATH)
+    rng = np.random.default_rng(0)
+    frames = {f"SYM{i}/USD": pd.DataFrame(rng.normal(size=(rows, len(feature_names))), columns=feature_names) for i in range(count)}
+    return frames, feature_names
+
+def bench_ml_prediction():
+    from services.ml_service import MLService
+    frames, _ = _feature_frames(1)
+    features = next(iter(frames.values()))
+    with quiet():
+        ml_svc = MLService(MODEL_PATH, confidence_threshold=0.55)
+    return lambda: ml_svc.get_prediction(features)
+
+def bench_ml_predict_all(rows: int):
+    from services.ml_service import MLService
+    frames, _ = _feature_frames(1, rows)
+    features = next(iter(frames.values()))
+    with quiet():
+        ml_svc = MLService(MODEL_PATH, confidence_threshold=0.55)
+    return lambda: ml_svc.predict_all(features)
+
+def bench_ml_batch(count: int):
+    from services.ml_service import MLService
+    frames, _ = _feature_frames(count)
+    model_paths = {symbol: MODEL_PATH for symbol in frames}
+    return lambda: MLService.get_predictions_batch(frames, model_paths, 0.55)
+
+def _heuristic_frame(n: int) -> pd.DataFrame:
+    df = synthetic_ohlcv(n, '1h')
+    df['EMA_21'] = df['close'].ewm(span=21, adjust=False).mean()
+    df['ATRr_14'] = (df['high'] - df['low']).ewm(alpha=1 / 14).mean()
+    return df
+
+def bench_generate_h4_bias():
+    from services.heuristic_service import HeuristicService
+    with quiet():
+        heuristic_svc = HeuristicService()
+    df = _heuristic_frame(500)
+    return lambda: (heuristic_svc.generate_h4_bias(1, df), heuristic_svc.generate_h4_bias(-1, df))
+
+def bench_confirm_h1_entry():
+    from services.heuristic_service import HeuristicService
+    with quiet():
+        heuristic_svc = HeuristicService()
+    df = _heuristic_frame(5)
+    return lambda: (heuristic_svc.confirm_h1_entry(df, 'BUY'), heuristic_svc.confirm_h1_entry(df, 'SELL'))
+
+def bench_heuristic_series(n: int):
+    """ The whole-series API: entry masks and bias levels for every candle. """
+    from services.heuristic_service import HeuristicService
+    with quiet():
+        heuristic_svc = HeuristicService()
+    df = _heuristic_frame(n)
+    predictions = np.random.default_rng(0).choice([-1, 0, 1], size=n)
+    return lambda: (heuristic_svc.confirm_h1_entries(df, 'BUY'), heuristic_svc.generate_h4_biases(predictions, df))
+
+def bench_swing_lookup(window: int = 2400, steps: int = 50):
+    """ V2's per-cycle swing work: sync one new H1 candle into the detector and look up the last swing pair. """
+    from services.swing_detector import SwingDetector
+    df = synthetic_ohlcv(window + steps + 1, '1h')
+    prominence = float((df['high'] - df['low']).mean())
+    detector = SwingDetector()
+    with quiet():
+        detector.sync(df.iloc[:window + 1])
+    def run():
+        for end in range(window + 2, window + steps + 2):
+            frame = df.iloc[end - window - 1:end]
+            forming = detector.sync(frame)
+            detector.last_swing_pair("up", prominence, window_start=frame.index[0], provisional=forming)
+    return run
+
+def bench_v2_run_bot_cycle():
+    """ V2's whole cycle with the exchange and Telegram mocked, i.e. only the compute section is real. """
+    from services.bar_aggregator import resample_ohlcv
+    df_15m = synthetic_ohlcv((100 * 24 + 50) * 4, '15m', start='2024-01-01')
+    fake = FakeExchange({'1h': resample_ohlcv(df_15m, '1h'), '15m': df_15m})
+    _unthrottled(fake.id)
+
+    spec = importlib.util.spec_from_file_location('v2_run_bot', os.path.join(REPO_ROOT, 'V2', 'run_bot.py'))
+    run_bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(run_bot) # Raises ImportError when pandas_ta is missing
+    def run():
+        with mock.patch.object(run_bot.exchange_pool, 'get_exchange', return_value=fake), \
+             mock.patch.object(run_bot, 'send_telegram_notification'):
+            run_bot.run_bot_cycle()
+    return run
+
+def bench_metrics_timer(enabled: bool, calls: int = 10_000):
+    """ Cost of the per-stage instrumentation: `calls` timed blocks plus counter increments. """
+    from services.metrics import Metrics
+    metrics = Metrics()
+    if enabled:
+        metrics.start(port=None, json_log_path=None)
+    def run():
+        for _ in range(calls):
+            with metrics.timer('indicator_seconds', mode='full'):
+                metrics.incr('fetch_pages_total', timeframe='1h')
+    return run
+
+def plan(sizes: list, symbols: int) -> list:
+    """ (name, params, factory, repeat scale) for every benchmark in this run. """
+    benchmarks = []
+    for n in sizes:
+        benchmarks.append(('indicators_full', {'candles': n}, lambda n=n: bench_indicators_full(n), n))
+        benchmarks.append(('resample_1h_to_4h', {'candles': n}, lambda n=n: bench_resample_4h(n), n))
+        benchmarks.append(('heuristic_series', {'candles': n}, lambda n=n: bench_heuristic_series(n), n))
+        benchmarks.append(('labeling', {'candles': n}, lambda n=n: bench_labeling(n), n))
+        if n <= 100_000: # Pure-Python per-candle loop; 1M candles takes minutes
+            benchmarks.append(('indicators_streaming_prime', {'candles': n}, lambda n=n: bench_indicators_streaming_prime(n), n))
+    benchmarks += [
+        ('indicators_streaming_update', {'window': 1000}, bench_indicators_streaming_update, 1),
+        ('indicators_many_symbols', {'symbols': symbols, 'candles': 1000}, lambda: bench_indicators_many_symbols(symbols), symbols * 1000),
+        ('indicators_batch', {'symbols': symbols, 'candles': 1000}, lambda: bench_indicators_batch(symbols), symbols * 1000),
+        ('data_service_get_market_data_4h', {'candles_1h': 1000}, bench_data_service_4h, 1),
+        ('ml_get_prediction', {}, bench_ml_prediction, 1),
+        ('ml_get_predictions_batch', {'symbols': symbols}, lambda: bench_ml_batch(symbols), 1),
+        ('ml_predict_all', {'rows': 10_000}, lambda: bench_ml_predict_all(10_000), 10_000),
+        ('heuristic_generate_h4_bias', {}, bench_generate_h4_bias, 1),
+        ('heuristic_confirm_h1_entry', {}, bench_confirm_h1_entry, 1),
+        ('bar_aggregator_update', {'window': 9600, 'steps': 200}, bench_bar_aggregator_update, 200),
+        ('swing_lookup', {'window': 2400, 'steps': 50}, bench_swing_lookup, 50),
+        ('v2_run_bot_cycle', {'candles_15m': 9800}, bench_v2_run_bot_cycle, 1),
+        ('metrics_disabled', {'calls': 10_000}, lambda: bench_metrics_timer(False), 10_000),
+        ('metrics_enabled', {'calls': 10_000}, lambda: bench_metrics_timer(True), 10_000),
+    ]
+    return benchmarks
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def run_all(sizes: list, symbols: int, repeat: int, only: list | None = None) -> dict:
+    results = []
+    for name, params, factory, size in plan(sizes, symbols):
+        if only and name not in only:
+            continue
+        label = f"{name} {params}" if params else name
+        entry = {'name': name, 'params': params}
+        try:
+            fn = factory()
+            # Big inputs are timed once, without a warm-up call
+            runs, warmup = (repeat, 1) if size < 1_000_000 else (1, 0)
+            entry.update(measure(fn, runs, warmup), status='ok')
+            print(f"{label:<70} median {entry['median_s'] * 1000:>12.3f} ms  ({runs} runs)")
+        except (ImportError, FileNotFoundError) as e:
+            entry.update(status='skipped', reason=str(e))
+            print(f"{label:<70} skipped: {e}")
+        except Exception as e:
+            entry.update(status='error', reason=f"{type(e).__name__}: {e}")
+            print(f"{label:<70} error: {type(e).__name__}: {e}")
+        results.append(entry)
+
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sizes': sizes,
+            'symbols': symbols,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+def result_key(entry: dict) -> str:
+    return f"{entry['name']} {json.dumps(entry['params'], sort_keys=True)}"
+
+def compare(report: dict, baseline: dict):
+    """ Prints current vs baseline medians; ratio > 1 means slower than the baseline. """
+    previous = {result_key(e): e for e in baseline['results'] if e.get('status') == 'ok'}
+    print(f"\nComparison with baseline {baseline['meta'].get('git_revision')} ({baseline['meta'].get('created_at')}):")
+    for entry in report['results']:
+        old = previous.get(result_key(entry))
+        if entry.get('status') != 'ok' or old is None:
+            continue
+        ratio = entry['median_s'] / old['median_s'] if old['median_s'] else float('inf')
+        print(f"{result_key(entry):<80} {old['median_s'] * 1000:>10.3f} ms -> {entry['median_s'] * 1000:>10.3f} ms  x{ratio:.2f}")
+        entry['baseline_median_s'] = old['median_s']
+        entry['ratio_to_baseline'] = ratio
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the signal pipeline on synthetic OHLCV.")
+    parser.add_argument('--sizes', default='1000,100000,1000000', help="Comma-separated candle counts.")
+    parser.add_argument('--symbols', type=int, default=50, help="Symbol count for the many-symbol benchmarks.")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark (inputs of 1M+ candles run once).")
+    parser.add_argument('--only', default=None, help="Comma-separated benchmark names to run.")
+    parser.add_argument('--output', default=None, help="Results file (default: benchmarks/results/<UTC timestamp>.json).")
+    parser.add_argument('--baseline', default=None, help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    only = [name.strip() for name in args.only.split(',')] if args.only else None
+    report = run_all(sizes, args.symbols, args.repeat, only)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+    output = args.output or os.path.join(REPO_ROOT, 'benchmarks', 'results', f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,10 @@
 # main_scheduler.py (The FINAL MTF "General and Scout" Version)
 
-import configparser
-import json
-from datetime import datetime
 import time
-import pytz
+STARTED_AT = time.perf_counter() # Start-up timing includes the imports below
+
+import configparser
+from concurrent.futures import ThreadPoolExecutor
 
 # Import all services
 from services.data_service import DataService
@@ -12,27 +12,74 @@ from services.indicator_service import IndicatorService
 from services.ml_service import MLService
 from services.heuristic_service import HeuristicService
 from services.telegram_service import TelegramService
-from services.trade_logger import TradeLogger
+from services.trade_journal import get_trade_journal
 from services.trade_manager import TradeManagerService
-
-def run_h4_bias_check(config, symbol: str, data_svc, telegram_svc, is_startup_run: bool = False):
+from services.model_registry import get_registry
+from services.market_stream_service import MarketStreamService
+from services.state_store import get_state_store, HUNTING, WATCHING_FOR_ENTRY, IN_TRADE
+from services.bar_aggregator import TIMEFRAME_MS
+from services.metrics import get_metrics
+from services.clock import get_clock
+from services.candle_scheduler import CandleScheduler, DEFAULT_SETTLE_SECONDS
+
+def record_signal_delay(signal: str, symbol: str, candles, timeframe: str):
+    """ Observes the time from the close of the last candle in `candles` to now. """
+    delay = get_clock().time() - (candles.index[-1].value // 1_000_000 + TIMEFRAME_MS[timeframe]) / 1000
+    if delay >= 0: # Startup runs are based on a candle that is still forming
+        get_metrics().observe('signal_delay_seconds', delay, signal=signal, symbol=symbol)
+
+def start_metrics(config):
+    """ Turns on the metrics endpoint and JSON log when [parameters] metrics_enabled is set. """
+    if config.getboolean('parameters', 'metrics_enabled', fallback=False):
+        get_metrics().start(port=config.getint('parameters', 'metrics_port', fallback=9108),
+                            json_log_path=config.get('parameters', 'metrics_json_log', fallback='metrics.jsonl') or None)
+
+def warm_up_in_background(config, symbols: list, data_svc, telegram_svc, indicator_svc, state_store, workers: int) -> dict:
+    """
+    Fast start: loads the models and runs the startup bias checks on worker threads while the
+    main loop is already managing open trades. Returns symbol -> Future of its startup bias check.
+    """
+    def logged(name: str, fn, *args, **kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            print(f"MainScheduler: Background '{name}' failed: {e}")
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Warmup")
+    # Models load while the candle downloads are in flight
+    for symbol in symbols:
+        executor.submit(logged, f"load model {symbol}", get_registry().preload, [f"models/{symbol.replace('/', '_').lower()}_h4.pkl"])
+    checks = {
+        symbol: executor.submit(logged, f"startup H4 {symbol}", run_h4_bias_check, config, symbol, data_svc, telegram_svc,
+                                is_startup_run=True, indicator_svc=indicator_svc, state_store=state_store)
+        for symbol in symbols
+    }
+    executor.shutdown(wait=False)
+    return checks
+
+def run_h4_bias_check(config, symbol: str, data_svc, telegram_svc, is_startup_run: bool = False, indicator_svc=None, state_store=None):
     """ The "General": Runs every 4 hours to establish a new strategic bias. """
     strategy_name = f"H4 Bias Hunter ({symbol})"
-    print(f"\n[{datetime.now()}] --- Running {strategy_name} ---")
+    print(f"\n[{get_clock().now()}] --- Running {strategy_name} ---")
     
-    status_file = f"{symbol.replace('/', '_').lower()}_status.json"
+    market_df_h4 = data_svc.get_market_data(symbol=symbol, timeframe='4h', is_startup_run=is_startup_run)
+    process_h4_bias(config, symbol, market_df_h4, telegram_svc, indicator_svc, state_store)
+
+def process_h4_bias(config, symbol: str, market_df_h4, telegram_svc, indicator_svc=None, state_store=None):
+    """ Turns an already fetched H4 frame into a bias. Shared by the sync and async schedulers. """
+    strategy_name = f"H4 Bias Hunter ({symbol})"
+    if market_df_h4 is None or market_df_h4.empty: return
+
     model_file = f"models/{symbol.replace('/', '_').lower()}_h4.pkl"
     confidence_threshold = float(config['parameters']['confidence_threshold'])
 
     # Initialize services for this task
-    indicator_svc = IndicatorService()
+    indicator_svc = indicator_svc or IndicatorService()
+    state_store = state_store or get_state_store()
     ml_svc = MLService(model_path=model_file, confidence_threshold=confidence_threshold)
     heuristic_svc = HeuristicService()
-    
-    market_df_h4 = data_svc.get_market_data(symbol=symbol, timeframe='4h', is_startup_run=is_startup_run)
-    if market_df_h4 is None or market_df_h4.empty: return
 
-    analysis_df_h4 = indicator_svc.add_all_indicators(market_df_h4)
+    analysis_df_h4 = indicator_svc.add_all_indicators(market_df_h4, symbol=symbol)
     if analysis_df_h4 is None or analysis_df_h4.empty: return
 
     prediction = ml_svc.get_prediction(analysis_df_h4)
@@ -40,28 +87,36 @@ def run_h4_bias_check(config, symbol: str, data_svc, telegram_svc, is_startup_ru
 
     if result['status'] == 'success':
         bias_details = result['bias_details']
+        if state_store.get_state(symbol) == IN_TRADE:
+            print(f"{strategy_name}: Found a new {bias_details['bias']} bias, but a trade is still open. Keeping state IN_TRADE.")
+            return
         print(f"{strategy_name}: Found a new {bias_details['bias']} bias. Updating state to WATCHING.")
+        bias_details['signal_time'] = get_clock().now().isoformat() # Journaled with the trade this bias leads to
         
-        # Update the state file to reflect the new hunt
-        new_status = {"state": "WATCHING_FOR_ENTRY", "bias_details": bias_details}
-        with open(status_file, 'w') as f:
-            json.dump(new_status, f, indent=2)
+        # Record the new hunt
+        state_store.transition(symbol, WATCHING_FOR_ENTRY, bias_details=bias_details)
         
         telegram_svc.send_bias_alert(bias_details, symbol)
+        record_signal_delay('h4_bias', symbol, market_df_h4, '4h')
 
-def run_h1_entry_hunt(config, symbol: str, data_svc, telegram_svc, heuristic_svc):
+def run_h1_entry_hunt(config, symbol: str, data_svc, telegram_svc, heuristic_svc, state_store=None, journal=None):
     """ The "Scout": Runs every hour to check for a precise entry confirmation. """
     strategy_name = f"H1 Entry Scout ({symbol})"
-    print(f"\n[{datetime.now()}] --- Running {strategy_name} ---")
+    print(f"\n[{get_clock().now()}] --- Running {strategy_name} ---")
 
-    status_file = f"{symbol.replace('/', '_').lower()}_status.json"
-    log_file = f"{symbol.replace('/', '_').lower()}_log.csv"
-    
     market_df_h1 = data_svc.get_market_data(symbol=symbol, timeframe='1h', limit=5) # Get a few recent H1 candles
+    process_h1_entry(config, symbol, market_df_h1, telegram_svc, heuristic_svc, state_store, journal)
+
+def process_h1_entry(config, symbol: str, market_df_h1, telegram_svc, heuristic_svc, state_store=None, journal=None):
+    """ Checks an already fetched H1 frame for entry confirmation. Shared by the sync and async schedulers. """
+    strategy_name = f"H1 Entry Scout ({symbol})"
     if market_df_h1 is None or market_df_h1.empty: return
+
+    state_store = state_store or get_state_store()
+    journal = journal or get_trade_journal()
     
-    with open(status_file, 'r') as f:
-        status = json.load(f)
+    status = state_store.get(symbol)
+    if status['state'] != WATCHING_FOR_ENTRY: return
     
     bias_details = status['bias_details']
     
@@ -75,15 +130,116 @@ def run_h1_entry_hunt(config, symbol: str, data_svc, telegram_svc, heuristic_svc
             final_trade_details['entry'] = market_df_h1.iloc[-1]['close']
 
             telegram_svc.send_execution_alert(final_trade_details, symbol)
-            trade_logger = TradeLogger(log_file)
-            trade_logger.log_new_signal(symbol, final_trade_details)
+            record_signal_delay('h1_entry', symbol, market_df_h1, '1h')
+            # The id travels with the trade so the trade manager can journal its exit
+            final_trade_details['journal_id'] = journal.record_entry(symbol, final_trade_details, signal_time=bias_details.get('signal_time'))
             
             # Update state to IN_TRADE
-            new_status = {"state": "IN_TRADE", "trade_details": final_trade_details}
-            with open(status_file, 'w') as f:
-                json.dump(new_status, f, indent=2)
+            state_store.transition(symbol, IN_TRADE, bias_details=bias_details, trade_details=final_trade_details)
+
+def run(config, data_svc=None, telegram_svc=None, state_store=None, journal=None, until=None):
+    """
+    Builds the services and runs the candle-close schedule on the process clock (services.clock) until
+    `until` (a UTC datetime; None = forever) or Ctrl+C. Services can be passed in, e.g. by replay.py.
+    """
+    clock = get_clock()
+    symbols_to_trade = [symbol.strip() for symbol in config['parameters']['symbols'].split(',')]
+    start_metrics(config)
+    # Fast start: trade management begins immediately; the exchange client, models and startup bias checks warm up in the background
+    fast_start = config.getboolean('parameters', 'fast_start', fallback=True)
+    
+    # Initialize services that are used in the main loop
+    data_svc = data_svc or DataService(lazy=fast_start)
+    telegram_svc = telegram_svc or TelegramService(bot_token=config['telegram']['bot_token'], channel_id=config['telegram']['channel_id'])
+    heuristic_svc = HeuristicService() # The Scout
+    indicator_svc = IndicatorService() # Keeps per-symbol streaming indicator state between runs
+    state_store = state_store or get_state_store(config.get('parameters', 'state_db', fallback='strategy_state.db')) # Restores every symbol's state
+    journal = journal or get_trade_journal(config.get('parameters', 'trade_journal_db', fallback='trade_journal.db'))
 
-# In main_scheduler.py -- The FINAL main execution block
+    # Open trades are checked on every WebSocket tick; the minute REST poll remains the fallback
+    market_stream = None
+    if config.getboolean('parameters', 'use_websocket', fallback=True):
+        market_stream = MarketStreamService()
+        market_stream.start()
+
+    trade_managers = [TradeManagerService(data_svc, telegram_svc, journal, state_store, s, market_stream=market_stream) for s in symbols_to_trade]
+    
+    startup_checks = {} # symbol -> Future of its background startup bias check (fast start only)
+    if fast_start:
+        workers = config.getint('parameters', 'startup_workers', fallback=min(8, len(symbols_to_trade) + 1))
+        startup_checks = warm_up_in_background(config, symbols_to_trade, data_svc, telegram_svc, indicator_svc, state_store, workers)
+        print(f"--- Startup bias checks for {len(symbols_to_trade)} strategies running in the background. Starting patrol. ---")
+    else:
+        # Load every model once up front; MLService reuses them from the registry
+        get_registry().preload([f"models/{s.replace('/', '_').lower()}_h4.pkl" for s in symbols_to_trade])
+
+        # --- IMMEDIATE FIRST RUN ON STARTUP ---
+        print("\n" + "="*50)
+        print("--- Running the first manual BIAS CHECK for all strategies on startup ---")
+        print("="*50)
+        
+        for symbol in symbols_to_trade:
+            # We will re-use the H4 bias check function, but tell it this is a startup run
+            run_h4_bias_check(config, symbol, data_svc, telegram_svc, is_startup_run=True, indicator_svc=indicator_svc, state_store=state_store)
+
+        print("\n" + "="*50)
+        print("--- First manual cycle finished. Starting continuous patrol. ---")
+        print("="*50)
+
+    def startup_check_running(symbol: str) -> bool:
+        check = startup_checks.get(symbol)
+        return check is not None and not check.done()
+
+    first_cycle = True
+
+    def manage_trades(close_ms: int):
+        """ 1. HIGH-FREQUENCY MANAGEMENT (every M1 close) """
+        nonlocal startup_checks, first_cycle
+        print(f"[{clock.now().strftime('%H:%M:%S')}] Running management cycle...")
+        for manager in trade_managers:
+            manager.check_open_trade()
+        if first_cycle:
+            first_cycle = False
+            startup_seconds = time.perf_counter() - STARTED_AT
+            get_metrics().observe('startup_seconds', startup_seconds)
+            print(f"MainScheduler: First management cycle finished {startup_seconds:.2f}s after start ({'fast' if fast_start else 'serial'} start).")
+        if startup_checks and all(check.done() for check in startup_checks.values()):
+            startup_checks = {}
+            print(f"MainScheduler: Background warm-up finished {time.perf_counter() - STARTED_AT:.1f}s after start.")
+
+    def hunt_biases(close_ms: int):
+        """ 2. LOW-FREQUENCY STRATEGY (H4 bias after every H4 close) """
+        for symbol in symbols_to_trade:
+            # A symbol whose startup check is still running gets its bias from that check
+            if state_store.get_state(symbol) == HUNTING and not startup_check_running(symbol):
+                # Scheduled runs are NOT startup runs
+                run_h4_bias_check(config, symbol, data_svc, telegram_svc, is_startup_run=False, indicator_svc=indicator_svc, state_store=state_store)
+
+    def hunt_entries(close_ms: int):
+        """ 3. MEDIUM-FREQUENCY TACTICS (H1 entry hunt after every H1 close) """
+        for symbol in symbols_to_trade:
+            if state_store.get_state(symbol) == WATCHING_FOR_ENTRY and not startup_check_running(symbol):
+                run_h1_entry_hunt(config, symbol, data_svc, telegram_svc, heuristic_svc, state_store=state_store, journal=journal)
+
+    # Jobs wake just after each candle close (plus the time the exchange needs to finalize the bar) instead of polling every minute.
+    # When several close together they run in this order: management, H4 bias, H1 entry.
+    scheduler = CandleScheduler(settle_seconds=config.getfloat('parameters', 'candle_settle_seconds', fallback=DEFAULT_SETTLE_SECONDS), clock=clock)
+    scheduler.every('1m', manage_trades, name='management', run_on_start=True)
+    scheduler.every('4h', hunt_biases, name='h4_bias') # The startup bias check covers the H4 candle that closed before the start
+    scheduler.every('1h', hunt_entries, name='h1_entry', run_on_start=True)
+
+    try:
+        scheduler.run(until_ms=None if until is None else int(until.timestamp() * 1000))
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        if market_stream is not None:
+            market_stream.stop()
+        state_store.close()
+        journal.close()
+        telegram_svc.close()
+        get_metrics().stop()
+        print("\nBot stopped.")
 
 if __name__ == '__main__':
     config = configparser.ConfigParser()
@@ -93,64 +249,4 @@ if __name__ == '__main__':
         print("FATAL ERROR: Please set your Telegram bot token in config.ini before running.")
         exit()
 
-    symbols_to_trade = [symbol.strip() for symbol in config['parameters']['symbols'].split(',')]
-    
-    # Initialize services that are used in the main loop
-    data_svc = DataService()
-    telegram_svc = TelegramService(bot_token=config['telegram']['bot_token'], channel_id=config['telegram']['channel_id'])
-    heuristic_svc = HeuristicService() # The Scout
-    
-    trade_managers = [TradeManagerService(data_svc, telegram_svc, f"{s.replace('/', '_').lower()}_log.csv", f"{s.replace('/', '_').lower()}_status.json", s) for s in symbols_to_trade]
-    
-    # --- IMMEDIATE FIRST RUN ON STARTUP ---
-    print("\n" + "="*50)
-    print("--- Running the first manual BIAS CHECK for all strategies on startup ---")
-    print("="*50)
-    
-    for symbol in symbols_to_trade:
-        # We will re-use the H4 bias check function, but tell it this is a startup run
-        # Note: This requires a small modification to run_h4_bias_check
-        run_h4_bias_check(config, symbol, data_svc, telegram_svc, is_startup_run=True)
-
-    print("\n" + "="*50)
-    print("--- First manual cycle finished. Starting continuous patrol. ---")
-    print("="*50)
-
-    last_h4_run_hour = -1
-    last_h1_run_hour = -1
-
-    try:
-        while True:
-            now_utc = datetime.now(pytz.utc)
-            
-            # 1. HIGH-FREQUENCY MANAGEMENT (Every minute)
-            print(f"[{now_utc.strftime('%H:%M:%S')}] Running management cycle...")
-            for manager in trade_managers:
-                manager.check_open_trade()
-            
-            # 2. LOW-FREQUENCY STRATEGY (H4 Bias on Schedule)
-            if now_utc.hour % 4 == 0 and now_utc.minute >= 1 and last_h4_run_hour != now_utc.hour:
-                for symbol in symbols_to_trade:
-                    with open(f"{symbol.replace('/', '_').lower()}_status.json", 'r') as f:
-                        status = json.load(f)
-                    if status.get('state') == "HUNTING":
-                        # Scheduled runs are NOT startup runs
-                        run_h4_bias_check(config, symbol, data_svc, telegram_svc, is_startup_run=False)
-                last_h4_run_hour = now_utc.hour
-
-            # 3. MEDIUM-FREQUENCY TACTICS (H1 Entry Hunt)
-            if now_utc.minute >= 1 and last_h1_run_hour != now_utc.hour:
-                for symbol in symbols_to_trade:
-                    try:
-                        with open(f"{symbol.replace('/', '_').lower()}_status.json", 'r') as f:
-                            status = json.load(f)
-                        if status.get('state') == "WATCHING_FOR_ENTRY":
-                            run_h1_entry_hunt(config, symbol, data_svc, telegram_svc, heuristic_svc)
-                    except FileNotFoundError:
-                        continue # Ignore if status file doesn't exist yet
-                last_h1_run_hour = now_utc.hour
-
-            time.sleep(60)
-
-    except (KeyboardInterrupt, SystemExit):
-        print("\nBot stopped.")
\ No newline at end of file
+    run(config)
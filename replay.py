@@ -0,0 +1,125 @@
+# replay.py - Runs main_scheduler on recorded candles under an accelerated clock
+
+import argparse
+import configparser
+import cProfile
+from contextlib import nullcontext, redirect_stdout
+import os
+import pstats
+import time
+import pandas as pd
+
+import main_scheduler
+from services import exchange_pool
+from services.candle_store import CandleStore
+from services.clock import SimulatedClock, set_clock
+from services.data_service import DataService
+from services.replay_exchange import ReplayExchange
+from services.state_store import StrategyStateStore
+from services.telegram_service import TelegramService
+from services.trade_journal import TradeJournal
+
+class CycleTimingClock(SimulatedClock):
+    """ A simulated clock that also records the wall time of every scheduler cycle (the work between two sleeps). """
+    def __init__(self, start):
+        super().__init__(start)
+        self.cycle_seconds = []
+        self._cycle_started = time.perf_counter()
+
+    def sleep(self, seconds: float):
+        now = time.perf_counter()
+        self.cycle_seconds.append(now - self._cycle_started)
+        super().sleep(seconds)
+        self._cycle_started = time.perf_counter()
+
+class RecordingTelegramService(TelegramService):
+    """ Keeps the alerts of a replay in memory instead of sending them. """
+    def __init__(self):
+        self.channel_id = None
+        self.dispatcher = None
+        self.messages = []
+
+    def send_text_message(self, message: str):
+        self.messages.append(message)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay the live scheduler over stored candles with a simulated clock.")
+    parser.add_argument('--start', required=True, help="Simulated start time (UTC), e.g. 2024-03-01.")
+    parser.add_argument('--end', required=True, help="Simulated end time (UTC).")
+    parser.add_argument('--symbols', default=None, help="Comma separated symbols. Defaults to config.ini [parameters] symbols.")
+    parser.add_argument('--data', default='data/candles', help="Candle store holding the recorded --base-timeframe candles.")
+    parser.add_argument('--base-timeframe', default='1m', help="Timeframe of the recorded candles every other timeframe is built from.")
+    parser.add_argument('--out', default='data/replay', help="Directory for the replay's state, journal and candle store.")
+    parser.add_argument('--quiet', action='store_true', help="Hide the scheduler's output.")
+    parser.add_argument('--profile', action='store_true', help="Print the 25 most expensive functions of the run.")
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    if args.symbols:
+        config['parameters']['symbols'] = args.symbols
+    # No background warm-up, live stream or metrics endpoint in a replay: everything follows the simulated clock
+    config['parameters'].update({'fast_start': 'false', 'use_websocket': 'false', 'metrics_enabled': 'false'})
+    symbols = [s.strip() for s in config['parameters']['symbols'].split(',')]
+
+    start, end = pd.Timestamp(args.start, tz='UTC'), pd.Timestamp(args.end, tz='UTC')
+    source = CandleStore(args.data)
+    frames = {symbol: source.load_frame(symbol, args.base_timeframe) for symbol in symbols}
+    missing = [symbol for symbol, df in frames.items() if df.empty]
+    if missing:
+        print(f"Replay: No recorded {args.base_timeframe} candles for {', '.join(missing)} in '{args.data}'.")
+        exit()
+
+    # A fresh output directory per run so every replay starts from the same (empty) state
+    os.makedirs(args.out, exist_ok=True)
+    for name in ('strategy_state.db', 'trade_journal.db'):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(os.path.join(args.out, name + suffix)):
+                os.remove(os.path.join(args.out, name + suffix))
+    candle_dir = os.path.join(args.out, 'candles')
+    for name in os.listdir(candle_dir) if os.path.isdir(candle_dir) else []:
+        os.remove(os.path.join(candle_dir, name))
+
+    clock = CycleTimingClock(start)
+    set_clock(clock)
+    exchange = ReplayExchange(frames, base_timeframe=args.base_timeframe, clock=clock)
+    limiter = exchange_pool.get_rate_limiter(exchange.id)
+    limiter.rate = limiter.capacity = limiter.tokens = 1e12 # No exchange to protect
+    data_svc = DataService(candle_store=CandleStore(candle_dir), lazy=True)
+    data_svc.exchange = exchange
+    telegram_svc = RecordingTelegramService()
+    journal_path = os.path.join(args.out, 'trade_journal.db')
+
+    def replay():
+        main_scheduler.run(config, data_svc=data_svc, telegram_svc=telegram_svc, state_store=StrategyStateStore(os.path.join(args.out, 'strategy_state.db')),
+                           journal=TradeJournal(journal_path), until=end.to_pydatetime())
+
+    print(f"Replay: {len(symbols)} symbols from {start} to {end}...")
+    profiler = cProfile.Profile() if args.profile else None
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        with redirect_stdout(devnull) if args.quiet else nullcontext():
+            if profiler:
+                profiler.runcall(replay)
+            else:
+                replay()
+    elapsed = time.perf_counter() - started
+
+    simulated_minutes = (end - start).total_seconds() / 60
+    cycles = pd.Series(clock.cycle_seconds[1:]) * 1000 # The first cycle includes start-up (model loading, full history sync)
+    busiest = cycles.max() / len(symbols) / 1000 # Wall seconds per symbol of the slowest cycle (the H4 + H1 hour)
+    print(f"\n--- Replay ({len(symbols)} symbols, {simulated_minutes:,.0f} simulated minutes) ---")
+    print(f"Wall time:          {elapsed:.1f}s ({simulated_minutes / elapsed:,.0f} simulated minutes per second)")
+    print(f"Cycle wall time:    mean {cycles.mean():.2f} ms, p99 {cycles.quantile(0.99):.2f} ms, max {cycles.max():.1f} ms")
+    print(f"Capacity estimate:  ~{int(60 / busiest):,} symbols per process before the slowest cycle overruns its minute")
+    print(f"Exchange requests:  {exchange.calls:,}")
+    print(f"Alerts:             {len(telegram_svc.messages):,}")
+
+    journal = TradeJournal(journal_path)
+    print("\n--- Journal Statistics ---")
+    print(journal.stats().to_string())
+    journal.close()
+
+    if profiler:
+        print("\n--- Profile (cumulative) ---")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
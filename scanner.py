@@ -0,0 +1,65 @@
+# scanner.py - Ranks every Coinbase market of one quote currency by H4 model confidence
+
+import argparse
+import asyncio
+import configparser
+from datetime import datetime, timedelta, timezone
+
+from services.async_data_service import AsyncDataService
+from services.market_scanner import MarketScannerService
+
+async def scan_once(scanner: MarketScannerService, symbols: list, top: int, output: str | None):
+    ranking = await scanner.scan(symbols)
+    print(f"\n--- Top {top} H4 biases ({datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')}) ---")
+    print(ranking.head(top).to_string(index=False) if not ranking.empty else "No biases above the confidence threshold.")
+    if output:
+        ranking.to_csv(output, index=False)
+        print(f"\nRanking saved to '{output}'.")
+
+async def main(args, config):
+    confidence_threshold = args.min_confidence or config.getfloat('parameters', 'confidence_threshold', fallback=0.55)
+    max_concurrent_requests = config.getint('parameters', 'max_concurrent_requests', fallback=5)
+
+    data_svc = AsyncDataService(max_concurrent_requests=max_concurrent_requests)
+    if not await data_svc.initialize():
+        await data_svc.close()
+        return
+    try:
+        scanner = MarketScannerService(data_svc, default_model_path=args.model, confidence_threshold=confidence_threshold)
+        symbols = [s.strip() for s in args.symbols.split(',')] if args.symbols else scanner.list_markets(args.quote)
+        if args.limit:
+            symbols = symbols[:args.limit]
+        print(f"Scanner: {len(symbols)} {args.quote} markets to scan.")
+
+        while True:
+            await scan_once(scanner, symbols, args.top, args.output)
+            if not args.loop:
+                break
+            # Next H4 close, plus a minute for the exchange to publish the candle
+            now = datetime.now(timezone.utc)
+            next_run = now.replace(hour=now.hour - now.hour % 4, minute=1, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(hours=4)
+            print(f"Scanner: Next scan at {next_run.strftime('%H:%M')} UTC.")
+            await asyncio.sleep((next_run - now).total_seconds())
+    finally:
+        await data_svc.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scan all markets of a quote currency and rank them by H4 model confidence.")
+    parser.add_argument('--quote', default='USD', help="Quote currency of the markets to scan.")
+    parser.add_argument('--symbols', default=None, help="Comma separated symbols instead of every market of --quote.")
+    parser.add_argument('--limit', type=int, default=None, help="Scan only the first N markets.")
+    parser.add_argument('--model', default='models/btc_usd_h4.pkl', help="Model for symbols without a models/<symbol>_h4.pkl of their own.")
+    parser.add_argument('--min-confidence', type=float, default=None, help="Defaults to config.ini [parameters] confidence_threshold.")
+    parser.add_argument('--top', type=int, default=20, help="Rows of the ranking to print.")
+    parser.add_argument('--output', default=None, help="Optional CSV path for the full ranking.")
+    parser.add_argument('--loop', action='store_true', help="Keep scanning after every H4 candle close.")
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    try:
+        asyncio.run(main(args, config))
+    except KeyboardInterrupt:
+        print("\nScanner stopped.")
@@ -0,0 +1,235 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+import requests
+
+from services.exchange_pool import TokenBucket
+from services.metrics import get_metrics
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+MAX_MESSAGE_LENGTH = 4096 # Telegram's limit for one sendMessage text
+
+def is_retryable(status: int | None) -> bool:
+    """ Whether a send that failed with HTTP `status` (None: no response at all) may succeed later. """
+    return status is None or status == 429 or status >= 500
+
+class AlertDispatcher:
+    """
+    Fire-and-forget Telegram sender. enqueue() returns immediately; a background worker
+    delivers the messages over one keep-alive HTTP session.
+
+    - Messages queued within `coalesce_window` seconds for the same chat are merged into one
+      message (up to Telegram's 4096 character limit).
+    - Sends are paced per chat (Telegram allows ~20 messages/minute in groups and channels) and
+      globally (~30 messages/second per bot).
+    - Failures are retried with exponential backoff; 429 responses wait the `retry_after` Telegram asks for.
+    - Messages that still cannot be delivered are appended to `spill_path` (JSONL) and re-queued
+      the next time a dispatcher starts. Messages Telegram rejected for good (4xx other than 429,
+      e.g. a bad token or an unknown chat) stay in the file and are not re-queued.
+    - stop() spills whatever is still queued or being sent when its timeout runs out.
+    """
+    def __init__(self, bot_token: str, base_url: str = TELEGRAM_API_URL, spill_path: str = 'telegram_spill.jsonl',
+                 max_retries: int = 5, base_backoff: float = 1.0, max_backoff: float = 60.0,
+                 coalesce_window: float = 0.5, per_chat_rate: float = 20 / 60, request_timeout: float = 10.0):
+        self.url = f"{base_url.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.spill_path = spill_path
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.coalesce_window = coalesce_window
+        self.per_chat_rate = per_chat_rate
+        self.request_timeout = request_timeout
+        self.session = requests.Session()
+        self.global_limiter = TokenBucket(rate=30, capacity=30)
+        self.chat_limiters = {} # chat_id -> TokenBucket
+        self._queue = queue.Queue()
+        self._pending = [] # Messages taken off the queue but not coalesced into the current batch yet
+        self._in_flight = None # The batch (or the unsent rest of it) the worker is coalescing or sending
+        self._in_flight_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._reload_spill()
+        self._thread = threading.Thread(target=self._worker, name="AlertDispatcher", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def enqueue(self, chat_id, text: str, parse_mode: str | None = 'Markdown'):
+        """ Queues a message and returns immediately. """
+        self._queue.put({"chat_id": chat_id, "text": text, "parse_mode": parse_mode})
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._pending) + (self._in_flight is not None)
+
+    def stop(self, timeout: float = 5.0):
+        """ Gives the worker up to `timeout` seconds to drain the queue, then spills whatever is left (including a batch still being sent). """
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stopping.set()
+        self._thread.join(timeout=max(0.0, deadline - time.monotonic()) + 1.0)
+        self._thread = None
+
+        # A worker still blocked in a request gives up the batch it was sending; it never spills it itself
+        with self._in_flight_lock:
+            leftover = [self._in_flight] if self._in_flight is not None else []
+            self._in_flight = None
+        leftover += self._pending
+        self._pending.clear()
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for message in leftover:
+            self._spill(message, "dispatcher stopped")
+
+    def _next_batch(self) -> dict | None:
+        """ Takes the next message and merges any others for the same chat that arrive within the coalesce window. """
+        if self._pending:
+            batch = self._pending.pop(0)
+        else:
+            try:
+                batch = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                return None
+        self._in_flight = batch
+
+        deadline = time.monotonic() + self.coalesce_window
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                message = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            merged = f"{batch['text']}\n\n{message['text']}"
+            if (message['chat_id'] == batch['chat_id'] and message['parse_mode'] == batch['parse_mode']
+                    and len(merged) <= MAX_MESSAGE_LENGTH):
+                batch = self._in_flight = dict(batch, text=merged)
+            else:
+                self._pending.append(message)
+                break
+        return batch
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if batch is None:
+                continue
+            # Anything over the limit on its own is sent in chunks
+            for start in range(0, len(batch['text']), MAX_MESSAGE_LENGTH):
+                chunk = dict(batch, text=batch['text'][start:start + MAX_MESSAGE_LENGTH])
+                error, status = self._deliver(chunk)
+                with self._in_flight_lock:
+                    if self._in_flight is None:
+                        break # stop() timed out and spilled the rest of the batch
+                    rest = batch['text'][start + MAX_MESSAGE_LENGTH:]
+                    self._in_flight = dict(batch, text=rest) if rest else None
+                    if error is not None:
+                        get_metrics().incr('alerts_total', status='spilled')
+                        print(f"AlertDispatcher: Could not deliver message to {chunk['chat_id']} ({error}). Saved to '{self.spill_path}'.")
+                        self._spill(chunk, error, status)
+
+    def _wait_for_rate_limit(self, chat_id):
+        limiter = self.chat_limiters.get(chat_id)
+        if limiter is None:
+            limiter = self.chat_limiters[chat_id] = TokenBucket(rate=self.per_chat_rate, capacity=3)
+        self._stopping.wait(max(limiter.reserve(), self.global_limiter.reserve()))
+
+    def _deliver(self, message: dict) -> tuple:
+        """ Sends one message with retries. Returns (error, HTTP status of the last failure), (None, 200) once delivered. """
+        payload = {"chat_id": message['chat_id'], "text": message['text']}
+        if message.get('parse_mode'):
+            payload['parse_mode'] = message['parse_mode']
+
+        metrics = get_metrics()
+        error, status = None, None
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_rate_limit(message['chat_id'])
+            try:
+                with metrics.timer('alert_send_seconds'):
+                    response = self.session.post(self.url, json=payload, timeout=self.request_timeout)
+            except requests.RequestException as e:
+                error, status = str(e), None
+                response = None
+
+            if response is not None:
+                status = response.status_code
+                if status == 200:
+                    metrics.incr('alerts_total', status='delivered')
+                    return None, status
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                error = f"HTTP {response.status_code}: {body.get('description', response.text[:200])}"
+
+                if response.status_code == 429:
+                    retry_after = body.get('parameters', {}).get('retry_after', self.base_backoff)
+                    print(f"AlertDispatcher: Rate limited by Telegram. Retrying in {retry_after}s.")
+                    if self._stopping.wait(retry_after):
+                        break
+                    continue
+                if response.status_code == 400 and 'parse_mode' in payload:
+                    # Usually unbalanced Markdown in the text; plain text is better than nothing
+                    print(f"AlertDispatcher: Telegram rejected the formatting ({error}). Resending as plain text.")
+                    payload.pop('parse_mode')
+                    continue
+                if not is_retryable(status):
+                    break # Bad token, unknown chat, ...
+
+            if self._stopping.is_set() or attempt == self.max_retries:
+                break
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** attempt)
+            if self._stopping.wait(backoff * random.uniform(0.5, 1.0)):
+                break
+        return error, status
+
+    def _spill(self, message: dict, error: str | None, status: int | None = None):
+        if not self.spill_path:
+            return
+        record = dict(message, error=error, status=status, failed_at=datetime.now(timezone.utc).isoformat())
+        with self._spill_lock, open(self.spill_path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _reload_spill(self):
+        """
+        Re-queues the retryable messages spilled by a previous run. Messages Telegram rejected
+        permanently are left in the spill file for a human to look at.
+        """
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        requeued, rejected = [], []
+        with self._spill_lock:
+            with open(self.spill_path, 'r') as f:
+                lines = [line for line in f if line.strip()]
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                (requeued if is_retryable(record.get('status')) else rejected).append(record)
+            if rejected:
+                with open(f"{self.spill_path}.tmp", 'w') as f:
+                    f.writelines(json.dumps(record) + "\n" for record in rejected)
+                os.replace(f"{self.spill_path}.tmp", self.spill_path)
+            else:
+                os.remove(self.spill_path)
+        for record in requeued:
+            self.enqueue(record['chat_id'], record['text'], record.get('parse_mode'))
+        if requeued:
+            print(f"AlertDispatcher: Re-queued {len(requeued)} undelivered message(s) from '{self.spill_path}'.")
+        if rejected:
+            print(f"AlertDispatcher: {len(rejected)} message(s) in '{self.spill_path}' were rejected by Telegram and are not retried.")
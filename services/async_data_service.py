@@ -0,0 +1,124 @@
+import asyncio
+import pandas as pd
+
+from services.candle_store import CandleStore
+from services.bar_aggregator import BarAggregator, closed_bars
+from services import exchange_pool
+from services.metrics import get_metrics
+from services.clock import get_clock
+
+class RequestBudget:
+    """
+    Request budget for the async services: at most `max_concurrent` exchange requests in flight,
+    paced by the exchange's process-wide token bucket (shared with the sync services).
+    """
+    def __init__(self, max_concurrent: int = 5, rate_limiter: exchange_pool.TokenBucket | None = None):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.rate_limiter = rate_limiter or exchange_pool.get_rate_limiter()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        wait = self.rate_limiter.reserve()
+        if wait > 0:
+            get_metrics().incr('rate_limit_sleep_seconds_total', wait)
+            await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+
+class AsyncDataService:
+    """
+    asyncio counterpart of DataService built on ccxt.async_support.
+    All requests go through one shared RequestBudget so concurrent symbols share the exchange's rate limit.
+    """
+    def __init__(self, candle_store: CandleStore | None = None, max_concurrent_requests: int = 5):
+        self.candle_store = candle_store or CandleStore()
+        self.aggregators = {} # symbol -> BarAggregator building 4h bars from the 1h candles
+        self.exchange = exchange_pool.get_async_exchange('coinbaseadvanced')
+        self.budget = RequestBudget(max_concurrent_requests, exchange_pool.get_rate_limiter(self.exchange.id))
+
+    async def initialize(self) -> bool:
+        try:
+            if not self.exchange.markets and not exchange_pool.load_cached_markets(self.exchange):
+                async with self.budget:
+                    await self.exchange.load_markets()
+                exchange_pool.save_cached_markets(self.exchange)
+            print("AsyncDataService: Async CCXT interface for Coinbase initialized successfully.")
+            return True
+        except Exception as e:
+            print(f"AsyncDataService: Error initializing exchange: {e}")
+            return False
+
+    async def close(self):
+        await exchange_pool.close_async_exchanges()
+
+    async def _fetch_ohlcv(self, ccxt_symbol: str, timeframe: str, since: int | None = None, limit: int = 300) -> list:
+        async with self.budget:
+            get_metrics().incr('fetch_pages_total', timeframe=timeframe)
+            return await self.exchange.fetch_ohlcv(ccxt_symbol, timeframe, since, limit=limit)
+
+    async def _fetch_ohlcv_range(self, ccxt_symbol: str, timeframe: str, since: int, until: int | None = None) -> list:
+        """ Async version of data_service.fetch_ohlcv_range (pacing comes from the request budget). """
+        timeframe_ms = self.exchange.parse_timeframe(timeframe) * 1000
+        all_ohlcv = []
+        with get_metrics().timer('fetch_seconds', timeframe=timeframe):
+            while True:
+                ohlcv_chunk = await self._fetch_ohlcv(ccxt_symbol, timeframe, since, limit=300)
+                if not ohlcv_chunk:
+                    break
+
+                all_ohlcv.extend(ohlcv_chunk)
+                since = ohlcv_chunk[-1][0] + 1
+
+                if since > self.exchange.milliseconds() - timeframe_ms or (until is not None and since >= until):
+                    break
+        return all_ohlcv
+
+    async def _sync_candles(self, symbol: str, timeframe: str, since: int) -> pd.DataFrame:
+        """ Async version of data_service.sync_candles. """
+        ccxt_symbol = symbol.replace('/', '-')
+        first_ts = self.candle_store.first_timestamp(symbol, timeframe)
+        last_ts = self.candle_store.last_timestamp(symbol, timeframe)
+
+        if last_ts is None:
+            self.candle_store.append(symbol, timeframe, await self._fetch_ohlcv_range(ccxt_symbol, timeframe, since))
+        else:
+            if since <= first_ts - self.exchange.parse_timeframe(timeframe) * 1000:
+                self.candle_store.append(symbol, timeframe, await self._fetch_ohlcv_range(ccxt_symbol, timeframe, since, until=first_ts))
+            self.candle_store.append(symbol, timeframe, await self._fetch_ohlcv_range(ccxt_symbol, timeframe, last_ts))
+
+        return self.candle_store.load_frame(symbol, timeframe, since=since)
+
+    async def get_market_data(self, symbol: str, timeframe: str, limit: int = 500, is_startup_run: bool = False) -> pd.DataFrame | None:
+        """
+        Same contract as DataService.get_market_data.
+        """
+        try:
+            if timeframe == '4h':
+                since = int(get_clock().time() * 1000) - (1000 * 60 * 60 * 1000)
+                df_1h = await self._sync_candles(symbol, '1h', since)
+                if df_1h.empty:
+                    print(f"AsyncDataService ({symbol}): Failed to fetch any 1h data for resampling.")
+                    return None
+                aggregator = self.aggregators.setdefault(symbol, BarAggregator('1h', ('4h',)))
+                aggregator.update_frame(df_1h)
+                df = aggregator.frame('4h', since=since)
+            else:
+                with get_metrics().timer('fetch_seconds', timeframe=timeframe):
+                    ohlcv = await self._fetch_ohlcv(symbol.replace('/', '-'), timeframe, limit=limit)
+                if not ohlcv: return None
+                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                df.set_index('timestamp', inplace=True)
+
+            if not is_startup_run:
+                df = closed_bars(df, timeframe, int(get_clock().time() * 1000))
+
+            df.dropna(inplace=True)
+            print(f"AsyncDataService ({symbol}): Successfully processed {len(df)} {timeframe} candles.")
+            return df
+
+        except Exception as e:
+            print(f"AsyncDataService (get_market_data): An error occurred for {symbol}: {e}")
+            return None
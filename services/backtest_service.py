@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+from services.indicator_service import IndicatorService
+from services.bar_aggregator import resample_ohlcv, closed_bars
+from services.clock import get_clock
+from services.heuristic_service import HeuristicService, BIAS_COLUMNS
+
+H1 = pd.Timedelta(hours=1)
+H4 = pd.Timedelta(hours=4)
+CHIKOU_LAG = 26 # add_all_indicators drops the last 26 rows (unknown chikou span), so live decisions use the row 26 H4 candles back
+
+class BacktestService:
+    """
+    Replays the live H4-bias / H1-entry / trade-manager state machine
+    (HUNTING -> WATCHING_FOR_ENTRY -> IN_TRADE -> HUNTING) over historical 1h candles.
+
+    Signals, entry patterns and SL/TP hits are evaluated as NumPy arrays over the whole
+    history; the Python loop only jumps from one state transition to the next.
+    """
+    def __init__(self, indicator_svc: IndicatorService | None = None, watch_expiry_hours: int | None = None, search_chunk: int = 512, heuristic_svc: HeuristicService | None = None, feature_cache=None):
+        """
+        watch_expiry_hours: if set, an unconfirmed bias is abandoned after this many H1 candles and the
+        replay returns to HUNTING. The live scheduler has no expiry, which is the default (None).
+        feature_cache: optional FeatureCache for the H4 features.
+        """
+        self.indicator_svc = indicator_svc or IndicatorService()
+        self.heuristic_svc = heuristic_svc or HeuristicService()
+        self.feature_cache = feature_cache
+        self.watch_expiry_hours = watch_expiry_hours
+        self.search_chunk = search_chunk
+        print("BacktestService: Initialized.")
+
+    def run(self, frames_h1: dict, ml_services: dict) -> dict:
+        """
+        frames_h1: symbol -> 1h OHLCV frame (e.g. from DataService.get_all_historical_data(symbol, '1h', start_date)).
+        ml_services: symbol -> MLService holding that symbol's H4 model.
+        Returns {"trades": DataFrame, "stats": DataFrame} covering every symbol.
+        """
+        all_trades = []
+        for symbol, df_h1 in frames_h1.items():
+            trades = self.run_symbol(symbol, df_h1, ml_services[symbol])
+            all_trades.append(trades)
+
+        trades = pd.concat(all_trades, ignore_index=True) if all_trades else self._empty_trades()
+        return {"trades": trades, "stats": self.summarize(trades)}
+
+    def run_symbol(self, symbol: str, df_h1: pd.DataFrame, ml_svc) -> pd.DataFrame:
+        if df_h1 is None or df_h1.empty or ml_svc.model is None:
+            print(f"BacktestService ({symbol}): No data or model. Skipping.")
+            return self._empty_trades()
+
+        df_h1 = df_h1[~df_h1.index.duplicated(keep='first')].sort_index()
+        decisions = self._h4_decisions(df_h1, ml_svc, symbol)
+        print(f"BacktestService ({symbol}): {len(decisions)} actionable H4 biases over {len(df_h1)} H1 candles.")
+
+        h1_close_time = (df_h1.index + H1).values
+        opens, highs, lows, closes = (df_h1[c].to_numpy(dtype=float) for c in ['open', 'high', 'low', 'close'])
+        patterns = self.heuristic_svc.entry_pattern_masks(opens, highs, lows, closes)
+        bullish_entry, bearish_entry = patterns['bullish_entry'], patterns['bearish_entry']
+        decision_times = decisions.index.values
+
+        trades = []
+        current_time = decision_times[0] if len(decisions) else None
+        while current_time is not None:
+            # --- HUNTING: the next H4 close (at or after now) with a non-HOLD prediction ---
+            k = int(np.searchsorted(decision_times, current_time, side='left'))
+            if k >= len(decisions):
+                break
+            bias = decisions.iloc[k]
+
+            # --- WATCHING_FOR_ENTRY: the H1 candle closing with the H4 candle is checked first ---
+            watch_start = int(np.searchsorted(h1_close_time, decision_times[k], side='left'))
+            pattern = bullish_entry if bias['bias'] == "BUY" else bearish_entry
+            pullback, sl = bias['pullback_level'], bias['sl']
+            watch_end = len(closes) if self.watch_expiry_hours is None else min(len(closes), watch_start + self.watch_expiry_hours)
+            # Same proximity rule as run_h1_entry_hunt (note it can never pass for BUY biases, where sl < pullback)
+            entry_idx = self._first_true(
+                lambda s, e: (np.abs(closes[s:e] - pullback) < (sl - pullback)) & pattern[s:e], watch_start, watch_end)
+            if entry_idx is None:
+                if watch_end < len(closes):
+                    current_time = h1_close_time[watch_end - 1]
+                    continue
+                print(f"BacktestService ({symbol}): Still watching for a {bias['bias']} entry at the end of the data.")
+                break
+
+            # --- IN_TRADE: the trade manager checks every candle after the entry candle ---
+            entry = closes[entry_idx]
+            if bias['bias'] == "BUY":
+                exit_idx = self._first_true(
+                    lambda s, e: (lows[s:e] <= sl) | (highs[s:e] >= bias['tp1']), entry_idx + 1, len(closes))
+            else:
+                exit_idx = self._first_true(
+                    lambda s, e: (highs[s:e] >= sl) | (lows[s:e] <= bias['tp1']), entry_idx + 1, len(closes))
+
+            trade = {
+                "symbol": symbol, "bias": bias['bias'], "signal_time": pd.Timestamp(decision_times[k]),
+                "entry_time": pd.Timestamp(h1_close_time[entry_idx]), "entry": entry,
+                "sl": sl, "tp1": bias['tp1'], "tp2": bias['tp2'], "tp3": bias['tp3'],
+                "outcome": "OPEN", "exit_time": pd.NaT, "exit_price": np.nan,
+            }
+            if exit_idx is None:
+                trades.append(trade)
+                break
+
+            trade["outcome"], trade["exit_price"] = self._exit_outcome(trade, highs[exit_idx], lows[exit_idx])
+            trade["exit_time"] = pd.Timestamp(h1_close_time[exit_idx])
+            trades.append(trade)
+            current_time = h1_close_time[exit_idx]
+
+        trades = pd.DataFrame(trades, columns=self._empty_trades().columns.drop(['pnl', 'return_pct']))
+        direction = np.where(trades['bias'] == "BUY", 1.0, -1.0)
+        trades['pnl'] = (trades['exit_price'] - trades['entry']) * direction
+        trades['return_pct'] = 100 * trades['pnl'] / trades['entry']
+        print(f"BacktestService ({symbol}): Replay finished with {len(trades)} trades.")
+        return trades
+
+    def _h4_decisions(self, df_h1: pd.DataFrame, ml_svc, symbol: str | None = None) -> pd.DataFrame:
+        """ H4 bias plans indexed by the close time of the H4 candle that produced them (HOLDs removed). """
+        # The history may end with a forming 1h candle; the live bot only ever sees closed H4 candles
+        df_h4 = closed_bars(resample_ohlcv(df_h1, '4h'), '4h', int(get_clock().time() * 1000))
+        if self.feature_cache is not None and symbol is not None:
+            features = self.feature_cache.get(symbol, '4h', df_h4, self.indicator_svc)
+        else:
+            features = self.indicator_svc.add_all_indicators(df_h4.copy())
+        if features is None or features.empty:
+            return pd.DataFrame(columns=BIAS_COLUMNS)
+
+        _, predictions = ml_svc.predict_all(features)
+        # The live frame ends CHIKOU_LAG candles before the candle that just closed
+        position = df_h4.index.get_indexer(features.index) + CHIKOU_LAG
+        valid = position < len(df_h4)
+        decision_time = df_h4.index[position[valid]] + H4
+
+        decisions = self.heuristic_svc.generate_h4_biases(predictions[valid], features[valid])
+        decisions.index = decision_time
+        return decisions[decisions['prediction'] != 0]
+
+    def _first_true(self, mask_fn, start: int, end: int) -> int | None:
+        """ Index of the first True of mask_fn over [start, end), scanned in growing chunks. """
+        chunk = self.search_chunk
+        while start < end:
+            stop = min(start + chunk, end)
+            mask = mask_fn(start, stop)
+            if mask.any():
+                return start + int(mask.argmax())
+            start = stop
+            chunk *= 2
+        return None
+
+    @staticmethod
+    def _exit_outcome(trade: dict, high: float, low: float) -> tuple:
+        """ TradeManagerService.check_open_trade priority: SL first, then the furthest TP reached. """
+        if trade['bias'] == "BUY":
+            if low <= trade['sl']: return "SL", trade['sl']
+            if high >= trade['tp3']: return "TP3", trade['tp3']
+            if high >= trade['tp2']: return "TP2", trade['tp2']
+            return "TP1", trade['tp1']
+        if high >= trade['sl']: return "SL", trade['sl']
+        if low <= trade['tp3']: return "TP3", trade['tp3']
+        if low <= trade['tp2']: return "TP2", trade['tp2']
+        return "TP1", trade['tp1']
+
+    @staticmethod
+    def summarize(trades: pd.DataFrame) -> pd.DataFrame:
+        """ Per-symbol (and overall) trade count, win rate and PnL for closed trades. """
+        closed = trades[trades['outcome'] != "OPEN"]
+        if closed.empty:
+            return pd.DataFrame(columns=['trades', 'wins', 'losses', 'win_rate', 'total_pnl', 'avg_pnl', 'total_return_pct'])
+
+        def _stats(group: pd.DataFrame) -> pd.Series:
+            wins = int((group['outcome'] != "SL").sum())
+            return pd.Series({
+                'trades': len(group),
+                'wins': wins,
+                'losses': len(group) - wins,
+                'win_rate': wins / len(group),
+                'total_pnl': group['pnl'].sum(),
+                'avg_pnl': group['pnl'].mean(),
+                'total_return_pct': group['return_pct'].sum(),
+            })
+
+        stats = closed.groupby('symbol').apply(_stats)
+        stats.loc['ALL'] = _stats(closed)
+        return stats
+
+    @staticmethod
+    def _empty_trades() -> pd.DataFrame:
+        return pd.DataFrame(columns=[
+            'symbol', 'bias', 'signal_time', 'entry_time', 'entry', 'sl', 'tp1', 'tp2', 'tp3',
+            'outcome', 'exit_time', 'exit_price', 'pnl', 'return_pct'
+        ])
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from services.candle_store import CandleStore, OHLCV_COLUMNS
+
+TIMEFRAME_MS = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000, '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000}
+DAY_MS = TIMEFRAME_MS['1d']
+
+def aggregate_rows(rows: np.ndarray, timeframe_ms: int) -> np.ndarray:
+    """
+    Aggregates OHLCV rows (n, 6), ordered by timestamp (ms), into bars of `timeframe_ms`.
+    Buckets are aligned to midnight UTC, which is what resample(origin='start_day') gives for
+    timeframes that divide a day. Empty buckets (gaps) produce no bar.
+    """
+    if len(rows) == 0:
+        return np.empty((0, len(OHLCV_COLUMNS)))
+    bucket = rows[:, 0].astype(np.int64) // timeframe_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(rows)] - 1
+    return np.column_stack([
+        bucket[starts] * timeframe_ms,
+        rows[starts, 1],
+        np.maximum.reduceat(rows[:, 2], starts),
+        np.minimum.reduceat(rows[:, 3], starts),
+        rows[ends, 4],
+        np.add.reduceat(rows[:, 5], starts),
+    ]).astype(np.float64)
+
+def frame_rows(df: pd.DataFrame) -> np.ndarray:
+    """ The (n, 6) OHLCV rows of a timestamp-indexed frame (the inverse of CandleStore.to_frame). """
+    timestamps = df.index.asi8 // 1_000_000
+    return np.column_stack([timestamps, df[OHLCV_COLUMNS[1:]].to_numpy(dtype=np.float64)])
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    Builds `timeframe` candles from a timestamp-indexed OHLCV frame in one pass.
+    Same bars as df.resample(..., origin='start_day').agg(...).dropna().
+    """
+    return CandleStore.to_frame(aggregate_rows(frame_rows(df), TIMEFRAME_MS[timeframe]))
+
+def closed_bars(df: pd.DataFrame, timeframe: str, now_ms: int) -> pd.DataFrame:
+    """ The rows of a timestamp-indexed frame whose `timeframe` candle has closed by `now_ms`. """
+    return df[df.index.asi8 // 1_000_000 + TIMEFRAME_MS[timeframe] <= now_ms]
+
+class BarAggregator:
+    """
+    Keeps 15m/1h/4h (or any day-aligned) bars up to date from a stream of base bars (1m, 15m or 1h).
+
+    update() takes base bars as they arrive; re-sending the newest base bar (a candle that was
+    still forming when it was fetched) replaces it. Only the higher-timeframe bars whose bucket
+    received new data are rebuilt, so a cycle costs O(new bars) instead of a full resample.
+    Buckets with no base bars (exchange gaps) produce no bar, as with resample(...).dropna().
+    The newest bar of each timeframe is partial until `now` reaches the end of its bucket.
+    """
+    def __init__(self, base_timeframe: str = '1h', timeframes: tuple = ('4h',), max_base_bars: int = 20000):
+        self.base_timeframe = base_timeframe
+        self.base_ms = TIMEFRAME_MS[base_timeframe]
+        self.timeframes = {tf: TIMEFRAME_MS[tf] for tf in timeframes}
+        for tf, tf_ms in self.timeframes.items():
+            if tf_ms % self.base_ms or DAY_MS % tf_ms:
+                raise ValueError(f"BarAggregator: Cannot build {tf} bars from {base_timeframe} bars.")
+        self.max_base_bars = max_base_bars
+        self.reset()
+
+    def reset(self):
+        self.base = np.empty((0, len(OHLCV_COLUMNS)))
+        self.bars = {tf: np.empty((0, len(OHLCV_COLUMNS))) for tf in self.timeframes}
+
+    @property
+    def last_timestamp(self) -> int | None:
+        """ Open time (ms) of the newest base bar. """
+        return int(self.base[-1, 0]) if len(self.base) else None
+
+    def update(self, ohlcv: list | np.ndarray) -> int:
+        """
+        Ingests base bars ([timestamp_ms, open, high, low, close, volume] rows, oldest first).
+        Bars older than the newest stored one are ignored. Returns the number of bars added or replaced.
+        """
+        rows = np.asarray(ohlcv, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+        last = self.last_timestamp
+        if last is not None:
+            rows = rows[rows[:, 0] >= last]
+        if len(rows) == 0:
+            return 0
+        # Keep the freshest copy of any timestamp sent twice
+        rows = rows[np.append(rows[1:, 0] != rows[:-1, 0], True)]
+
+        if last is not None and rows[0, 0] == last:
+            self.base = np.vstack([self.base[:-1], rows])
+        else:
+            self.base = np.vstack([self.base, rows])
+        first_changed = int(rows[0, 0])
+
+        for tf, tf_ms in self.timeframes.items():
+            bucket_start = first_changed // tf_ms * tf_ms
+            bars = self.bars[tf]
+            keep = int(np.searchsorted(bars[:, 0], bucket_start, side='left'))
+            start = int(np.searchsorted(self.base[:, 0], bucket_start, side='left'))
+            self.bars[tf] = np.vstack([bars[:keep], aggregate_rows(self.base[start:], tf_ms)])
+
+        if len(self.base) > self.max_base_bars:
+            self._trim()
+        return len(rows)
+
+    def update_frame(self, df: pd.DataFrame) -> int:
+        """ update() from a timestamp-indexed OHLCV frame; only its rows from the newest stored bar on are read. """
+        last = self.last_timestamp
+        if last is not None:
+            df = df.iloc[int(df.index.searchsorted(pd.Timestamp(last, unit='ms'), side='left')):]
+        return self.update(frame_rows(df))
+
+    def _trim(self):
+        """ Drops the oldest base bars, cutting at a bucket boundary of the largest timeframe so no kept bar loses base bars. """
+        largest = max(self.timeframes.values(), default=self.base_ms)
+        cut_time = int(self.base[-self.max_base_bars, 0]) // largest * largest
+        self.base = self.base[int(np.searchsorted(self.base[:, 0], cut_time, side='left')):]
+        for tf, bars in self.bars.items():
+            self.bars[tf] = bars[int(np.searchsorted(bars[:, 0], cut_time, side='left')):]
+
+    def _rows(self, timeframe: str) -> np.ndarray:
+        return self.base if timeframe == self.base_timeframe else self.bars[timeframe]
+
+    def is_partial(self, timeframe: str, now: int) -> bool:
+        """ Whether the newest `timeframe` bar is still forming at `now` (ms). """
+        rows = self._rows(timeframe)
+        return len(rows) > 0 and now < rows[-1, 0] + TIMEFRAME_MS[timeframe]
+
+    def frame(self, timeframe: str, since: int | None = None, now: int | None = None) -> pd.DataFrame:
+        """
+        The `timeframe` bars (or the base bars) as a timestamp-indexed frame, from the first bar that
+        opens at or after `since` (ms). With `now` (ms), a partial newest bar is left out.
+        """
+        rows = self._rows(timeframe)
+        if since is not None:
+            rows = rows[int(np.searchsorted(rows[:, 0], since, side='left')):]
+        if now is not None and self.is_partial(timeframe, now):
+            rows = rows[:-1]
+        return CandleStore.to_frame(rows)
@@ -0,0 +1,152 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.incremental_indicators import EPSILON, FEATURE_COLUMNS
+
+# Every kernel takes (symbols, candles) float64 arrays, one row per symbol. Rows may start with NaN
+# padding (a symbol with a shorter history); each row then gives the values of the same series
+# without the padding, which is how rows of different lengths are computed together.
+
+def first_valid(x: np.ndarray) -> np.ndarray:
+    """ Column of the first non-NaN value of every row (the row length when there is none). """
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=1), valid.argmax(axis=1), x.shape[1])
+
+def shift(x: np.ndarray, periods: int) -> np.ndarray:
+    """ Series.shift along the candles of every row. """
+    out = np.full_like(x, np.nan)
+    if periods >= 0:
+        out[:, periods:] = x[:, :x.shape[1] - periods]
+    else:
+        out[:, :periods] = x[:, -periods:]
+    return out
+
+def _rolling(x: np.ndarray, length: int, reduce) -> np.ndarray:
+    """ rolling(length, min_periods=length) with reduce(windows, axis=-1); windows holding a NaN give NaN. """
+    out = np.full_like(x, np.nan)
+    if x.shape[1] >= length:
+        out[:, length - 1:] = reduce(sliding_window_view(x, length, axis=1), axis=-1)
+    return out
+
+def rolling_mean(x: np.ndarray, length: int) -> np.ndarray:
+    return _rolling(x, length, np.mean)
+
+def rolling_std(x: np.ndarray, length: int) -> np.ndarray:
+    """ Population standard deviation (ddof=0, as pandas_ta's stdev uses). """
+    return _rolling(x, length, np.std)
+
+def midprice(high: np.ndarray, low: np.ndarray, length: int) -> np.ndarray:
+    return 0.5 * (_rolling(low, length, np.min) + _rolling(high, length, np.max))
+
+def non_zero_range(high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """ pandas_ta non_zero_range(): high - low, plus epsilon on every row that has a zero difference anywhere. """
+    diff = high - low
+    return diff + np.where((diff == 0).any(axis=1, keepdims=True), EPSILON, 0.0)
+
+def ema(x: np.ndarray, lengths) -> np.ndarray:
+    """
+    pandas_ta ema() per row (lengths: one length, or one per row): seeded with the mean of the first
+    `length` values of the row, then ewm(span=length, adjust=False). NaNs after the seed keep the last value.
+    """
+    rows, candles = x.shape
+    lengths = np.broadcast_to(np.asarray(lengths), (rows,))
+    alpha = 2.0 / (lengths + 1)
+    start = first_valid(x)
+    seed_at = start + lengths - 1
+    seed = np.full(rows, np.nan)
+    for length in np.unique(lengths):
+        selected = np.flatnonzero((lengths == length) & (seed_at < candles))
+        seed[selected] = x[selected[:, None], start[selected, None] + np.arange(length)].mean(axis=1)
+
+    out = np.full_like(x, np.nan)
+    value = np.full(rows, np.nan)
+    for t in range(candles):
+        x_t = x[:, t]
+        value = np.where(t == seed_at, seed, np.where(np.isnan(x_t), value, (1 - alpha) * value + alpha * x_t))
+        out[:, t] = value
+    return out
+
+def rma(x: np.ndarray, length: int) -> np.ndarray:
+    """ pandas_ta rma() per row: ewm(alpha=1/length, adjust=True, min_periods=length). """
+    decay = 1.0 - 1.0 / length
+    rows, candles = x.shape
+    weighted_sum = np.zeros(rows)
+    weight = np.zeros(rows)
+    observations = np.zeros(rows)
+    out = np.full_like(x, np.nan)
+    for t in range(candles):
+        x_t = x[:, t]
+        valid = ~np.isnan(x_t)
+        weighted_sum = np.where(valid, np.where(valid, x_t, 0.0) + decay * weighted_sum, decay * weighted_sum)
+        weight = np.where(valid, 1.0 + decay * weight, decay * weight)
+        observations += valid
+        ready = observations >= length
+        out[ready, t] = weighted_sum[ready] / weight[ready]
+    return out
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """ pandas_ta true_range(): NaN on the first candle of every row. """
+    prev_close = shift(close, 1)
+    ranges = np.fmax(np.fmax(np.abs(non_zero_range(high, low)), np.abs(high - prev_close)), np.abs(prev_close - low))
+    ranges[np.arange(len(ranges)), np.minimum(first_valid(close), close.shape[1] - 1)] = np.nan
+    return ranges
+
+def _zero(x: np.ndarray) -> np.ndarray:
+    return np.where(np.abs(x) < EPSILON, 0.0, x)
+
+def indicator_suite(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> dict:
+    """
+    The IndicatorService suite for many symbols at once: FEATURE_COLUMNS name -> (symbols, candles) array.
+    Rows are right-aligned candle histories (NaN padding on the left). No rows are dropped; the caller
+    removes the warm-up and the last 26 candles (unknown chikou span) per symbol, like the single-symbol dropna().
+    """
+    symbols = len(close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # --- 1. Ichimoku (spans shifted forward by the kijun period) ---
+        tenkan, kijun, senkou_b = midprice(high, low, 9), midprice(high, low, 26), midprice(high, low, 52)
+        out = {
+            'ichimoku_senkou_span_a': shift(0.5 * (tenkan + kijun), 26), 'ichimoku_senkou_span_b': shift(senkou_b, 26),
+            'ichimoku_tenkan_sen': tenkan, 'ichimoku_kijun_sen': kijun, 'ichimoku_chikou_span': shift(close, -26),
+        }
+
+        # --- 2./4. Trend and MACD: all four close EMAs in one pass ---
+        ema_21, ema_50, ema_12, ema_26 = np.split(ema(np.tile(close, (4, 1)), np.repeat([21, 50, 12, 26], symbols)), 4)
+        out.update({'EMA_21': ema_21, 'EMA_50': ema_50, 'SMA_200': rolling_mean(close, 200)})
+        macd = ema_12 - ema_26
+        macd_signal = ema(macd, 9)
+
+        # --- 3. RSI ---
+        change = close - shift(close, 1)
+        gain = rma(np.where(change < 0, 0.0, change), 14)
+        loss = rma(np.where(change > 0, 0.0, change), 14)
+        out['RSI_14'] = 100 * gain / (gain + np.abs(loss))
+        out.update({'MACD_12_26_9': macd, 'MACDh_12_26_9': macd - macd_signal, 'MACDs_12_26_9': macd_signal})
+
+        # --- 5. Bollinger Bands ---
+        bb_mid = rolling_mean(close, 20)
+        bb_dev = 2.0 * rolling_std(close, 20)
+        bb_lower, bb_upper = bb_mid - bb_dev, bb_mid + bb_dev
+        bb_range = non_zero_range(bb_upper, bb_lower)
+        out.update({'BBL_20_2.0': bb_lower, 'BBM_20_2.0': bb_mid, 'BBU_20_2.0': bb_upper,
+                    'BBB_20_2.0': 100 * bb_range / bb_mid, 'BBP_20_2.0': non_zero_range(close, bb_lower) / bb_range})
+
+        # --- 6. ATR / ADX ---
+        tr = true_range(high, low, close)
+        atr = rma(tr, 14)
+        up, down = high - shift(high, 1), shift(low, 1) - low
+        dm_plus = _zero(((up > down) & (up > 0)) * up)
+        dm_minus = _zero(((down > up) & (down > 0)) * down)
+        dmp = 100 / atr * rma(dm_plus, 14)
+        dmn = 100 / atr * rma(dm_minus, 14)
+        adx = rma(100 * np.abs(dmp - dmn) / (dmp + dmn), 14)
+        out.update({'ATRr_14': atr, 'ADX_14': adx, 'DMP_14': dmp, 'DMN_14': dmn})
+
+        # --- 7. Squeeze (BB vs. SMA-based Keltner Channel, SMA-smoothed 12-candle momentum) ---
+        kc_band = 1.5 * rolling_mean(tr, 20)
+        kc_lower, kc_upper = bb_mid - kc_band, bb_mid + kc_band
+        squeeze_on = (bb_lower > kc_lower) & (bb_upper < kc_upper)
+        squeeze_off = (bb_lower < kc_lower) & (bb_upper > kc_upper)
+        out.update({'SQZ_20_2.0_20_1.5': rolling_mean(close - shift(close, 12), 6),
+                    'SQZ_ON': squeeze_on.astype(int), 'SQZ_OFF': squeeze_off.astype(int),
+                    'SQZ_NO': (~squeeze_on & ~squeeze_off).astype(int)})
+    return {name: out[name] for name in FEATURE_COLUMNS}
@@ -0,0 +1,95 @@
+from services.bar_aggregator import TIMEFRAME_MS
+from services.clock import get_clock
+from services.metrics import get_metrics
+
+DEFAULT_SETTLE_SECONDS = 5.0 # Coinbase publishes a closed candle within a few seconds of the close
+
+def last_close(timeframe: str, now_ms: int) -> int:
+    """ Close time (ms) of the newest `timeframe` candle closed at `now_ms` (candles are aligned to midnight UTC). """
+    return now_ms - now_ms % TIMEFRAME_MS[timeframe]
+
+class CandleJob:
+    __slots__ = ('name', 'timeframe', 'callback', 'handled_close')
+
+    def __init__(self, name: str, timeframe: str, callback, handled_close: int):
+        self.name = name
+        self.timeframe = timeframe
+        self.callback = callback
+        self.handled_close = handled_close # Close time (ms) of the last candle the job ran for
+
+class CandleScheduler:
+    """
+    Runs jobs right after candles close instead of polling.
+
+    Each job belongs to a timeframe; the scheduler sleeps until the earliest next close of all
+    timeframes plus `settle_seconds` (time for the exchange to finalize the bar), then runs every
+    job whose candle has closed, in registration order, passing the close time in ms. A job that
+    missed several closes (process paused, or an earlier job overran) runs once for the newest one.
+    The delay from each close to the scheduler picking its job up is observed as the
+    candle_close_lag_seconds metric. Time comes from the process clock, so a replay (services.clock.SimulatedClock) runs
+    the same schedule without waiting.
+    """
+    def __init__(self, settle_seconds: float = DEFAULT_SETTLE_SECONDS, clock=None):
+        self.settle_ms = int(settle_seconds * 1000)
+        self.clock = clock or get_clock()
+        self.jobs = []
+
+    def _now_ms(self) -> int:
+        return int(self.clock.time() * 1000)
+
+    def every(self, timeframe: str, callback=None, name: str | None = None, run_on_start: bool = False) -> CandleJob:
+        """
+        Runs callback(close_ms) after every `timeframe` close. With run_on_start the candle that
+        closed last before the scheduler starts counts as missed, so the job runs at once.
+        """
+        if timeframe not in TIMEFRAME_MS:
+            raise ValueError(f"Unsupported timeframe '{timeframe}'")
+        handled = last_close(timeframe, self._now_ms() - self.settle_ms)
+        job = CandleJob(name or timeframe, timeframe, callback, handled - TIMEFRAME_MS[timeframe] if run_on_start else handled)
+        self.jobs.append(job)
+        return job
+
+    def next_wake(self) -> int:
+        """ Time (ms) at which the next job becomes due. """
+        return min(job.handled_close + TIMEFRAME_MS[job.timeframe] for job in self.jobs) + self.settle_ms
+
+    def seconds_until_next(self) -> float:
+        return max(0.0, (self.next_wake() - self._now_ms()) / 1000)
+
+    def pop_due(self) -> list:
+        """
+        Marks every job whose candle has closed (and settled) since it last ran as handled and
+        returns them as (job, close_ms) pairs in registration order, for callers that run the jobs themselves.
+        """
+        now = self._now_ms()
+        due = []
+        for job in self.jobs:
+            close = last_close(job.timeframe, now - self.settle_ms)
+            if close <= job.handled_close:
+                continue
+            missed = (close - job.handled_close) // TIMEFRAME_MS[job.timeframe] - 1
+            if missed > 0:
+                print(f"CandleScheduler: '{job.name}' missed {missed} {job.timeframe} close(s). Running once for the latest.")
+            job.handled_close = close
+            get_metrics().observe('candle_close_lag_seconds', (now - close) / 1000, job=job.name)
+            due.append((job, close))
+        return due
+
+    def run_due(self) -> int:
+        """ Runs the callbacks of every due job; returns how many ran. """
+        due = self.pop_due()
+        for job, close in due:
+            try:
+                job.callback(close)
+            except Exception as e:
+                print(f"CandleScheduler: '{job.name}' failed for the {job.timeframe} close at {close}: {e}")
+        return len(due)
+
+    def run(self, until_ms: int | None = None):
+        """ Runs the jobs until `until_ms` (process clock, ms; None = forever) or Ctrl+C. """
+        while True:
+            self.run_due()
+            wake = self.next_wake()
+            if until_ms is not None and wake >= until_ms:
+                return
+            self.clock.sleep(self.seconds_until_next())
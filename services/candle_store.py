@@ -0,0 +1,150 @@
+import io
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+_file_locks = {} # Absolute file path -> Lock; shared by every CandleStore of the process
+_file_locks_guard = threading.Lock()
+
+def _file_lock(path: str) -> threading.Lock:
+    with _file_locks_guard:
+        return _file_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+def _merge_rows(existing: np.ndarray, new_rows: np.ndarray) -> np.ndarray:
+    """ Rows of both sorted by timestamp; for a timestamp in both, the row from `new_rows` is kept. """
+    combined = np.vstack([existing, new_rows])
+    combined = combined[np.argsort(combined[:, 0], kind='stable')]
+    return combined[np.append(combined[1:, 0] != combined[:-1, 0], True)]
+
+class CandleStore:
+    """
+    Persistent on-disk OHLCV store, one memory-mapped NumPy file per symbol and timeframe.
+    Each file holds a float64 array of shape (n, 6) ordered by timestamp (ms),
+    so the live services only need to download the tail that is not on disk yet.
+    """
+    def __init__(self, root_dir: str = 'data/candles'):
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, symbol: str, timeframe: str) -> str:
+        key = symbol.replace('/', '_').replace('-', '_').lower()
+        return os.path.join(self.root_dir, f"{key}_{timeframe}.npy")
+
+    def _open(self, symbol: str, timeframe: str) -> np.ndarray | None:
+        path = self._path(symbol, timeframe)
+        if not os.path.isfile(path):
+            return None
+        try:
+            return np.load(path, mmap_mode='r')
+        except (ValueError, OSError) as e:
+            print(f"CandleStore: Could not read '{path}' ({e}). Ignoring the stored candles.")
+            return None
+
+    def first_timestamp(self, symbol: str, timeframe: str) -> int | None:
+        candles = self._open(symbol, timeframe)
+        if candles is None or len(candles) == 0:
+            return None
+        return int(candles[0, 0])
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> int | None:
+        candles = self._open(symbol, timeframe)
+        if candles is None or len(candles) == 0:
+            return None
+        return int(candles[-1, 0])
+
+    def load(self, symbol: str, timeframe: str, since: int | None = None, until: int | None = None) -> np.ndarray:
+        """
+        Returns a copy of the stored candles with since <= timestamp < until (both in ms).
+        Only the requested rows are read from the memory-mapped file.
+        """
+        candles = self._open(symbol, timeframe)
+        if candles is None:
+            return np.empty((0, len(OHLCV_COLUMNS)))
+
+        timestamps = candles[:, 0]
+        start = 0 if since is None else int(np.searchsorted(timestamps, since, side='left'))
+        end = len(candles) if until is None else int(np.searchsorted(timestamps, until, side='left'))
+        rows = np.array(candles[start:end], dtype=np.float64)
+        del candles
+        return rows
+
+    def load_frame(self, symbol: str, timeframe: str, since: int | None = None, until: int | None = None) -> pd.DataFrame:
+        return self.to_frame(self.load(symbol, timeframe, since, until))
+
+    def append(self, symbol: str, timeframe: str, ohlcv: list | np.ndarray) -> int:
+        """
+        Merges new candles into the store. Rows with a timestamp that is already stored
+        replace the stored row, so a re-fetched (previously incomplete) candle is updated.
+        Returns the total number of stored candles.
+
+        New candles that start after the first stored one (the usual tail sync) only rewrite the
+        file from the first stored row they overlap; anything else rewrites the whole file
+        through a temporary file. Writers of the same file are serialized within the process.
+        """
+        new_rows = np.asarray(ohlcv, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+        path = self._path(symbol, timeframe)
+        with _file_lock(path):
+            existing = self._open(symbol, timeframe)
+            stored = 0 if existing is None else len(existing)
+            if len(new_rows) == 0:
+                return stored
+
+            if stored:
+                start = int(np.searchsorted(existing[:, 0], new_rows[:, 0].min(), side='left'))
+                if start > 0:
+                    tail = _merge_rows(np.array(existing[start:], dtype=np.float64), new_rows)
+                    del existing
+                    if self._write_tail(path, start, tail):
+                        return start + len(tail)
+                    existing = self._open(symbol, timeframe)
+
+            combined = _merge_rows(np.empty((0, len(OHLCV_COLUMNS))) if existing is None else np.array(existing, dtype=np.float64), new_rows)
+            del existing
+            with tempfile.NamedTemporaryFile(dir=self.root_dir, prefix=f"{os.path.basename(path)}.", suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
+                try:
+                    np.save(f, combined)
+                except BaseException:
+                    f.close()
+                    os.remove(tmp_path)
+                    raise
+            os.replace(tmp_path, path)
+            return len(combined)
+
+    @staticmethod
+    def _write_tail(path: str, start: int, rows: np.ndarray) -> bool:
+        """
+        Writes `rows` over the stored rows from `start` on (the file only grows), then updates the
+        row count in the .npy header. Returns False if the file cannot be updated in place.
+        """
+        with open(path, 'r+b') as f:
+            if np.lib.format.read_magic(f) != (1, 0):
+                return False
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            offset = f.tell()
+            if fortran_order or dtype != np.float64 or len(shape) != 2 or shape[1] != len(OHLCV_COLUMNS) or start + len(rows) < shape[0]:
+                return False
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(header, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                                                          'shape': (start + len(rows), len(OHLCV_COLUMNS))})
+            if len(header.getvalue()) != offset:
+                return False # The new header does not fit in the old one's padding
+
+            # Rows first, header last, so the stored row count never covers rows that are not written yet
+            f.seek(offset + start * dtype.itemsize * len(OHLCV_COLUMNS))
+            f.write(rows.astype(dtype, copy=False).tobytes())
+            f.flush()
+            f.seek(0)
+            f.write(header.getvalue())
+        return True
+
+    @staticmethod
+    def to_frame(rows: np.ndarray) -> pd.DataFrame:
+        df = pd.DataFrame(rows, columns=OHLCV_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='ms')
+        df.set_index('timestamp', inplace=True)
+        return df
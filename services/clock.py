@@ -0,0 +1,47 @@
+import threading
+import time
+from datetime import datetime, timezone
+import pandas as pd
+
+class SystemClock:
+    """ The wall clock. """
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+class SimulatedClock:
+    """
+    A clock that only moves when told to: sleep() advances it instantly, so the scheduler's
+    60 s waits take no wall time during a replay.
+    """
+    def __init__(self, start):
+        self._now = pd.Timestamp(start).tz_localize('UTC') if pd.Timestamp(start).tzinfo is None else pd.Timestamp(start).tz_convert('UTC')
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._now.value / 1e9
+
+    def now(self) -> datetime:
+        return self._now.to_pydatetime()
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def advance(self, seconds: float):
+        with self._lock:
+            self._now += pd.Timedelta(seconds=seconds)
+
+_clock = SystemClock()
+
+def get_clock():
+    """ The process-wide clock every service reads the time from (the wall clock unless a replay swapped it). """
+    return _clock
+
+def set_clock(clock):
+    global _clock
+    _clock = clock
@@ -1,17 +1,94 @@
-import ccxt
 import pandas as pd
 from datetime import datetime, timedelta
-import time
+import threading
+
+from services.candle_store import CandleStore
+from services.historical_downloader import HistoricalDownloader
+from services.bar_aggregator import BarAggregator, closed_bars, resample_ohlcv
+from services import exchange_pool
+from services.metrics import get_metrics
+from services.clock import get_clock
+
+def fetch_ohlcv_range(exchange, ccxt_symbol: str, timeframe: str, since: int, until: int | None = None) -> list:
+    """
+    Pages through fetch_ohlcv from `since` until the exchange runs out of candles,
+    the current candle is reached or (optionally) `until` is passed.
+    Each page takes a token from the exchange's shared rate limiter.
+    """
+    metrics = get_metrics()
+    rate_limiter = exchange_pool.get_rate_limiter(exchange.id)
+    timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+    all_ohlcv = []
+    with metrics.timer('fetch_seconds', timeframe=timeframe):
+        while True:
+            metrics.incr('rate_limit_sleep_seconds_total', rate_limiter.acquire())
+            metrics.incr('fetch_pages_total', timeframe=timeframe)
+            ohlcv_chunk = exchange.fetch_ohlcv(ccxt_symbol, timeframe, since, limit=300)
+            if not ohlcv_chunk:
+                break
+
+            all_ohlcv.extend(ohlcv_chunk)
+            since = ohlcv_chunk[-1][0] + 1
+
+            # Stop once the newest (still forming) candle has been received
+            if since > exchange.milliseconds() - timeframe_ms or (until is not None and since >= until):
+                break
+    return all_ohlcv
+
+def sync_candles(exchange, candle_store: CandleStore, symbol: str, timeframe: str, since: int) -> pd.DataFrame:
+    """
+    Brings the local candle store up to date for `symbol` and returns every stored candle since `since`.
+    Only the missing head (before the first stored candle) and the tail after the last stored candle are downloaded.
+    """
+    ccxt_symbol = symbol.replace('/', '-')
+    first_ts = candle_store.first_timestamp(symbol, timeframe)
+    last_ts = candle_store.last_timestamp(symbol, timeframe)
+
+    if last_ts is None:
+        print(f"CandleStore: No stored {timeframe} candles for {symbol}. Downloading since {exchange.iso8601(since)}...")
+        candle_store.append(symbol, timeframe, fetch_ohlcv_range(exchange, ccxt_symbol, timeframe, since))
+    else:
+        if since <= first_ts - exchange.parse_timeframe(timeframe) * 1000:
+            print(f"CandleStore: Filling {timeframe} history for {symbol} from {exchange.iso8601(since)} to {exchange.iso8601(first_ts)}...")
+            candle_store.append(symbol, timeframe, fetch_ohlcv_range(exchange, ccxt_symbol, timeframe, since, until=first_ts))
+        # The last stored candle may have been incomplete when it was saved, so it is fetched again.
+        new_ohlcv = fetch_ohlcv_range(exchange, ccxt_symbol, timeframe, last_ts)
+        candle_store.append(symbol, timeframe, new_ohlcv)
+        print(f"CandleStore: Fetched {len(new_ohlcv)} new {timeframe} candles for {symbol} since {exchange.iso8601(last_ts)}.")
+
+    return candle_store.load_frame(symbol, timeframe, since=since)
 
 class DataService:
-    def __init__(self):
-        try:
-            self.exchange = ccxt.coinbaseadvanced()
-            self.exchange.load_markets()
-            print("DataService: Unified CCXT interface for Coinbase initialized successfully.")
-        except Exception as e:
-            print(f"DataService: Error initializing exchange: {e}")
-            self.exchange = None
+    def __init__(self, candle_store: CandleStore | None = None, lazy: bool = False):
+        """ With lazy=True the exchange client (ccxt import and markets) is only set up on first use. """
+        self.candle_store = candle_store or CandleStore()
+        self.aggregators = {} # symbol -> BarAggregator building 4h bars from the 1h candles
+        self.downloader = HistoricalDownloader(self.candle_store) # Backtest/training history, fetched in parallel chunks
+        self._exchange = None
+        self._connected = False
+        self._connect_lock = threading.Lock() # The fast start warms up on worker threads
+        if not lazy:
+            self.connect()
+
+    def connect(self):
+        with self._connect_lock:
+            if not self._connected:
+                try:
+                    self._exchange = exchange_pool.get_exchange('coinbaseadvanced')
+                    print("DataService: Unified CCXT interface for Coinbase initialized successfully.")
+                except Exception as e:
+                    print(f"DataService: Error initializing exchange: {e}")
+                    self._exchange = None
+                self._connected = True
+        return self._exchange
+
+    @property
+    def exchange(self):
+        return self._exchange if self._connected else self.connect()
+
+    @exchange.setter
+    def exchange(self, exchange):
+        self._exchange, self._connected = exchange, True
 
     def get_market_data(self, symbol: str, timeframe: str, limit: int = 500, is_startup_run: bool = False) -> pd.DataFrame | None:
         """
@@ -23,46 +100,35 @@ class DataService:
             ccxt_symbol = symbol.replace('/', '-')
             
             if timeframe == '4h':
-                print(f"DataService (Live): '4h' requested. Fetching a robust chunk of 1h data...")
-                current_timestamp_ms = int(time.time() * 1000)
+                print(f"DataService (Live): '4h' requested. Syncing the local 1h candle store...")
+                current_timestamp_ms = int(get_clock().time() * 1000)
                 since = current_timestamp_ms - (1000 * 60 * 60 * 1000)
-                all_ohlcv = []
-                
-                while True:
-                    print(f"DataService (Live): Fetching 1h chunk since {self.exchange.iso8601(since)}...")
-                    ohlcv_chunk = self.exchange.fetch_ohlcv(ccxt_symbol, '1h', since, limit=300)
-                    if not ohlcv_chunk:
-                        break
-                    
-                    all_ohlcv.extend(ohlcv_chunk)
-                    since = ohlcv_chunk[-1][0] + 1
-                    
-                    if since > self.exchange.milliseconds():
-                        break
-                    time.sleep(self.exchange.rateLimit / 1000)
+                df_1h = sync_candles(self.exchange, self.candle_store, symbol, '1h', since)
                 
-                if not all_ohlcv:
+                if df_1h.empty:
                     print("DataService (Live): Failed to fetch any 1h data for resampling.")
                     return None
                 
-                df_1h = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df_1h['timestamp'] = pd.to_datetime(df_1h['timestamp'], unit='ms')
-                df_1h.set_index('timestamp', inplace=True)
-                
-                print(f"DataService (Live): Fetched {len(df_1h)} total 1h candles. Resampling to 4H...")
-                agg_dict = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
-                df = df_1h.resample('4H', origin='start_day').agg(agg_dict)
+                aggregator = self.aggregators.setdefault(symbol, BarAggregator('1h', ('4h',)))
+                updated = aggregator.update_frame(df_1h)
+                print(f"DataService (Live): Loaded {len(df_1h)} total 1h candles. Updated 4H bars from {updated} new 1h candles...")
+                df = aggregator.frame('4h', since=since)
                 
             else: # For other timeframes (like the 1m trade manager), fetch directly.
-                ohlcv = self.exchange.fetch_ohlcv(ccxt_symbol, timeframe, limit=limit)
+                metrics = get_metrics()
+                with metrics.timer('fetch_seconds', timeframe=timeframe):
+                    metrics.incr('rate_limit_sleep_seconds_total', exchange_pool.get_rate_limiter(self.exchange.id).acquire())
+                    metrics.incr('fetch_pages_total', timeframe=timeframe)
+                    ohlcv = self.exchange.fetch_ohlcv(ccxt_symbol, timeframe, limit=limit)
                 if not ohlcv: return None
                 df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
                 df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
                 df.set_index('timestamp', inplace=True)
             
             if not is_startup_run:
-                df = df.iloc[:-1]
-                print("DataService (Live): Scheduled run. Removed final (incomplete) candle.")
+                # By time rather than position: right after a close the exchange may not list the new candle yet
+                df = closed_bars(df, timeframe, int(get_clock().time() * 1000))
+                print("DataService (Live): Scheduled run. Removed the incomplete candle.")
             
             df.dropna(inplace=True)
             print(f"DataService (Live): Successfully processed {len(df)} candles.")
@@ -76,35 +142,21 @@ class DataService:
         if not self.exchange: return None
 
         fetch_timeframe = '1h' if timeframe == '4h' else timeframe
-        ccxt_symbol = symbol.replace('/', '-')
 
-        print(f"DataService (Hist): Fetching all klines for {ccxt_symbol} on {fetch_timeframe} since {start_date}...")
+        print(f"DataService (Hist): Loading all klines for {symbol} on {fetch_timeframe} since {start_date}...")
         try:
             since = self.exchange.parse8601(f"{start_date} 00:00:00Z")
-            all_ohlcv = []
-            
-            while True:
-                ohlcv_chunk = self.exchange.fetch_ohlcv(ccxt_symbol, fetch_timeframe, since, limit=300)
-                if not ohlcv_chunk: break
-                all_ohlcv.extend(ohlcv_chunk)
-                since = ohlcv_chunk[-1][0] + 1
-                time.sleep(self.exchange.rateLimit / 1000)
+            df = self.downloader.sync(self.exchange, symbol, fetch_timeframe, since)
 
-            if not all_ohlcv: return None
-
-            df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            df = df[~df.index.duplicated(keep='first')]
+            if df.empty: return None
 
             if timeframe == '4h':
                 print("DataService (Hist): Resampling 1H data to 4H...")
-                agg_dict = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
-                df = df.resample('4H', origin='start_day').agg(agg_dict).dropna()
+                df = resample_ohlcv(df, '4h')
 
-            print(f"DataService (Hist): Downloaded and processed {len(df)} total {timeframe} candles.")
+            print(f"DataService (Hist): Loaded and processed {len(df)} total {timeframe} candles.")
             return df
             
         except Exception as e:
             print(f"DataService (get_all_historical_data): An error occurred: {e}")
-            return None
\ No newline at end of file
+            return None
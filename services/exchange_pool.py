@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+
+# Coinbase Advanced Trade public endpoints allow 10 requests/second per IP
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_BURST = 10
+
+# load_markets() results are kept on disk so a restart does not wait for the markets download
+MARKETS_CACHE_DIR = 'data/markets'
+MARKETS_CACHE_MAX_AGE = 24 * 3600 # seconds
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Allows bursts of up to `capacity` requests and refills at
+    `rate` tokens per second. Callers reserve a token and get back how long they must wait,
+    so the same bucket can be shared by threads (acquire) and coroutines (reserve + asyncio.sleep).
+    """
+    def __init__(self, rate: float = DEFAULT_REQUESTS_PER_SECOND, capacity: int = DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """ Takes `tokens` from the bucket (possibly going into debt) and returns the seconds to wait before using them. """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= tokens
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """ Blocking version of reserve(). Returns the seconds spent waiting. """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+_lock = threading.RLock()
+_exchanges = {}
+_async_exchanges = {}
+_rate_limiters = {}
+
+def get_rate_limiter(exchange_id: str = 'coinbaseadvanced') -> TokenBucket:
+    """ The process-wide request budget for one exchange, shared by sync and async clients. """
+    with _lock:
+        if exchange_id not in _rate_limiters:
+            _rate_limiters[exchange_id] = TokenBucket()
+        return _rate_limiters[exchange_id]
+
+def _markets_cache_path(exchange_id: str) -> str:
+    return os.path.join(MARKETS_CACHE_DIR, f"{exchange_id}.json")
+
+def load_cached_markets(exchange) -> bool:
+    """ Restores markets saved by a previous run if they are younger than MARKETS_CACHE_MAX_AGE. """
+    path = _markets_cache_path(exchange.id)
+    try:
+        if time.time() - os.path.getmtime(path) > MARKETS_CACHE_MAX_AGE:
+            return False
+        with open(path, 'r') as f:
+            cached = json.load(f)
+        exchange.set_markets(cached['markets'], cached.get('currencies'))
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"ExchangePool: Ignoring unreadable markets cache '{path}' ({e}).")
+        return False
+    print(f"ExchangePool: Loaded {len(exchange.markets)} {exchange.id} markets from '{path}'.")
+    return True
+
+def save_cached_markets(exchange):
+    path = _markets_cache_path(exchange.id)
+    try:
+        os.makedirs(MARKETS_CACHE_DIR, exist_ok=True)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump({'markets': exchange.markets, 'currencies': exchange.currencies}, f, default=str)
+        os.replace(f"{path}.tmp", path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"ExchangePool: Could not write markets cache '{path}' ({e}).")
+
+def get_exchange(exchange_id: str = 'coinbaseadvanced', load_markets: bool = True):
+    """
+    Returns the shared ccxt client for `exchange_id`, creating it (and loading its markets) on first use.
+    Reusing one instance keeps its HTTP session and keep-alive connections; pacing is done by the
+    shared TokenBucket instead of ccxt's per-instance fixed delay.
+    Markets come from the on-disk cache when it is fresh enough, otherwise from the exchange.
+    """
+    with _lock:
+        exchange = _exchanges.get(exchange_id)
+        if exchange is None:
+            import ccxt # ~1s to import, so only once a client is actually needed
+            exchange = getattr(ccxt, exchange_id)({'enableRateLimit': False})
+            _exchanges[exchange_id] = exchange
+            print(f"ExchangePool: Created shared {exchange_id} client.")
+    if load_markets and not exchange.markets:
+        with _lock:
+            if not exchange.markets and not load_cached_markets(exchange):
+                get_rate_limiter(exchange_id).acquire()
+                exchange.load_markets()
+                print(f"ExchangePool: Cached {len(exchange.markets)} {exchange_id} markets.")
+                save_cached_markets(exchange)
+    return exchange
+
+def get_async_exchange(exchange_id: str = 'coinbaseadvanced'):
+    """
+    Returns the shared ccxt.async_support client for `exchange_id`. Markets already cached by the
+    sync client are reused so the async client does not have to download them again.
+    """
+    with _lock:
+        exchange = _async_exchanges.get(exchange_id)
+        if exchange is None:
+            import ccxt.async_support as ccxt_async
+            exchange = getattr(ccxt_async, exchange_id)({'enableRateLimit': False})
+            _async_exchanges[exchange_id] = exchange
+            sync_exchange = _exchanges.get(exchange_id)
+            if sync_exchange is not None and sync_exchange.markets:
+                exchange.set_markets(sync_exchange.markets, sync_exchange.currencies)
+        return exchange
+
+async def close_async_exchanges():
+    with _lock:
+        exchanges = list(_async_exchanges.values())
+        _async_exchanges.clear()
+    for exchange in exchanges:
+        await exchange.close()
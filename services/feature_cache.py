@@ -0,0 +1,132 @@
+import glob
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from services.indicator_service import INDICATOR_CONFIG
+from services.bar_aggregator import TIMEFRAME_MS
+from services.clock import get_clock
+
+FEATURE_CACHE_VERSION = 1 # Bump when add_all_indicators changes in a way INDICATOR_CONFIG does not capture
+
+def indicator_config_hash(config: dict | None = None) -> str:
+    payload = json.dumps({'version': FEATURE_CACHE_VERSION, 'indicators': config or INDICATOR_CONFIG}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+class FeatureCache:
+    """
+    On-disk cache of finished feature matrices (the output of IndicatorService.add_all_indicators).
+
+    An entry is keyed by symbol, timeframe, first and last closed candle and the hash of the indicator
+    configuration, and stored column by column in an uncompressed .npz file under `root_dir`.
+    When the same series comes back with newer candles, only the new rows are computed (from a
+    warm-up tail of `warmup` candles, which brings the recursive indicators to the full-history
+    values to ~1e-12) and appended; the superseded entry is replaced. The least recently used
+    entries are evicted once the cache grows past `max_bytes`.
+    """
+    def __init__(self, root_dir: str = 'data/features', max_bytes: int = 512 * 1024 ** 2, warmup: int = 1000, config: dict | None = None):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.warmup = warmup
+        self.config_hash = indicator_config_hash(config)
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _series_prefix(self, symbol: str, timeframe: str, first_timestamp: pd.Timestamp) -> str:
+        key = symbol.replace('/', '_').replace('-', '_').lower()
+        return os.path.join(self.root_dir, f"{key}_{timeframe}_{first_timestamp.value // 1_000_000}_{self.config_hash}")
+
+    @staticmethod
+    def _entry_path(prefix: str, last_timestamp: pd.Timestamp) -> str:
+        return f"{prefix}_{last_timestamp.value // 1_000_000}.npz"
+
+    @staticmethod
+    def _entries(prefix: str) -> list:
+        """ (last candle ms, path) of every stored entry of one series, oldest first. """
+        entries = []
+        for path in glob.glob(f"{glob.escape(prefix)}_*.npz"):
+            suffix = path[len(prefix) + 1:-len('.npz')]
+            if suffix.isdigit():
+                entries.append((int(suffix), path))
+        return sorted(entries)
+
+    @staticmethod
+    def load(path: str, columns: list | None = None) -> pd.DataFrame:
+        """ Reads an entry; with `columns`, only those arrays are read from the file. """
+        with np.load(path, allow_pickle=False) as data:
+            names = list(columns or data['__columns__'])
+            frame = pd.DataFrame({name: data[name] for name in names}, index=pd.to_datetime(data['__index__']))
+        frame.index.name = 'timestamp'
+        return frame
+
+    @staticmethod
+    def save(path: str, df: pd.DataFrame):
+        tmp_path = f"{path}.tmp"
+        arrays = {str(column): df[column].to_numpy() for column in df.columns}
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, __index__=df.index.values.astype('datetime64[ns]'), __columns__=np.array(df.columns, dtype=str), **arrays)
+        os.replace(tmp_path, path)
+
+    def get(self, symbol: str, timeframe: str, candles: pd.DataFrame, indicator_svc) -> pd.DataFrame:
+        """
+        add_all_indicators(candles) for closed `candles`, served from the cache when possible.
+        A frame whose last candle is still forming is computed without the cache: its features
+        (the chikou span 26 rows back in particular) change until that candle closes.
+        """
+        if candles is None or candles.empty:
+            return indicator_svc.add_all_indicators(candles)
+        if candles.index[-1].value // 1_000_000 + TIMEFRAME_MS[timeframe] > int(get_clock().time() * 1000):
+            print(f"FeatureCache ({symbol} {timeframe}): Last candle {candles.index[-1]} has not closed. Computing without the cache.")
+            return indicator_svc.add_all_indicators(candles.copy())
+
+        prefix = self._series_prefix(symbol, timeframe, candles.index[0])
+        path = self._entry_path(prefix, candles.index[-1])
+        if os.path.exists(path):
+            os.utime(path) # Eviction is least-recently-used by mtime
+            print(f"FeatureCache ({symbol} {timeframe}): Hit up to {candles.index[-1]}.")
+            return self.load(path)
+
+        features = None
+        last_ms = candles.index[-1].value // 1_000_000
+        older = [entry for entry in self._entries(prefix) if entry[0] < last_ms]
+        if older:
+            features = self._extend(symbol, timeframe, self.load(older[-1][1]), candles, indicator_svc)
+            if features is not None:
+                os.remove(older[-1][1])
+        if features is None:
+            print(f"FeatureCache ({symbol} {timeframe}): Miss. Computing features for {len(candles)} candles...")
+            features = indicator_svc.add_all_indicators(candles.copy())
+            if features is None or features.empty:
+                return features
+
+        self.save(path, features)
+        self._evict()
+        return features
+
+    def _extend(self, symbol: str, timeframe: str, cached: pd.DataFrame, candles: pd.DataFrame, indicator_svc) -> pd.DataFrame | None:
+        """ Appends the feature rows after the cached ones, or returns None if the cached rows no longer match the candles. """
+        if cached.empty or cached.index[-1] not in candles.index:
+            return None
+        position = candles.index.get_loc(cached.index[-1])
+        if candles['close'].iloc[position] != cached['close'].iloc[-1]:
+            print(f"FeatureCache ({symbol} {timeframe}): Candles changed since the entry was written. Recomputing.")
+            return None
+
+        tail = candles.iloc[max(0, position - self.warmup):]
+        fresh = indicator_svc.add_all_indicators(tail.copy())
+        new_rows = fresh[fresh.index > cached.index[-1]] if fresh is not None else fresh
+        if new_rows is None or list(new_rows.columns) != list(cached.columns):
+            return None
+        print(f"FeatureCache ({symbol} {timeframe}): Appended {len(new_rows)} feature rows to {len(cached)} cached rows.")
+        return pd.concat([cached, new_rows])
+
+    def _evict(self):
+        files = [(os.stat(path), path) for path in glob.glob(os.path.join(self.root_dir, '*.npz'))]
+        total = sum(stat.st_size for stat, _ in files)
+        for stat, path in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= stat.st_size
+            print(f"FeatureCache: Evicted '{path}'.")
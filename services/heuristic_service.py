@@ -1,9 +1,86 @@
+import numpy as np
 import pandas as pd
 
+BIAS_COLUMNS = ['prediction', 'bias', 'pullback_level', 'sl', 'tp1', 'tp2', 'tp3']
+
 class HeuristicService:
     def __init__(self):
         print("HeuristicService: Initialized with definitive AI-centric logic.")
 
+    @staticmethod
+    def entry_pattern_masks(opens, highs, lows, closes) -> dict:
+        """
+        Candle patterns for every candle of the given arrays (each compared with the candle before it).
+        Returns boolean arrays: bullish_engulfing, bearish_engulfing, hammer, shooting_star and the
+        combined bullish_entry / bearish_entry used by the Scout. The first candle has no predecessor
+        and is never an entry.
+        """
+        opens, highs, lows, closes = (np.asarray(a, dtype=float) for a in (opens, highs, lows, closes))
+        prev_open = np.r_[np.nan, opens[:-1]]
+        prev_close = np.r_[np.nan, closes[:-1]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            candle_range = highs - lows
+            hammer = (closes - lows) / candle_range > 0.7
+            shooting_star = (highs - closes) / candle_range > 0.7
+        bullish_engulfing = (closes > opens) & (opens < prev_close) & (closes > prev_open)
+        bearish_engulfing = (closes < opens) & (opens > prev_close) & (closes < prev_open)
+
+        bullish_entry = bullish_engulfing | hammer
+        bearish_entry = bearish_engulfing | shooting_star
+        bullish_entry[:1] = False
+        bearish_entry[:1] = False
+        return {
+            "bullish_engulfing": bullish_engulfing,
+            "bearish_engulfing": bearish_engulfing,
+            "hammer": hammer,
+            "shooting_star": shooting_star,
+            "bullish_entry": bullish_entry,
+            "bearish_entry": bearish_entry,
+        }
+
+    def confirm_h1_entries(self, df: pd.DataFrame, bias) -> np.ndarray:
+        """
+        confirm_h1_entry for every row of `df` at once. `bias` is "BUY"/"SELL" or an array of them (one per row).
+        """
+        if df is None or df.empty:
+            return np.zeros(0, dtype=bool)
+        masks = self.entry_pattern_masks(*(df[column].to_numpy() for column in ('open', 'high', 'low', 'close')))
+        bias = np.broadcast_to(np.asarray(bias, dtype=object), len(df))
+        return ((bias == "BUY") & masks['bullish_entry']) | ((bias == "SELL") & masks['bearish_entry'])
+
+    @staticmethod
+    def bias_levels(predictions, atr_value, pullback_level) -> dict:
+        """
+        Bias plan arrays for every element: bias ("BUY"/"SELL", None for HOLD), pullback_level, sl and tp1-3.
+        `predictions` are model outputs (1 = BUY, -1 = SELL, 0 = HOLD); HOLD elements get NaN levels.
+        """
+        atr_value = np.asarray(atr_value, dtype=float)
+        pullback_level = np.asarray(pullback_level, dtype=float)
+        predictions = np.broadcast_to(np.asarray(predictions), pullback_level.shape)
+        direction = np.where(predictions == 1, 1.0, -1.0)
+        hold = predictions == 0
+
+        def level(values):
+            return np.where(hold, np.nan, np.round(values, 2)) # Rounded for Crypto precision
+
+        return {
+            'prediction': predictions,
+            'bias': np.where(hold, None, np.where(direction > 0, "BUY", "SELL")),
+            'pullback_level': level(pullback_level),
+            'sl': level(pullback_level - direction * 2 * atr_value),
+            'tp1': level(pullback_level + direction * 2 * atr_value),
+            'tp2': level(pullback_level + direction * 4 * atr_value),
+            'tp3': level(pullback_level + direction * 6 * atr_value),
+        }
+
+    def generate_h4_biases(self, predictions, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        generate_h4_bias for every row of `df` at once. `predictions` holds one model output per row.
+        Returns a frame indexed like `df` with prediction, bias, pullback_level, sl and tp1-3.
+        """
+        levels = self.bias_levels(predictions, df['ATRr_14'].to_numpy(), df['EMA_21'].to_numpy())
+        return pd.DataFrame(levels, index=df.index, columns=BIAS_COLUMNS)
+
     def generate_h4_bias(self, prediction: int, df: pd.DataFrame) -> dict:
         """
         The "General": Takes the AI's prediction and generates a tactical plan.
@@ -12,41 +89,26 @@ class HeuristicService:
         if df is None or df.empty:
             print("HeuristicService: Received empty DataFrame. Cannot generate bias.")
             return {"status": "error"}
-        
+
         if prediction == 0:
             print("HeuristicService: Received HOLD prediction (0). No bias generated.")
             return {"status": "hold"}
-    
+
         print("HeuristicService: Received valid AI prediction. Generating tactical plan...")
         latest_candle = df.iloc[-1]
-        
-        atr_value = latest_candle['ATRr_14']
-        pullback_level = latest_candle['EMA_21']
-        
-        if prediction == 1:
-            decision = "BUY"
-            stop_loss = pullback_level - (2 * atr_value)
-            take_profit_1 = pullback_level + (2 * atr_value)
-            take_profit_2 = pullback_level + (4 * atr_value)
-            take_profit_3 = pullback_level + (6 * atr_value)
-        else: # prediction == -1
-            decision = "SELL"
-            stop_loss = pullback_level + (2 * atr_value)
-            take_profit_1 = pullback_level - (2 * atr_value)
-            take_profit_2 = pullback_level - (4 * atr_value)
-            take_profit_3 = pullback_level - (6 * atr_value)
+        plan = self.bias_levels(prediction, latest_candle['ATRr_14'], latest_candle['EMA_21'])
 
         bias_details = {
-            "bias": decision,
-            "pullback_level": round(pullback_level, 2), # Rounded for Crypto precision
-            "sl": round(stop_loss, 2),
-            "tp1": round(take_profit_1, 2),
-            "tp2": round(take_profit_2, 2),
-            "tp3": round(take_profit_3, 2),
+            "bias": str(plan['bias']),
+            "pullback_level": plan['pullback_level'][()],
+            "sl": plan['sl'][()],
+            "tp1": plan['tp1'][()],
+            "tp2": plan['tp2'][()],
+            "tp3": plan['tp3'][()],
             "rationale": "H4 bias confirmed by AI. Awaiting H1 confirmation."
         }
-    
-        print(f"HeuristicService: Successfully generated {decision} bias.")
+
+        print(f"HeuristicService: Successfully generated {bias_details['bias']} bias.")
         return {"status": "success", "bias_details": bias_details}
 
     def confirm_h1_entry(self, df: pd.DataFrame, bias: str) -> bool:
@@ -55,25 +117,12 @@ class HeuristicService:
         """
         if df is None or len(df) < 2:
             return False
-            
-        last_candle = df.iloc[-1]
-        
+
+        if not self.confirm_h1_entries(df.iloc[-2:], bias)[-1]:
+            return False
+
         if bias == "BUY":
-            is_bullish_engulfing = (last_candle['close'] > last_candle['open'] and 
-                                    last_candle['open'] < df.iloc[-2]['close'] and 
-                                    last_candle['close'] > df.iloc[-2]['open'])
-            is_hammer = (last_candle['close'] - last_candle['low']) / (last_candle['high'] - last_candle['low']) > 0.7
-            if is_bullish_engulfing or is_hammer:
-                print("HeuristicService (Scout): H1 Bullish entry pattern CONFIRMED.")
-                return True
-
-        elif bias == "SELL":
-            is_bearish_engulfing = (last_candle['close'] < last_candle['open'] and 
-                                    last_candle['open'] > df.iloc[-2]['close'] and 
-                                    last_candle['close'] < df.iloc[-2]['open'])
-            is_shooting_star = (last_candle['high'] - last_candle['close']) / (last_candle['high'] - last_candle['low']) > 0.7
-            if is_bearish_engulfing or is_shooting_star:
-                print("HeuristicService (Scout): H1 Bearish entry pattern CONFIRMED.")
-                return True
-        
-        return False
\ No newline at end of file
+            print("HeuristicService (Scout): H1 Bullish entry pattern CONFIRMED.")
+        else:
+            print("HeuristicService (Scout): H1 Bearish entry pattern CONFIRMED.")
+        return True
@@ -0,0 +1,160 @@
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+from services.candle_store import CandleStore, OHLCV_COLUMNS
+from services import exchange_pool
+from services.metrics import get_metrics
+
+PAGE_SIZE = 300 # Candles per fetch_ohlcv request (the Coinbase maximum)
+
+def merge_ohlcv(chunks: list) -> np.ndarray:
+    """ One (n, 6) array sorted by timestamp; of duplicate timestamps the row from the later chunk is kept. """
+    rows = [np.asarray(chunk, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS)) for chunk in chunks]
+    combined = np.vstack(rows) if rows else np.empty((0, len(OHLCV_COLUMNS)))
+    if len(combined) == 0:
+        return combined
+    combined = combined[np.argsort(combined[:, 0], kind='stable')]
+    return combined[np.append(combined[1:, 0] != combined[:-1, 0], True)]
+
+class HistoricalDownloader:
+    """
+    Bulk OHLCV history download for backtests and training.
+
+    The requested range is cut into chunks of `pages_per_chunk` pages that `workers` threads fetch
+    concurrently; every page still takes a token from the exchange's shared rate limiter, so the
+    request rate stays within the exchange limit however many workers run. A failing page is retried
+    with backoff. Each finished chunk is saved to its own file under `checkpoint_dir` right away, so
+    an interrupted (or partly failed) download only fetches the missing chunks when it is run again.
+    Chunk boundaries are aligned to multiples of the chunk length and do not depend on the time of
+    the run. Only the chunk holding the forming candle is never checkpointed.
+    """
+    def __init__(self, candle_store: CandleStore | None = None, workers: int = 4, pages_per_chunk: int = 10,
+                 checkpoint_dir: str = 'data/downloads', retries: int = 3, backoff: float = 1.0):
+        self.candle_store = candle_store or CandleStore()
+        self.workers = workers
+        self.pages_per_chunk = pages_per_chunk
+        self.checkpoint_dir = checkpoint_dir
+        self.retries = retries
+        self.backoff = backoff
+
+    def _checkpoint_path(self, exchange, symbol: str, timeframe: str) -> str:
+        key = symbol.replace('/', '_').replace('-', '_').lower()
+        return os.path.join(self.checkpoint_dir, exchange.id, f"{key}_{timeframe}")
+
+    def chunks(self, since: int, until: int, timeframe_ms: int) -> list:
+        """ (start, end) ms ranges covering [since, until), cut at multiples of the chunk length. """
+        chunk_ms = timeframe_ms * PAGE_SIZE * self.pages_per_chunk
+        first = since - since % chunk_ms
+        return [(max(start, since), min(start + chunk_ms, until)) for start in range(first, until, chunk_ms)]
+
+    def _fetch_page(self, exchange, ccxt_symbol: str, timeframe: str, since: int) -> list:
+        metrics = get_metrics()
+        rate_limiter = exchange_pool.get_rate_limiter(exchange.id)
+        for attempt in range(self.retries + 1):
+            try:
+                metrics.incr('rate_limit_sleep_seconds_total', rate_limiter.acquire())
+                metrics.incr('fetch_pages_total', timeframe=timeframe)
+                return exchange.fetch_ohlcv(ccxt_symbol, timeframe, since, limit=PAGE_SIZE)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+                print(f"HistoricalDownloader: Page {exchange.iso8601(since)} of {ccxt_symbol} {timeframe} failed ({e}). Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    def fetch_chunk(self, exchange, symbol: str, timeframe: str, start: int, end: int) -> np.ndarray:
+        """ Every candle with start <= timestamp < end. Gaps in the exchange's history are skipped a page at a time. """
+        ccxt_symbol = symbol.replace('/', '-')
+        timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        pages = []
+        since = start
+        while since < end:
+            page = self._fetch_page(exchange, ccxt_symbol, timeframe, since)
+            if page:
+                pages.append(page)
+                since = max(int(page[-1][0]) + timeframe_ms, since + timeframe_ms)
+            else:
+                since += timeframe_ms * PAGE_SIZE
+        rows = merge_ohlcv(pages)
+        return rows[(rows[:, 0] >= start) & (rows[:, 0] < end)]
+
+    def _download_chunk(self, exchange, symbol: str, timeframe: str, start: int, end: int, path: str | None) -> np.ndarray:
+        rows = self.fetch_chunk(exchange, symbol, timeframe, start, end)
+        if path is not None:
+            with open(f"{path}.tmp", 'wb') as f:
+                np.save(f, rows)
+            os.replace(f"{path}.tmp", path)
+        return rows
+
+    def download(self, exchange, symbol: str, timeframe: str, since: int, until: int | None = None) -> np.ndarray:
+        """
+        Fetches the candles with since <= timestamp < until (None: up to and including the forming
+        candle) and returns them sorted and de-duplicated. Checkpointed chunks are reused; if any chunk
+        still fails after its retries, the others stay checkpointed and a RuntimeError is raised.
+        """
+        timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        now = exchange.milliseconds()
+        until = now + timeframe_ms if until is None else min(until, now + timeframe_ms)
+        directory = self._checkpoint_path(exchange, symbol, timeframe)
+        os.makedirs(directory, exist_ok=True)
+
+        chunks = self.chunks(since, until, timeframe_ms)
+        done = {}
+        pending = []
+        for start, end in chunks:
+            path = os.path.join(directory, f"{start}_{end}.npy")
+            if os.path.isfile(path):
+                done[start] = np.load(path)
+            else:
+                # The chunk with the forming candle is fetched again on every run
+                pending.append((start, end, path if end <= now else None))
+        if done:
+            print(f"HistoricalDownloader: Resuming {symbol} {timeframe}: {len(done)}/{len(chunks)} chunks already downloaded.")
+
+        started = time.perf_counter()
+        failed = 0
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="HistoricalDownloader")
+        try:
+            futures = {pool.submit(self._download_chunk, exchange, symbol, timeframe, *chunk): chunk for chunk in pending}
+            for future in as_completed(futures):
+                start, end, _ = futures[future]
+                try:
+                    done[start] = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"HistoricalDownloader: Chunk {exchange.iso8601(start)} - {exchange.iso8601(end)} of {symbol} {timeframe} failed: {e}")
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if failed:
+            raise RuntimeError(f"{failed}/{len(chunks)} chunks of {symbol} {timeframe} failed; run again to resume the download")
+
+        rows = merge_ohlcv([done[start] for start in sorted(done)])
+        if pending:
+            print(f"HistoricalDownloader: Downloaded {len(pending)} chunks of {symbol} {timeframe} in {time.perf_counter() - started:.1f}s "
+                  f"({self.workers} workers). {len(rows)} candles in total.")
+        return rows
+
+    def sync(self, exchange, symbol: str, timeframe: str, since: int) -> pd.DataFrame:
+        """
+        Same contract as data_service.sync_candles: downloads the history missing from the candle store
+        (the head before the first stored candle and the tail from the last one) and returns every
+        stored candle since `since`. Checkpoints are removed once their candles are in the store.
+        """
+        first_ts = self.candle_store.first_timestamp(symbol, timeframe)
+        last_ts = self.candle_store.last_timestamp(symbol, timeframe)
+        ranges = [(since, None)]
+        if last_ts is not None:
+            # The last stored candle may have been incomplete when it was saved, so it is fetched again
+            ranges = [(last_ts, None)]
+            if since <= first_ts - exchange.parse_timeframe(timeframe) * 1000:
+                ranges.insert(0, (since, first_ts))
+
+        for start, end in ranges:
+            self.candle_store.append(symbol, timeframe, self.download(exchange, symbol, timeframe, start, end))
+            shutil.rmtree(self._checkpoint_path(exchange, symbol, timeframe), ignore_errors=True)
+        return self.candle_store.load_frame(symbol, timeframe, since=since)
@@ -0,0 +1,330 @@
+import itertools
+import math
+from collections import deque
+import pandas as pd
+
+NAN = float('nan')
+EPSILON = 2.220446049250313e-16 # float64 machine epsilon, as used by pandas_ta's zero()/non_zero_range()
+
+FEATURE_COLUMNS = [
+    'ichimoku_senkou_span_a', 'ichimoku_senkou_span_b', 'ichimoku_tenkan_sen', 'ichimoku_kijun_sen', 'ichimoku_chikou_span',
+    'EMA_21', 'EMA_50', 'SMA_200', 'RSI_14',
+    'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9',
+    'BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'BBP_20_2.0',
+    'ATRr_14', 'ADX_14', 'DMP_14', 'DMN_14',
+    'SQZ_20_2.0_20_1.5', 'SQZ_ON', 'SQZ_OFF', 'SQZ_NO'
+]
+OUTPUT_COLUMNS = ['open', 'high', 'low', 'close', 'volume'] + FEATURE_COLUMNS
+
+class EMA:
+    """ pandas_ta ema(): seeded with the SMA of the first `length` values, then ewm(span=length, adjust=False). """
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.seed = []
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            return self.value
+        self.count += 1
+        if self.count < self.length:
+            self.seed.append(x)
+        elif self.count == self.length:
+            self.seed.append(x)
+            self.value = math.fsum(self.seed) / self.length
+            self.seed = None
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+    def peek(self, x: float) -> float:
+        """ What update(x) would return, without changing the state. """
+        if math.isnan(x) or self.count + 1 < self.length:
+            return self.value
+        if self.count + 1 == self.length:
+            return math.fsum(self.seed + [x]) / self.length
+        return (1 - self.alpha) * self.value + self.alpha * x
+
+class RMA:
+    """ pandas_ta rma(): ewm(alpha=1/length, adjust=True, min_periods=length), leading NaNs skipped. """
+    def __init__(self, length: int):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.nobs = 0
+        self.weighted_sum = 0.0
+        self.weight = 0.0
+
+    def _after(self, x: float) -> tuple:
+        if math.isnan(x):
+            if self.nobs:
+                return self.nobs, self.weighted_sum * self.decay, self.weight * self.decay
+            return self.nobs, self.weighted_sum, self.weight
+        return self.nobs + 1, x + self.decay * self.weighted_sum, 1.0 + self.decay * self.weight
+
+    def _value(self, nobs: int, weighted_sum: float, weight: float) -> float:
+        return weighted_sum / weight if nobs >= self.length else NAN
+
+    def update(self, x: float) -> float:
+        self.nobs, self.weighted_sum, self.weight = self._after(x)
+        return self._value(self.nobs, self.weighted_sum, self.weight)
+
+    def peek(self, x: float) -> float:
+        """ What update(x) would return, without changing the state. """
+        return self._value(*self._after(x))
+
+def _welford_add(stats: tuple, x: float) -> tuple:
+    count, mean, m2 = stats
+    count += 1
+    delta = x - mean
+    mean += delta / count
+    return count, mean, m2 + delta * (x - mean)
+
+def _welford_remove(stats: tuple, x: float) -> tuple:
+    count, mean, m2 = stats
+    if count == 1:
+        return 0, 0.0, 0.0
+    count -= 1
+    delta = x - mean
+    mean -= delta / count
+    return count, mean, m2 - delta * (x - mean)
+
+class RollingWindow:
+    """
+    Fixed-size window with the mean/population std of its values (NaN until full, or while it holds a NaN).
+    The mean and squared deviations are kept with Welford's add/remove updates, so each value costs O(1).
+    """
+    def __init__(self, length: int):
+        self.length = length
+        self.values = deque(maxlen=length)
+        self.nans = 0
+        self.stats = (0, 0.0, 0.0) # (count, mean, sum of squared deviations) of the non-NaN values
+
+    def _after(self, x: float) -> tuple:
+        """ (size, NaN count, stats) once x is appended. """
+        nans, stats = self.nans, self.stats
+        if len(self.values) == self.length:
+            oldest = self.values[0]
+            if math.isnan(oldest):
+                nans -= 1
+            else:
+                stats = _welford_remove(stats, oldest)
+        if math.isnan(x):
+            nans += 1
+        else:
+            stats = _welford_add(stats, x)
+        return min(len(self.values) + 1, self.length), nans, stats
+
+    def _result(self, size: int, nans: int, stats: tuple) -> tuple:
+        if size < self.length or nans:
+            return NAN, NAN
+        count, mean, m2 = stats
+        return mean, math.sqrt(max(m2, 0.0) / count)
+
+    def update(self, x: float) -> tuple:
+        """ Appends x; returns the window's (mean, std). """
+        size, self.nans, self.stats = self._after(x)
+        self.values.append(x)
+        return self._result(size, self.nans, self.stats)
+
+    def peek(self, x: float) -> tuple:
+        """ What update(x) would return, without changing the state. """
+        return self._result(*self._after(x))
+
+class RollingExtreme:
+    """ Rolling max (or min) over `length` values using a monotonic deque, amortized O(1) per update. """
+    def __init__(self, length: int, is_max: bool):
+        self.length = length
+        self.is_max = is_max
+        self.index = -1
+        self.candidates = deque()
+
+    def update(self, x: float) -> float:
+        self.index += 1
+        if self.is_max:
+            while self.candidates and self.candidates[-1][1] <= x:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] >= x:
+                self.candidates.pop()
+        self.candidates.append((self.index, x))
+        if self.candidates[0][0] <= self.index - self.length:
+            self.candidates.popleft()
+        return self.candidates[0][1] if self.index >= self.length - 1 else NAN
+
+    def peek(self, x: float) -> float:
+        """ What update(x) would return, without changing the state. """
+        index = self.index + 1
+        if index < self.length - 1:
+            return NAN
+        # The oldest candidate still in the window after x; update() would keep it ahead of x unless x reaches it
+        survivors = [c for c in itertools.islice(self.candidates, 2) if c[0] > index - self.length]
+        if survivors:
+            value = survivors[0][1]
+            if not (value <= x if self.is_max else value >= x):
+                return value
+        return x
+
+class MidPrice:
+    """ pandas_ta midprice(): average of the rolling highest high and lowest low. """
+    def __init__(self, length: int):
+        self.highest = RollingExtreme(length, is_max=True)
+        self.lowest = RollingExtreme(length, is_max=False)
+
+    def update(self, high: float, low: float) -> float:
+        return 0.5 * (self.lowest.update(low) + self.highest.update(high))
+
+    def peek(self, high: float, low: float) -> float:
+        return 0.5 * (self.lowest.peek(low) + self.highest.peek(high))
+
+def _zero(x: float) -> float:
+    return 0.0 if abs(x) < EPSILON else x
+
+class IncrementalIndicatorEngine:
+    """
+    Stateful, per-symbol version of IndicatorService.add_all_indicators.
+    Every appended candle updates the recursive indicator state in constant time.
+
+    Like the pandas_ta pipeline (which drops rows whose Ichimoku chikou span is still unknown),
+    a candle's feature row is only emitted once the close 26 candles later is known.
+    """
+    def __init__(self, history_size: int = 500):
+        self.history = deque(maxlen=history_size)
+        self.last_timestamp = None
+        self._state = {
+            'tenkan': MidPrice(9), 'kijun': MidPrice(26), 'senkou': MidPrice(52),
+            'span_shift': deque(maxlen=26), 'pending': deque(),
+            'ema_21': EMA(21), 'ema_50': EMA(50), 'sma_200': RollingWindow(200),
+            'rsi_gain': RMA(14), 'rsi_loss': RMA(14),
+            'macd_fast': EMA(12), 'macd_slow': EMA(26), 'macd_signal': EMA(9),
+            'bb': RollingWindow(20), 'atr': RMA(14), 'dm_plus': RMA(14), 'dm_minus': RMA(14), 'adx': RMA(14),
+            'kc_range': RollingWindow(20), 'momentum': deque(maxlen=13), 'squeeze': RollingWindow(6),
+            'prev_high': NAN, 'prev_low': NAN, 'prev_close': NAN,
+        }
+
+    def update(self, timestamp, open_: float, high: float, low: float, close: float, volume: float) -> dict | None:
+        """
+        Appends one closed candle. Returns the feature row that became complete (if any) and
+        keeps it in the bounded history.
+        """
+        row = self._step(self._state, timestamp, open_, high, low, close, volume)
+        self.last_timestamp = timestamp
+        if row is not None:
+            self.history.append(row)
+        return row
+
+    def peek(self, timestamp, open_: float, high: float, low: float, close: float, volume: float) -> dict | None:
+        """
+        Evaluates a candle that may still change (e.g. the forming candle) without committing it.
+        Every indicator is evaluated with peek(), so nothing is copied or changed.
+        """
+        return self._step(self._state, timestamp, open_, high, low, close, volume, commit=False)
+
+    def to_frame(self, extra_row: dict | None = None) -> pd.DataFrame:
+        rows = list(self.history)
+        if extra_row is not None:
+            rows.append(extra_row)
+        if not rows:
+            return pd.DataFrame(columns=OUTPUT_COLUMNS)
+        df = pd.DataFrame.from_records(rows, index='timestamp', columns=['timestamp'] + OUTPUT_COLUMNS)
+        df.index.name = None
+        return df
+
+    @staticmethod
+    def _step(s: dict, timestamp, open_, high, low, close, volume, commit: bool = True) -> dict | None:
+        """ Feature row completed by this candle. With commit=False the state is only read (peek). """
+        def step(indicator, *args):
+            return indicator.update(*args) if commit else indicator.peek(*args)
+
+        prev_high, prev_low, prev_close = s['prev_high'], s['prev_low'], s['prev_close']
+        if commit:
+            s['prev_high'], s['prev_low'], s['prev_close'] = high, low, close
+
+        # --- 1. Ichimoku (spans are shifted forward by the kijun period) ---
+        tenkan = step(s['tenkan'], high, low)
+        kijun = step(s['kijun'], high, low)
+        senkou_b = step(s['senkou'], high, low)
+        span_shift = s['span_shift']
+        span_a, span_b = span_shift[0] if len(span_shift) == span_shift.maxlen else (NAN, NAN)
+        if commit:
+            span_shift.append((0.5 * (tenkan + kijun), senkou_b))
+
+        # --- 2. Trend ---
+        ema_21 = step(s['ema_21'], close)
+        ema_50 = step(s['ema_50'], close)
+        sma_200, _ = step(s['sma_200'], close)
+
+        # --- 3. RSI ---
+        change = close - prev_close
+        rsi_gain = step(s['rsi_gain'], change if math.isnan(change) else max(change, 0.0))
+        rsi_loss = step(s['rsi_loss'], change if math.isnan(change) else min(change, 0.0))
+        rsi_total = rsi_gain + abs(rsi_loss)
+        rsi = 100 * rsi_gain / rsi_total if rsi_total != 0 else NAN # Flat closes: 0/0, NaN in pandas
+
+        # --- 4. MACD ---
+        macd = step(s['macd_fast'], close) - step(s['macd_slow'], close)
+        macd_signal = step(s['macd_signal'], macd)
+
+        # --- 5. Bollinger Bands (population std, as pandas_ta uses ddof=0) ---
+        bb_mid, bb_std = step(s['bb'], close)
+        bb_dev = 2.0 * bb_std
+        bb_lower, bb_upper = bb_mid - bb_dev, bb_mid + bb_dev
+        bb_range = bb_upper - bb_lower
+
+        # --- 6. ATR / ADX ---
+        if math.isnan(prev_close):
+            true_range = NAN
+            dm_plus = dm_minus = NAN
+        else:
+            true_range = max(abs(high - low), abs(high - prev_close), abs(prev_close - low))
+            up, down = high - prev_high, prev_low - low
+            dm_plus = _zero(up if (up > down and up > 0) else 0.0)
+            dm_minus = _zero(down if (down > up and down > 0) else 0.0)
+        atr = step(s['atr'], true_range)
+        dm_plus, dm_minus = step(s['dm_plus'], dm_plus), step(s['dm_minus'], dm_minus)
+        if atr == 0: # Flat candles: pandas gives 100 / 0 * 0 = NaN
+            dmp = dmn = NAN
+        else:
+            dmp, dmn = 100 / atr * dm_plus, 100 / atr * dm_minus
+        dx = 100 * abs(dmp - dmn) / (dmp + dmn) if (dmp + dmn) else NAN
+        adx = step(s['adx'], dx)
+
+        # --- 7. Squeeze (BB vs. SMA-based Keltner Channel, SMA-smoothed momentum) ---
+        kc_range, _ = step(s['kc_range'], true_range)
+        kc_band = 1.5 * kc_range
+        kc_lower, kc_upper = bb_mid - kc_band, bb_mid + kc_band
+        momentum = s['momentum'] # Closes of the last 13 candles: the one 12 back is the momentum base
+        if len(momentum) >= momentum.maxlen - 1:
+            momentum_value = close - momentum[len(momentum) - momentum.maxlen + 1]
+        else:
+            momentum_value = NAN
+        if commit:
+            momentum.append(close)
+        squeeze, _ = step(s['squeeze'], momentum_value)
+        squeeze_on = bb_lower > kc_lower and bb_upper < kc_upper
+        squeeze_off = bb_lower < kc_lower and bb_upper > kc_upper
+
+        row = {
+            'timestamp': timestamp, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+            'ichimoku_senkou_span_a': span_a, 'ichimoku_senkou_span_b': span_b,
+            'ichimoku_tenkan_sen': tenkan, 'ichimoku_kijun_sen': kijun, 'ichimoku_chikou_span': NAN,
+            'EMA_21': ema_21, 'EMA_50': ema_50, 'SMA_200': sma_200, 'RSI_14': rsi,
+            'MACD_12_26_9': macd, 'MACDh_12_26_9': macd - macd_signal, 'MACDs_12_26_9': macd_signal,
+            'BBL_20_2.0': bb_lower, 'BBM_20_2.0': bb_mid, 'BBU_20_2.0': bb_upper,
+            'BBB_20_2.0': 100 * bb_range / bb_mid, 'BBP_20_2.0': (close - bb_lower) / bb_range if bb_range else NAN,
+            'ATRr_14': atr, 'ADX_14': adx, 'DMP_14': dmp, 'DMN_14': dmn,
+            'SQZ_20_2.0_20_1.5': squeeze,
+            'SQZ_ON': int(squeeze_on), 'SQZ_OFF': int(squeeze_off), 'SQZ_NO': int(not squeeze_on and not squeeze_off),
+        }
+
+        # --- 8. Chikou span: the row from 26 candles ago receives this close ---
+        pending = s['pending']
+        completed = None
+        if len(pending) == 26:
+            completed = dict(pending.popleft() if commit else pending[0], ichimoku_chikou_span=close)
+            if any(isinstance(v, float) and math.isnan(v) for v in completed.values()):
+                completed = None
+        if commit:
+            pending.append(row)
+        return completed
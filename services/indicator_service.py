@@ -1,5 +1,22 @@
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+
+from services.batch_indicators import indicator_suite
+from services.incremental_indicators import IncrementalIndicatorEngine
+from services.metrics import get_metrics
+
+# Parameters of the indicator suite the models were trained on (hashed into the feature cache key)
+INDICATOR_CONFIG = {
+    'ichimoku': {'tenkan': 9, 'kijun': 26, 'senkou': 52},
+    'ema': [21, 50],
+    'sma': [200],
+    'rsi': 14,
+    'macd': {'fast': 12, 'slow': 26, 'signal': 9},
+    'bbands': {'length': 20, 'std': 2},
+    'atr': 14,
+    'adx': 14,
+    'squeeze': {'lazy_bear': True},
+}
 
 class IndicatorService:
     """
@@ -7,13 +24,53 @@ class IndicatorService:
     that the final, best-performing AI models were trained on.
     """
     def __init__(self):
+        self.engines = {} # symbol -> IncrementalIndicatorEngine
         print("IndicatorService: Initialized.")
 
-    def add_all_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    def add_all_indicators(self, df: pd.DataFrame, symbol: str | None = None) -> pd.DataFrame:
+        """
+        Without a symbol, the full suite is recomputed over the whole frame with pandas_ta.
+        With a symbol, a per-symbol streaming engine is kept and only the candles it has
+        not seen yet are processed. The final candle is treated as provisional (it may
+        still be forming) and is evaluated without being committed to the engine.
+        """
         if df is None or df.empty:
             print("IndicatorService: Input DataFrame is empty. Cannot add indicators.")
             return df
-            
+
+        with get_metrics().timer('indicator_seconds', mode='full' if symbol is None else 'incremental'):
+            if symbol is not None:
+                return self._update_incremental(df, symbol)
+            return self._calculate_full(df)
+
+    def add_all_indicators_batch(self, frames: dict) -> dict:
+        """
+        The full recompute of add_all_indicators for many symbols in one vectorized pass
+        (services.batch_indicators): symbol -> candles in, symbol -> feature frame out, with the same
+        rows and values as add_all_indicators(df) per symbol. Symbols without candles are left out.
+        """
+        frames = {symbol: df for symbol, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            return {}
+
+        with get_metrics().timer('indicator_seconds', mode='batch'):
+            # Histories are right-aligned; shorter ones are padded with NaN on the left
+            candles = max(len(df) for df in frames.values())
+            arrays = {column: np.full((len(frames), candles), np.nan) for column in ('open', 'high', 'low', 'close', 'volume')}
+            for row, df in enumerate(frames.values()):
+                for column, values in arrays.items():
+                    values[row, candles - len(df):] = df[column].to_numpy(dtype=np.float64)
+            features = indicator_suite(*arrays.values())
+
+            results = {}
+            for row, (symbol, df) in enumerate(frames.items()):
+                columns = {name: values[row, candles - len(df):] for name, values in features.items()}
+                results[symbol] = pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1).dropna()
+        print(f"IndicatorService: Indicator suite added for {len(results)} symbols in one batch.")
+        return results
+
+    def _calculate_full(self, df: pd.DataFrame) -> pd.DataFrame:
+        import pandas_ta as ta # Slow to import and only needed here (it also registers df.ta)
         print("IndicatorService: Calculating the final, optimized suite of indicators...")
         
         # --- 1. Ichimoku Cloud ---
@@ -22,9 +79,7 @@ class IndicatorService:
             high=df['high'], 
             low=df['low'], 
             close=df['close'],
-            tenkan=9, 
-            kijun=26, 
-            senkou=52
+            **INDICATOR_CONFIG['ichimoku']
         )
         ichimoku_df.rename(columns={
             'ITS_9': 'ichimoku_tenkan_sen',
@@ -37,19 +92,42 @@ class IndicatorService:
 
         # --- 2. Core Trend, Volatility, and Momentum Indicators ---
         # These are the foundational indicators that the models consistently found useful.
-        df.ta.ema(length=21, append=True)
-        df.ta.ema(length=50, append=True)
-        df.ta.sma(length=200, append=True)
-        df.ta.rsi(length=14, append=True)
-        df.ta.macd(fast=12, slow=26, signal=9, append=True)
-        df.ta.bbands(length=20, std=2, append=True)
-        df.ta.atr(length=14, append=True)
-        df.ta.adx(length=14, append=True)
-        df.ta.squeeze(lazy_bear=True, append=True)
+        for length in INDICATOR_CONFIG['ema']:
+            df.ta.ema(length=length, append=True)
+        for length in INDICATOR_CONFIG['sma']:
+            df.ta.sma(length=length, append=True)
+        df.ta.rsi(length=INDICATOR_CONFIG['rsi'], append=True)
+        df.ta.macd(**INDICATOR_CONFIG['macd'], append=True)
+        df.ta.bbands(**INDICATOR_CONFIG['bbands'], append=True)
+        df.ta.atr(length=INDICATOR_CONFIG['atr'], append=True)
+        df.ta.adx(length=INDICATOR_CONFIG['adx'], append=True)
+        df.ta.squeeze(**INDICATOR_CONFIG['squeeze'], append=True)
 
         # --- 3. Final Cleanup ---
         # Drop all rows with NaN values that were created during the indicator calculations
         df.dropna(inplace=True)
         
         print("IndicatorService: Final, optimized indicator suite successfully added.")
-        return df
\ No newline at end of file
+        return df
+
+    def _update_incremental(self, df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+        engine = self.engines.get(symbol)
+        closed = df.iloc[:-1]
+
+        # Rebuild when the engine is new or the frame does not continue from what it has seen
+        if engine is None or engine.last_timestamp is None or df.index[0] > engine.last_timestamp or df.index[-1] <= engine.last_timestamp:
+            print(f"IndicatorService ({symbol}): Priming streaming engine with {len(closed)} candles...")
+            engine = IncrementalIndicatorEngine()
+            self.engines[symbol] = engine
+            new_candles = closed
+        else:
+            new_candles = closed[closed.index > engine.last_timestamp]
+
+        for row in new_candles.itertuples():
+            engine.update(row.Index, row.open, row.high, row.low, row.close, row.volume)
+
+        last = df.iloc[-1]
+        provisional_row = engine.peek(df.index[-1], last['open'], last['high'], last['low'], last['close'], last['volume'])
+        result = engine.to_frame(extra_row=provisional_row)
+        print(f"IndicatorService ({symbol}): Streamed {len(new_candles)} new candle(s); {len(result)} feature rows available.")
+        return result
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+def _first_hits(values: np.ndarray, thresholds: np.ndarray, lookahead: int, above: bool, start: int, end: int) -> np.ndarray:
+    """
+    For rows start..end-1: offset (0-based) of the first of the next `lookahead` values that reaches
+    its row's threshold (>= if `above`, else <=), or `lookahead` if none does.
+    """
+    windows = np.lib.stride_tricks.sliding_window_view(values[start + 1:end + lookahead], lookahead)
+    limits = thresholds[start:end, None]
+    hits = windows >= limits if above else windows <= limits
+    return np.where(hits.any(axis=1), hits.argmax(axis=1), lookahead)
+
+def triple_barrier_labels(closes, highs, lows, atrs, atr_multiplier_tp: float = 3.0, atr_multiplier_sl: float = 1.5,
+                          lookahead_candles: int = 30, chunk_size: int = 100_000) -> np.ndarray:
+    """
+    Array version of the Target_Labeling notebooks' define_target.
+    1 (BUY) if close + tp * ATR is reached within the next `lookahead_candles` candles strictly before
+    close - sl * ATR; otherwise -1 (SELL) for the mirrored barriers; otherwise 0 (HOLD). A TP and SL in
+    the same candle count as a loss. The last `lookahead_candles` rows (no full window) and rows with
+    a NaN ATR are 0.
+    Rows are processed in chunks of `chunk_size` so memory stays at O(chunk_size * lookahead).
+    """
+    closes, highs, lows, atrs = (np.asarray(a, dtype=np.float64) for a in (closes, highs, lows, atrs))
+    n = len(closes)
+    labels = np.zeros(n, dtype=np.int64)
+    labeled = max(0, n - lookahead_candles)
+    up_far, down_far = closes + atrs * atr_multiplier_tp, closes - atrs * atr_multiplier_tp
+    up_near, down_near = closes + atrs * atr_multiplier_sl, closes - atrs * atr_multiplier_sl
+
+    for start in range(0, labeled, chunk_size):
+        end = min(start + chunk_size, labeled)
+        buy_tp = _first_hits(highs, up_far, lookahead_candles, True, start, end)
+        buy_sl = _first_hits(lows, down_near, lookahead_candles, False, start, end)
+        sell_tp = _first_hits(lows, down_far, lookahead_candles, False, start, end)
+        sell_sl = _first_hits(highs, up_near, lookahead_candles, True, start, end)
+        # "No hit" is `lookahead`, so `tp < sl` also means the TP exists
+        labels[start:end] = np.where(buy_tp < buy_sl, 1, np.where(sell_tp < sell_sl, -1, 0))
+    return labels
+
+def define_target(df: pd.DataFrame, atr_multiplier_tp: float = 3.0, atr_multiplier_sl: float = 1.5, lookahead_candles: int = 30) -> pd.Series:
+    """
+    The labels of the Target_Labeling notebooks for a feature frame (OHLC plus an ATRr_ column),
+    as a 'target' Series aligned with `df`.
+    """
+    atr_column = next((col for col in df.columns if 'ATRr_' in col), None)
+    if not atr_column:
+        raise ValueError("ATR column not found in DataFrame.")
+    labels = triple_barrier_labels(df['close'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(), df[atr_column].to_numpy(),
+                                   atr_multiplier_tp, atr_multiplier_sl, lookahead_candles)
+    return pd.Series(labels, index=df.index, name='target')
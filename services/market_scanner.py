@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+import pandas as pd
+
+from services.async_data_service import AsyncDataService
+from services.indicator_service import IndicatorService
+from services.heuristic_service import HeuristicService
+from services.ml_service import MLService
+from services.model_registry import ModelRegistry, get_registry
+
+SCAN_COLUMNS = ['symbol', 'prediction', 'confidence', 'bias', 'pullback_level', 'sl', 'tp1', 'tp2', 'tp3', 'candle_time']
+
+class MarketScannerService:
+    """
+    Runs the H4 bias model over every market of a quote currency and ranks the results.
+
+    Candles for all symbols are fetched concurrently through AsyncDataService (one shared
+    request budget, so the exchange rate limit holds however many symbols are scanned), the
+    indicators of all symbols are computed together in one vectorized pass in a worker thread
+    (IndicatorService.add_all_indicators_batch), and the latest feature rows of all symbols are
+    scored together with one batched predict_proba per model. Symbols without a model of their
+    own use `default_model_path`.
+    """
+    def __init__(self, data_svc: AsyncDataService, default_model_path: str = 'models/btc_usd_h4.pkl', confidence_threshold: float = 0.55,
+                 indicator_svc: IndicatorService | None = None, heuristic_svc: HeuristicService | None = None,
+                 registry: ModelRegistry | None = None):
+        self.data_svc = data_svc
+        self.default_model_path = default_model_path
+        self.confidence_threshold = confidence_threshold
+        self.indicator_svc = indicator_svc or IndicatorService()
+        self.heuristic_svc = heuristic_svc or HeuristicService()
+        self.registry = registry or get_registry()
+
+    def list_markets(self, quote: str = 'USD') -> list:
+        """ Active spot markets quoted in `quote`, from the markets the exchange client has loaded. """
+        markets = self.data_svc.exchange.markets or {}
+        return sorted(symbol for symbol, market in markets.items()
+                      if market.get('quote') == quote and market.get('spot', True) and market.get('active') is not False)
+
+    def model_path_for(self, symbol: str) -> str:
+        path = f"models/{symbol.replace('/', '_').lower()}_h4.pkl"
+        return path if os.path.exists(path) else self.default_model_path
+
+    async def scan(self, symbols: list) -> pd.DataFrame:
+        """ Scores every symbol; returns the non-HOLD biases ranked by model confidence (highest first). """
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.data_svc.get_market_data(symbol=s, timeframe='4h') for s in symbols), return_exceptions=True)
+        candles = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                print(f"MarketScannerService ({symbol}): Skipped ({result}).")
+            elif result is not None and not result.empty:
+                candles[symbol] = result
+        fetched = time.perf_counter()
+
+        frames = await asyncio.to_thread(self.indicator_svc.add_all_indicators_batch, candles)
+        frames = {symbol: df for symbol, df in frames.items() if not df.empty}
+        computed = time.perf_counter()
+
+        model_paths = {symbol: self.model_path_for(symbol) for symbol in frames}
+        predictions = MLService.get_predictions_batch(frames, model_paths, self.confidence_threshold, self.registry)
+        rows = []
+        for symbol, (prediction, confidence) in predictions.items():
+            if prediction == 0:
+                continue
+            latest = frames[symbol].iloc[-1]
+            plan = self.heuristic_svc.bias_levels(prediction, latest['ATRr_14'], latest['EMA_21'])
+            rows.append({'symbol': symbol, 'prediction': prediction, 'confidence': float(confidence),
+                         **{key: plan[key][()] for key in ('bias', 'pullback_level', 'sl', 'tp1', 'tp2', 'tp3')},
+                         'candle_time': frames[symbol].index[-1]})
+
+        ranking = pd.DataFrame(rows, columns=SCAN_COLUMNS).sort_values('confidence', ascending=False, ignore_index=True)
+        print(f"MarketScannerService: Scanned {len(frames)}/{len(symbols)} symbols in {time.perf_counter() - started:.1f}s "
+              f"(data {fetched - started:.1f}s, indicators {computed - fetched:.2f}s, inference {time.perf_counter() - computed:.2f}s). "
+              f"{len(ranking)} biases at confidence >= {self.confidence_threshold}.")
+        return ranking
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import threading
+import time
+
+COINBASE_WS_URL = "wss://advanced-trade-ws.coinbase.com"
+
+class MarketStreamService:
+    """
+    Background WebSocket client for Coinbase Advanced Trade ticker updates.
+    Runs its own asyncio loop in a daemon thread and calls the registered callback for every
+    tick of a watched product, so open trades can be checked on every price change instead of
+    once a minute over REST. Reconnects (and resubscribes) with exponential backoff.
+    """
+    def __init__(self, url: str = COINBASE_WS_URL, record_path: str | None = None, max_backoff: float = 30.0):
+        self.url = url
+        self.record_path = record_path # Optional JSONL file of raw messages, e.g. for replaying in tests
+        self.max_backoff = max_backoff
+        self.callbacks = {} # product_id -> callable(price: float, timestamp: float)
+        self.last_tick_at = {} # product_id -> time.monotonic() of the last tick
+        self._lock = threading.Lock()
+        self._loop = None
+        self._websocket = None
+        self._thread = None
+        self._stopping = False
+
+    @staticmethod
+    def _product_id(symbol: str) -> str:
+        return symbol.replace('/', '-')
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._run(),), name="MarketStream", daemon=True)
+        self._thread.start()
+        print(f"MarketStreamService: Streaming thread started ({self.url}).")
+
+    def stop(self):
+        self._stopping = True
+        if self._loop is not None and self._websocket is not None:
+            asyncio.run_coroutine_threadsafe(self._websocket.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def watch(self, symbol: str, callback):
+        """ Subscribes to `symbol` ticks; `callback(price, timestamp)` runs on the streaming thread. """
+        product_id = self._product_id(symbol)
+        with self._lock:
+            is_new = product_id not in self.callbacks
+            self.callbacks[product_id] = callback
+        if is_new:
+            self._send_threadsafe("subscribe", [product_id])
+
+    def unwatch(self, symbol: str):
+        product_id = self._product_id(symbol)
+        with self._lock:
+            removed = self.callbacks.pop(product_id, None) is not None
+            self.last_tick_at.pop(product_id, None)
+        if removed:
+            self._send_threadsafe("unsubscribe", [product_id])
+
+    def is_live(self, symbol: str, max_age_seconds: float = 30.0) -> bool:
+        """ True if a tick for `symbol` arrived within `max_age_seconds`; otherwise callers should poll REST. """
+        last_tick = self.last_tick_at.get(self._product_id(symbol))
+        return last_tick is not None and time.monotonic() - last_tick <= max_age_seconds
+
+    def _send_threadsafe(self, action: str, product_ids: list):
+        if self._loop is not None and self._websocket is not None:
+            asyncio.run_coroutine_threadsafe(self._send(action, product_ids), self._loop)
+
+    async def _send(self, action: str, product_ids: list):
+        if self._websocket is None or not product_ids:
+            return
+        try:
+            for channel in ("ticker", "heartbeats"):
+                await self._websocket.send(json.dumps({"type": action, "product_ids": product_ids, "channel": channel}))
+        except Exception as e:
+            print(f"MarketStreamService: Could not {action} {product_ids}: {e}")
+
+    async def _run(self):
+        import websockets # Imported on the streaming thread, off the startup path
+        backoff = 1.0
+        while not self._stopping:
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as websocket:
+                    self._websocket = websocket
+                    with self._lock:
+                        product_ids = list(self.callbacks)
+                    await self._send("subscribe", product_ids)
+                    print(f"MarketStreamService: Connected. Watching {product_ids or 'no products yet'}.")
+                    backoff = 1.0
+                    async for message in websocket:
+                        self._handle_message(message)
+            except Exception as e:
+                if self._stopping:
+                    break
+                print(f"MarketStreamService: Connection lost ({e}). Reconnecting in {backoff:.0f}s...")
+            finally:
+                self._websocket = None
+            if not self._stopping:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def _handle_message(self, message):
+        if self.record_path:
+            with open(self.record_path, 'a') as f:
+                f.write(message if isinstance(message, str) else message.decode())
+                f.write("\n")
+
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+        if payload.get('channel') != 'ticker':
+            return
+
+        for event in payload.get('events', []):
+            for ticker in event.get('tickers', []):
+                product_id = ticker.get('product_id')
+                callback = self.callbacks.get(product_id)
+                if callback is None or ticker.get('price') is None:
+                    continue
+                self.last_tick_at[product_id] = time.monotonic()
+                try:
+                    callback(float(ticker['price']), time.time())
+                except Exception as e:
+                    print(f"MarketStreamService: Tick handler for {product_id} failed: {e}")
+
+async def serve_recorded_ticks(record_path: str, host: str = "127.0.0.1", port: int = 8765, interval: float = 0.0):
+    """
+    Local stand-in for the Coinbase WebSocket: every client that subscribes gets the messages
+    of a recorded JSONL file (see MarketStreamService(record_path=...)) replayed in order.
+    Point MarketStreamService at ws://host:port to test tick handling offline.
+    """
+    import websockets
+    with open(record_path) as f:
+        messages = [line.strip() for line in f if line.strip()]
+
+    async def handler(websocket, *args):
+        await websocket.recv() # Wait for the first subscribe message
+        for message in messages:
+            await websocket.send(message)
+            if interval:
+                await asyncio.sleep(interval)
+        await websocket.wait_closed()
+
+    return await websockets.serve(handler, host, port)
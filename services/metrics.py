@@ -0,0 +1,177 @@
+import bisect
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIC_PREFIX = 'trading_bot'
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DELAY_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0, 14400.0)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    'fetch_seconds': ('histogram', "Wall time of one OHLCV download (all pages, including rate-limit waits).", LATENCY_BUCKETS),
+    'fetch_pages_total': ('counter', "OHLCV pages requested from the exchange.", None),
+    'rate_limit_sleep_seconds_total': ('counter', "Time spent waiting for the shared exchange request budget.", None),
+    'indicator_seconds': ('histogram', "Time to build the indicator frame of one symbol (mode=batch: of every symbol in the batch).", LATENCY_BUCKETS),
+    'inference_seconds': ('histogram', "Time of one model scoring call.", LATENCY_BUCKETS),
+    'alert_send_seconds': ('histogram', "Time of one Telegram sendMessage request.", LATENCY_BUCKETS),
+    'alerts_total': ('counter', "Alert batches by final outcome.", None),
+    'startup_seconds': ('histogram', "Time from process start to the end of the first management cycle.", LATENCY_BUCKETS),
+    'candle_close_lag_seconds': ('histogram', "Delay from a candle close to the scheduler picking up the job for it.", DELAY_BUCKETS),
+    'signal_delay_seconds': ('histogram', "Delay from the close of the candle a signal was based on to the signal being queued.", DELAY_BUCKETS),
+}
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'labels', 'started')
+
+    def __init__(self, metrics, name: str, labels: dict):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class Metrics:
+    """
+    Per-stage counters and latency histograms for the bot.
+
+    Disabled (the default) every call returns after one attribute check and timer() hands out a
+    shared no-op context manager, so the instrumentation can stay in the hot paths. Once start()ed,
+    the values are served in the Prometheus text format on `host:port`/metrics (localhost only by
+    default) and every observation is also appended as one JSON line to `json_log_path`.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._counters = {} # (name, labels) -> value
+        self._histograms = {} # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        self._log_file = None
+        self._server = None
+
+    def start(self, port: int | None = 9108, host: str = '127.0.0.1', json_log_path: str | None = 'metrics.jsonl'):
+        """ Turns collection on and starts the endpoint (port None: no endpoint) and the JSON log (path None: no log). """
+        with self._lock:
+            if json_log_path and self._log_file is None:
+                self._log_file = open(json_log_path, 'a', buffering=1)
+            self.enabled = True
+        if port is not None and self._server is None:
+            self._server = ThreadingHTTPServer((host, port), _handler_for(self))
+            threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True).start()
+            print(f"Metrics: Serving Prometheus metrics on http://{host}:{self._server.server_port}/metrics.")
+
+    def stop(self):
+        self.enabled = False
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+    def incr(self, name: str, amount: float = 1.0, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+            self._log(name, amount, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            histogram[bisect.bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+            self._log(name, value, labels)
+
+    def timer(self, name: str, **labels):
+        """ Context manager observing the seconds spent inside it into histogram `name`. """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def _log(self, name: str, value: float, labels: dict):
+        if self._log_file is not None:
+            record = {'ts': datetime.now(timezone.utc).isoformat(), 'metric': name, 'value': value, **labels}
+            self._log_file.write(json.dumps(record) + "\n")
+
+    def render(self) -> str:
+        """ Every metric in the Prometheus text exposition format. """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            full_name = f"{METRIC_PREFIX}_{name}"
+            lines += [f"# HELP {full_name} {help_text}", f"# TYPE {full_name} {kind}"]
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{full_name}{_format_labels(labels)} {value:g}")
+                continue
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], values[:-1]):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{_format_labels(labels + (('le', f'{bound:g}' if bound != '+Inf' else bound),))} {cumulative}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {values[-1]:.6f}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+def _handler_for(metrics: Metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Scrapes every few seconds would flood the bot's output
+    return MetricsHandler
+
+_metrics = Metrics()
+
+def get_metrics() -> Metrics:
+    """ The process-wide metrics shared by every service (disabled until start() is called). """
+    return _metrics
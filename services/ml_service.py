@@ -1,54 +1,147 @@
+import numpy as np
 import pandas as pd
-import joblib
+
+from services.model_registry import ModelRegistry, get_registry
+from services.metrics import get_metrics
+
+def probabilities_to_prediction(probabilities, confidence_threshold: float) -> tuple:
+    """ Maps one row of class probabilities to (prediction, confidence): 1 = BUY, -1 = SELL, 0 = HOLD. """
+    max_probability = probabilities.max()
+    predicted_class_mapped = probabilities.argmax()
+
+    if max_probability < confidence_threshold:
+        return 0, max_probability # HOLD
+    if predicted_class_mapped == 1:
+        return 1, max_probability # BUY
+    if predicted_class_mapped == 2:
+        return -1, max_probability # SELL
+    return 0, max_probability # HOLD
+
+def probabilities_to_predictions(probabilities: np.ndarray, confidence_threshold: float) -> np.ndarray:
+    """ probabilities_to_prediction for every row of a (rows, classes) array; returns the predictions. """
+    predicted_class = probabilities.argmax(axis=1)
+    predictions = np.select([predicted_class == 1, predicted_class == 2], [1, -1], default=0)
+    predictions[probabilities.max(axis=1) < confidence_threshold] = 0
+    return predictions
+
+# Objectives whose raw booster output is already the class probabilities predict_proba returns
+FAST_PATH_OBJECTIVES = ('multi:softprob', 'binary:logistic')
 
 class MLService:
     """
     Service responsible for making predictions using a pre-trained ML model.
-    This is the production version.
+    This is the production version. Models come from the shared ModelRegistry,
+    so they are deserialized once per process and hot-reloaded when the file changes.
+
+    XGBoost classifiers are scored through the booster's inplace_predict on float32 arrays
+    (XGBoost computes in float32 anyway, so the probabilities are those of predict_proba):
+    get_prediction copies the latest row into a preallocated buffer instead of building a
+    DataFrame, and predict_all scores whole histories chunk by chunk. Other models go through
+    predict_proba. An instance is not meant to be shared between threads (the buffer is reused).
     """
-    def __init__(self, model_path: str, confidence_threshold = 0.55):
+    def __init__(self, model_path: str, confidence_threshold = 0.55, registry: ModelRegistry | None = None):
+        self.model_path = model_path
         self.confidence_threshold = confidence_threshold
+        self.registry = registry or get_registry()
+        self.model = None
+        self.feature_names = None
+        self._booster = None # Set for models scored through inplace_predict
+        if self._refresh_model():
+            print(f"MLService: Model ready from {model_path} with confidence threshold {self.confidence_threshold}.")
+
+    def _refresh_model(self) -> bool:
         try:
-            self.model = joblib.load(model_path)
-            if hasattr(self.model, 'feature_names_in_'):
-                self.feature_names = self.model.feature_names_in_
-            else: # Fallback for older scikit-learn/xgboost versions
-                self.feature_names = self.model.get_booster().feature_names
-            print(f"MLService: Model loaded from {model_path} with confidence threshold {self.confidence_threshold}.")
+            model, self.feature_names = self.registry.get(self.model_path)
+            if model is not self.model:
+                self.model = model
+                self._prepare_fast_path()
+            return True
         except FileNotFoundError:
-            print(f"MLService: FATAL ERROR - Model file not found at {model_path}.")
+            print(f"MLService: FATAL ERROR - Model file not found at {self.model_path}.")
             self.model = None
         except Exception as e:
             print(f"MLService: An error occurred while loading the model: {e}")
             self.model = None
+        return False
+
+    def _prepare_fast_path(self):
+        self._booster = None
+        if hasattr(self.model, 'get_booster') and getattr(self.model, 'objective', None) in FAST_PATH_OBJECTIVES:
+            self._booster = self.model.get_booster()
+            best_iteration = getattr(self.model, 'best_iteration', None) # Same rounds as predict_proba
+            self._iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+            self._missing = getattr(self.model, 'missing', np.nan)
+            self._row = np.empty((1, len(self.feature_names)), dtype=np.float32)
+
+    def _predict_proba(self, features) -> np.ndarray:
+        """ Class probabilities; `features` is a float32 array in feature_names order on the fast path, else a DataFrame. """
+        if self._booster is None:
+            if hasattr(self.model, "predict_proba"):
+                return self.model.predict_proba(features)
+            return np.atleast_2d(self.model.predict(features))
+        probabilities = self._booster.inplace_predict(features, iteration_range=self._iteration_range, missing=self._missing)
+        if probabilities.ndim == 1: # binary:logistic gives P(class 1) only
+            probabilities = np.column_stack([1 - probabilities, probabilities])
+        return probabilities
 
     def get_prediction(self, df: pd.DataFrame) -> int:
+        if df is not None and not df.empty:
+            self._refresh_model() # Cheap stat() unless the model file changed
         if self.model is None or df is None or df.empty:
             print("MLService: Model not loaded or DataFrame is empty. Returning HOLD.")
             return 0
 
-        latest_data = df.iloc[-1:]
-        features_for_model = latest_data[self.feature_names]
-        
-        if hasattr(self.model, "predict_proba"):
-            probabilities = self.model.predict_proba(features_for_model)[0]
+        if self._booster is not None:
+            self._row[0] = [df[name].to_numpy()[-1] for name in self.feature_names]
+            features_for_model = self._row
         else:
-            probabilities = self.model.predict(features_for_model)[0]
+            features_for_model = df.iloc[-1:][self.feature_names]
 
-        max_probability = probabilities.max()
-        predicted_class_mapped = probabilities.argmax()
+        with get_metrics().timer('inference_seconds', mode='single'):
+            probabilities = self._predict_proba(features_for_model)[0]
 
+        prediction, max_probability = probabilities_to_prediction(probabilities, self.confidence_threshold)
         if max_probability < self.confidence_threshold:
             print(f"MLService: Model prediction ({max_probability:.2f}) is below confidence threshold. Forcing HOLD.")
-            return 0 # HOLD
         else:
-            # If confidence is high enough, we use the model's prediction.
-            if predicted_class_mapped == 1:
-                prediction = 1 # BUY
-            elif predicted_class_mapped == 2:
-                prediction = -1 # SELL
-            else:
-                prediction = 0 # HOLD
-            
             print(f"MLService: Real prediction generated: {prediction} with confidence {max_probability:.2f}")
-            return prediction
\ No newline at end of file
+        return prediction
+
+    def predict_all(self, df: pd.DataFrame, chunk_rows: int = 50_000) -> tuple:
+        """
+        Scores every row of a feature frame (backtests, model evaluation), converting only
+        `chunk_rows` rows of features at a time. Returns (probabilities, predictions): the
+        (rows, classes) class probabilities and the predictions with get_prediction's mapping and
+        confidence gate (1 = BUY, -1 = SELL, 0 = HOLD), both aligned with the rows of `df`.
+        """
+        if df.empty:
+            return np.empty((0, 0)), np.zeros(0, dtype=int)
+        self._refresh_model()
+        if self.model is None:
+            print("MLService: Model not loaded. Returning HOLD for every row.")
+            return np.empty((len(df), 0)), np.zeros(len(df), dtype=int)
+
+        positions = df.columns.get_indexer(self.feature_names)
+        if (positions < 0).any():
+            raise KeyError(f"Feature columns missing from the frame: {[n for n, p in zip(self.feature_names, positions) if p < 0]}")
+
+        chunks = []
+        with get_metrics().timer('inference_seconds', mode='history'):
+            for start in range(0, len(df), chunk_rows):
+                features = df.iloc[start:start + chunk_rows, positions]
+                if self._booster is not None:
+                    features = features.to_numpy(dtype=np.float32)
+                chunks.append(self._predict_proba(features))
+        probabilities = np.concatenate(chunks)
+        return probabilities, probabilities_to_predictions(probabilities, self.confidence_threshold)
+
+    @staticmethod
+    def get_predictions_batch(frames: dict, model_paths: dict, confidence_threshold: float = 0.55, registry: ModelRegistry | None = None) -> dict:
+        """
+        Scores the latest row of every symbol's feature frame with one predict_proba call per model.
+        frames: symbol -> feature DataFrame, model_paths: symbol -> model file.
+        Returns symbol -> (prediction, confidence).
+        """
+        registry = registry or get_registry()
+        probabilities = registry.predict_latest(frames, model_paths)
+        return {symbol: probabilities_to_prediction(p, confidence_threshold) for symbol, p in probabilities.items()}
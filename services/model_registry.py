@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from services.metrics import get_metrics
+
+class ModelRegistry:
+    """
+    Keeps every model file loaded once per process. A model is reloaded only when its file
+    changes on disk (mtime/size first, then a SHA-256 check), so a retrained model is picked up
+    without restarting the bot and without paying deserialization on every call.
+    """
+    def __init__(self):
+        self._entries = {} # model_path -> dict(model, feature_names, mtime, size, sha256)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _file_hash(model_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(model_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _feature_names(model) -> list:
+        if hasattr(model, 'feature_names_in_'):
+            return list(model.feature_names_in_)
+        return list(model.get_booster().feature_names) # Fallback for older scikit-learn/xgboost versions
+
+    def get(self, model_path: str) -> tuple:
+        """
+        Returns (model, feature_names) for `model_path`, loading or hot-reloading it if needed.
+        Raises FileNotFoundError if the file does not exist.
+        """
+        stat = os.stat(model_path)
+        with self._lock:
+            entry = self._entries.get(model_path)
+            if entry is not None and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                return entry['model'], entry['feature_names']
+
+            sha256 = self._file_hash(model_path)
+            if entry is not None and entry['sha256'] == sha256:
+                # Touched but not changed
+                entry['mtime'], entry['size'] = stat.st_mtime_ns, stat.st_size
+                return entry['model'], entry['feature_names']
+
+            import joblib # Unpickling also imports xgboost; both are deferred until a model is needed
+            model = joblib.load(model_path)
+            entry = {
+                'model': model,
+                'feature_names': self._feature_names(model),
+                'mtime': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha256': sha256,
+            }
+            action = "Reloaded" if model_path in self._entries else "Loaded"
+            self._entries[model_path] = entry
+            print(f"ModelRegistry: {action} model '{model_path}' (sha256 {sha256[:12]}).")
+            return entry['model'], entry['feature_names']
+
+    def preload(self, model_paths: list):
+        for model_path in model_paths:
+            try:
+                self.get(model_path)
+            except FileNotFoundError:
+                print(f"ModelRegistry: Model file not found at {model_path}. Skipping preload.")
+            except Exception as e:
+                print(f"ModelRegistry: An error occurred while preloading '{model_path}': {e}")
+
+    def predict_latest(self, frames: dict, model_paths: dict) -> dict:
+        """
+        Scores the latest feature row of every symbol's frame.
+        frames: symbol -> feature DataFrame, model_paths: symbol -> model file.
+        Symbols sharing a model are scored together in a single predict_proba call.
+        Returns symbol -> class probability array.
+        """
+        by_model = {}
+        for symbol, df in frames.items():
+            if df is None or df.empty:
+                continue
+            by_model.setdefault(model_paths[symbol], []).append(symbol)
+
+        probabilities = {}
+        for model_path, symbols in by_model.items():
+            model, feature_names = self.get(model_path)
+            batch = pd.concat([frames[s].iloc[-1:][feature_names] for s in symbols], ignore_index=True)
+            with get_metrics().timer('inference_seconds', mode='batch'):
+                if hasattr(model, "predict_proba"):
+                    batch_probabilities = model.predict_proba(batch)
+                else:
+                    batch_probabilities = np.atleast_2d(model.predict(batch))
+            for symbol, row in zip(symbols, batch_probabilities):
+                probabilities[symbol] = row
+        return probabilities
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ModelRegistry:
+    """ The process-wide registry shared by every MLService. """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from services.bar_aggregator import TIMEFRAME_MS, aggregate_rows, frame_rows
+from services.clock import get_clock
+
+MAX_PAGE = 300 # Coinbase Advanced Trade returns at most 300 candles per request
+
+class ReplayExchange:
+    """
+    Local stand-in for the ccxt client (the load_markets/fetch_ohlcv calls DataService makes)
+    that serves recorded candles as they would have looked at the time of the process clock.
+
+    Candles are given per symbol at one base timeframe (1m recommended). A request for a higher
+    timeframe gets the closed bars aggregated from the base candles plus the forming bar built from
+    the base candles closed so far, so nothing after the clock leaks out. Base-timeframe requests
+    only see closed base candles; requests below the base timeframe are served at the base timeframe.
+    """
+    id = 'replay'
+
+    def __init__(self, frames: dict, base_timeframe: str = '1m', clock=None):
+        """ frames: symbol -> OHLCV DataFrame at `base_timeframe` (e.g. CandleStore.load_frame(symbol, '1m')). """
+        self.clock = clock or get_clock()
+        self.base_timeframe = base_timeframe
+        self.base_ms = TIMEFRAME_MS[base_timeframe]
+        self.rows = {symbol: frame_rows(df) for symbol, df in frames.items()}
+        self.timestamps = {symbol: rows[:, 0].astype(np.int64) for symbol, rows in self.rows.items()}
+        self.aggregated = {} # (symbol, timeframe) -> every bar of the recording at that timeframe
+        self.markets = {}
+        self.currencies = {}
+        self.proxies = None
+        self.calls = 0
+        self.set_markets({symbol: {
+            'id': symbol.replace('/', '-'), 'symbol': symbol, 'base': symbol.split('/')[0], 'quote': symbol.split('/')[-1],
+            'type': 'spot', 'spot': True, 'active': True,
+        } for symbol in frames})
+
+    def load_markets(self, reload: bool = False, params: dict | None = None) -> dict:
+        return self.markets
+
+    def set_markets(self, markets: dict, currencies: dict | None = None) -> dict:
+        self.markets = dict(markets)
+        self.markets_by_id = {market['id']: symbol for symbol, market in self.markets.items()}
+        self.currencies = currencies or {}
+        return self.markets
+
+    def milliseconds(self) -> int:
+        return int(self.clock.time() * 1000)
+
+    def parse_timeframe(self, timeframe: str) -> int:
+        return TIMEFRAME_MS[timeframe] // 1000
+
+    def parse8601(self, text: str) -> int:
+        return int(pd.Timestamp(text).value // 1_000_000)
+
+    def iso8601(self, timestamp: int) -> str:
+        return pd.Timestamp(timestamp, unit='ms').isoformat()
+
+    def _bars(self, symbol: str, timeframe_ms: int) -> np.ndarray:
+        key = (symbol, timeframe_ms)
+        if key not in self.aggregated:
+            self.aggregated[key] = aggregate_rows(self.rows[symbol], timeframe_ms)
+        return self.aggregated[key]
+
+    def visible(self, symbol: str, timeframe: str) -> tuple:
+        """ (closed bars, forming bar or None) of `symbol` at `timeframe` as of the clock. """
+        now = self.milliseconds()
+        timestamps = self.timestamps[symbol]
+        closed_base = int(np.searchsorted(timestamps, now - self.base_ms, side='right'))
+        timeframe_ms = max(TIMEFRAME_MS[timeframe], self.base_ms)
+        if timeframe_ms == self.base_ms:
+            return self.rows[symbol][:closed_base], None
+
+        forming_open = now - now % timeframe_ms
+        bars = self._bars(symbol, timeframe_ms)
+        closed = bars[:int(np.searchsorted(bars[:, 0], forming_open, side='left'))]
+        first_forming = int(np.searchsorted(timestamps, forming_open, side='left'))
+        forming = aggregate_rows(self.rows[symbol][first_forming:closed_base], timeframe_ms) if first_forming < closed_base else None
+        return closed, forming
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: int | None = None, limit: int | None = None, params: dict | None = None) -> list:
+        self.calls += 1
+        symbol = self.markets_by_id.get(symbol, symbol)
+        if symbol not in self.rows:
+            raise KeyError(f"ReplayExchange: No recorded candles for {symbol}.")
+        limit = min(limit or MAX_PAGE, MAX_PAGE)
+        closed, forming = self.visible(symbol, timeframe)
+        extra = [] if forming is None else forming.tolist()
+
+        if since is None:
+            start = max(0, len(closed) + len(extra) - limit)
+        else:
+            start = int(np.searchsorted(closed[:, 0], since, side='left'))
+        page = closed[start:start + limit].tolist()
+        if len(page) < limit and extra and (since is None or extra[0][0] >= since):
+            page += extra
+        return page
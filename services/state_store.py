@@ -0,0 +1,160 @@
+import copy
+import json
+import sqlite3
+import threading
+
+from services.clock import get_clock
+
+HUNTING = "HUNTING"
+WATCHING_FOR_ENTRY = "WATCHING_FOR_ENTRY"
+IN_TRADE = "IN_TRADE"
+STATES = (HUNTING, WATCHING_FOR_ENTRY, IN_TRADE)
+
+class StrategyStateStore:
+    """
+    Per-symbol strategy state shared by the schedulers and the trade managers.
+
+    Reads are served from memory. Every transition is committed to SQLite (WAL mode) in one
+    transaction that updates `current_state` and appends to the `transitions` journal, so a
+    crash never leaves a half-written state behind and the history of a symbol can be audited.
+
+    One schema for every component:
+        {"state": "HUNTING" | "WATCHING_FOR_ENTRY" | "IN_TRADE",
+         "bias_details": {...} | None,   # set while WATCHING_FOR_ENTRY (and kept while IN_TRADE)
+         "trade_details": {...} | None}  # set while IN_TRADE; uses the 'bias' key for the direction
+    """
+    def __init__(self, db_path: str = 'strategy_state.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._states = {}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS current_state (
+                symbol TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                bias_details TEXT,
+                trade_details TEXT,
+                updated_at TEXT NOT NULL
+            )""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS transitions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT NOT NULL,
+                from_state TEXT,
+                to_state TEXT NOT NULL,
+                bias_details TEXT,
+                trade_details TEXT,
+                created_at TEXT NOT NULL
+            )""")
+        self._restore()
+
+    def _restore(self):
+        rows = self._conn.execute("SELECT symbol, state, bias_details, trade_details FROM current_state").fetchall()
+        for symbol, state, bias_details, trade_details in rows:
+            self._states[symbol] = {
+                "state": state,
+                "bias_details": json.loads(bias_details) if bias_details else None,
+                "trade_details": json.loads(trade_details) if trade_details else None,
+            }
+        print(f"StrategyStateStore: Restored {len(rows)} symbol state(s) from '{self.db_path}'.")
+
+    @staticmethod
+    def legacy_status_file(symbol: str) -> str:
+        return f"{symbol.replace('/', '_').lower()}_status.json"
+
+    def _import_legacy(self, symbol: str) -> dict:
+        """ Converts an old <symbol>_status.json (either schema) into a store entry. """
+        status_file = self.legacy_status_file(symbol)
+        try:
+            with open(status_file, 'r') as f:
+                status = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"state": HUNTING, "bias_details": None, "trade_details": None}
+
+        if status.get('state') in STATES:
+            entry = {"state": status['state'], "bias_details": status.get('bias_details'), "trade_details": status.get('trade_details')}
+        elif status.get('is_trade_open') and status.get('current_trade'):
+            trade = dict(status['current_trade'])
+            trade.setdefault('bias', trade.pop('decision', None))
+            entry = {"state": IN_TRADE, "bias_details": None, "trade_details": trade}
+        else:
+            entry = {"state": HUNTING, "bias_details": None, "trade_details": None}
+        print(f"StrategyStateStore ({symbol}): Migrated legacy '{status_file}' as {entry['state']}.")
+        return entry
+
+    def get(self, symbol: str) -> dict:
+        """ Returns a copy of the symbol's state. Unknown symbols start HUNTING (or from their legacy status file). """
+        with self._lock:
+            if symbol not in self._states:
+                entry = self._import_legacy(symbol)
+                self._write(symbol, None, entry)
+            return copy.deepcopy(self._states[symbol])
+
+    def get_state(self, symbol: str) -> str:
+        return self.get(symbol)['state']
+
+    def get_open_trade(self, symbol: str) -> dict | None:
+        entry = self.get(symbol)
+        return entry['trade_details'] if entry['state'] == IN_TRADE else None
+
+    def transition(self, symbol: str, state: str, bias_details: dict | None = None, trade_details: dict | None = None, expected_state: str | None = None) -> bool:
+        """
+        Moves `symbol` to `state` and persists it before returning.
+        With `expected_state`, the transition only happens if the symbol is still in that state,
+        which lets concurrent callers (e.g. the tick stream and the REST poll) close a trade only once.
+        """
+        if state not in STATES:
+            raise ValueError(f"Unknown strategy state '{state}'")
+        entry = {"state": state, "bias_details": copy.deepcopy(bias_details), "trade_details": copy.deepcopy(trade_details)}
+        with self._lock:
+            previous = self._states.get(symbol)
+            if previous is None:
+                previous = self._import_legacy(symbol)
+            if expected_state is not None and previous['state'] != expected_state:
+                return False
+            self._write(symbol, previous['state'], entry)
+            return True
+
+    def _write(self, symbol: str, from_state: str | None, entry: dict):
+        """ Commits `entry` and its journal row in one transaction, then updates memory. Caller holds the lock. """
+        now = get_clock().now().isoformat()
+        bias_json = json.dumps(entry['bias_details'], default=float) if entry['bias_details'] is not None else None
+        trade_json = json.dumps(entry['trade_details'], default=float) if entry['trade_details'] is not None else None
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO current_state (symbol, state, bias_details, trade_details, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (symbol, entry['state'], bias_json, trade_json, now))
+            self._conn.execute(
+                "INSERT INTO transitions (symbol, from_state, to_state, bias_details, trade_details, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (symbol, from_state, entry['state'], bias_json, trade_json, now))
+        self._states[symbol] = entry
+
+    def history(self, symbol: str, limit: int = 50) -> list:
+        """ The most recent transitions of `symbol`, newest first. """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT from_state, to_state, bias_details, trade_details, created_at FROM transitions WHERE symbol = ? ORDER BY id DESC LIMIT ?",
+                (symbol, limit)).fetchall()
+        return [
+            {"from_state": f, "to_state": t, "bias_details": json.loads(b) if b else None,
+             "trade_details": json.loads(d) if d else None, "created_at": c}
+            for f, t, b, d, c in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_state_store(db_path: str = 'strategy_state.db') -> StrategyStateStore:
+    """ The process-wide state store (created on first use). """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StrategyStateStore(db_path)
+        return _store
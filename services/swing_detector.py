@@ -0,0 +1,264 @@
+import bisect
+import numpy as np
+import pandas as pd
+
+class _PivotSeries:
+    """
+    Local maxima of one series (the highs, or the negated lows) found as candles arrive, with
+    the bookkeeping find_peaks needs to filter them later: the plateau each peak sits on and the
+    previous strictly higher value (which bounds the left side of its prominence).
+    """
+    def __init__(self, capacity: int):
+        self.values = np.empty(capacity + 1) # +1 slot for a provisional (still forming) candle
+        self.prev_greater = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+        self._stack = [] # Positions with strictly decreasing values, for prev_greater
+        self._rise_start = None # First position of the current plateau if it was entered from below
+        self.peaks = [] # Plateau midpoint of every local maximum, ascending
+        self.rise_starts = [] # First position of each peak's plateau
+        self._left_min = {} # peak -> min over (prev_greater, peak]
+        self._right_min = {} # peak -> min over [peak, next strictly higher value)
+
+    def append(self, value: float):
+        i = self.size
+        while self._stack and self.values[self._stack[-1]] <= value:
+            self._stack.pop()
+        self.prev_greater[i] = self._stack[-1] if self._stack else -1
+        self._stack.append(i)
+        self.values[i] = value
+        self.size += 1
+
+        if i == 0:
+            return
+        previous = self.values[i - 1]
+        if value > previous:
+            self._rise_start = i
+        elif value < previous:
+            if self._rise_start is not None:
+                self.peaks.append((self._rise_start + i - 1) // 2)
+                self.rise_starts.append(self._rise_start)
+            self._rise_start = None
+
+    def pending_peak(self, provisional: float | None) -> tuple | None:
+        """ The (peak, rise_start) the provisional candle would complete, if any. """
+        if provisional is None or self._rise_start is None or self.size == 0 or not provisional < self.values[self.size - 1]:
+            return None
+        return (self._rise_start + self.size - 1) // 2, self._rise_start
+
+    def prominence(self, peak: int, window_start: int, end: int) -> float:
+        """ scipy's peak prominence of `peak` within values[window_start:end] (wlen=None). """
+        values = self.values
+        left_bound = self.prev_greater[peak] + 1
+        if left_bound >= window_start:
+            left_min = self._left_min.get(peak)
+            if left_min is None:
+                left_min = self._left_min[peak] = values[left_bound:peak + 1].min()
+        else:
+            left_min = values[window_start:peak + 1].min()
+
+        right_min = self._right_min.get(peak)
+        if right_min is None:
+            right = values[peak:end]
+            higher = np.flatnonzero(right > values[peak])
+            if len(higher):
+                right_min = right[:higher[0]].min()
+                if peak + higher[0] < self.size: # Only cache what closed candles decided
+                    self._right_min[peak] = right_min
+            else:
+                right_min = right.min()
+        return values[peak] - max(left_min, right_min)
+
+    def trim(self, count: int):
+        """ Forgets the oldest `count` candles. """
+        keep = self.size - count
+        self.values[:keep] = self.values[count:self.size]
+        self.prev_greater[:keep] = np.maximum(self.prev_greater[count:self.size] - count, -1)
+        self.size = keep
+        self._stack = [p - count for p in self._stack if p >= count]
+        if self._rise_start is not None:
+            self._rise_start -= count
+        first = bisect.bisect_left(self.rise_starts, count)
+        self.peaks = [p - count for p in self.peaks[first:]]
+        self.rise_starts = [s - count for s in self.rise_starts[first:]]
+        self._left_min = {p - count: v for p, v in self._left_min.items() if p - count >= 0 and self.prev_greater[p - count] >= 0}
+        self._right_min = {p - count: v for p, v in self._right_min.items() if p >= count}
+
+class SwingDetector:
+    """
+    Incremental equivalent of running scipy.signal.find_peaks(high, distance=5, prominence=P)
+    and find_peaks(-low, ...) over a window of H1 candles, as V2's pullback strategy does.
+
+    Candles are fed once with update(); local maxima are confirmed as soon as a lower candle
+    follows them. The distance rule is resolved per cluster of nearby peaks and prominences
+    are computed only for the peaks a lookup actually visits, so a cycle no longer re-scans
+    the whole history. The window start, the prominence threshold and the still-forming last
+    candle are query arguments, so results match find_peaks over that exact window.
+    """
+    def __init__(self, distance: int = 5, max_history: int = 10000):
+        self.distance = int(np.ceil(distance))
+        self.max_history = max_history
+        self.reset()
+
+    def reset(self):
+        capacity = 2 * self.max_history
+        self.timestamps = np.empty(capacity, dtype='datetime64[ns]')
+        self.highs = _PivotSeries(capacity)
+        self.lows = _PivotSeries(capacity) # Negated lows, so swing lows are peaks too
+        self.size = 0
+
+    @property
+    def last_timestamp(self) -> pd.Timestamp | None:
+        return pd.Timestamp(self.timestamps[self.size - 1]) if self.size else None
+
+    def update(self, timestamp, high: float, low: float):
+        """ Adds one closed candle. """
+        if self.size == len(self.timestamps):
+            drop = self.size - self.max_history
+            self.timestamps[:self.max_history] = self.timestamps[drop:self.size]
+            self.highs.trim(drop)
+            self.lows.trim(drop)
+            self.size = self.max_history
+        self.timestamps[self.size] = np.datetime64(pd.Timestamp(timestamp).tz_localize(None), 'ns')
+        self.highs.append(float(high))
+        self.lows.append(-float(low))
+        self.size += 1
+
+    def update_frame(self, df: pd.DataFrame):
+        """ Feeds the rows of `df` (high/low columns) that are newer than the last candle seen. """
+        last = self.last_timestamp
+        first = 0 if last is None else int(df.index.searchsorted(last, side='right'))
+        for timestamp, high, low in zip(df.index[first:], df['high'].to_numpy()[first:], df['low'].to_numpy()[first:]):
+            self.update(timestamp, high, low)
+
+    def sync(self, df: pd.DataFrame) -> tuple:
+        """
+        Brings the detector up to date with a live frame whose last row is still forming: the closed
+        rows it has not seen are fed, and it is rebuilt from `df` if its candles do not line up with
+        the frame (restart, missing candles, window longer than max_history).
+        Returns the forming candle as the `provisional` argument for the lookups.
+        """
+        closed = df.iloc[:-1]
+        if len(closed):
+            self.update_frame(closed)
+            start = self._position(closed.index[0])
+            if start >= self.size or self.timestamps[start] != np.datetime64(closed.index[0], 'ns') or self.size - start != len(closed):
+                print(f"SwingDetector: Stored candles do not line up with the frame. Rebuilding from {len(closed)} candles.")
+                self.reset()
+                self.update_frame(closed)
+        last = df.iloc[-1]
+        return df.index[-1], last['high'], last['low']
+
+    def _position(self, timestamp) -> int:
+        """ Index of the first stored candle at or after `timestamp`. """
+        return int(np.searchsorted(self.timestamps[:self.size], np.datetime64(pd.Timestamp(timestamp).tz_localize(None), 'ns')))
+
+    def _select_by_distance(self, peaks: list, priority_order) -> list:
+        """ scipy's _select_by_peak_distance on one cluster of peaks (priority_order: argsort of their heights). """
+        keep = [True] * len(peaks)
+        for j in priority_order[::-1]:
+            if not keep[j]:
+                continue
+            k = j - 1
+            while k >= 0 and peaks[j] - peaks[k] < self.distance:
+                keep[k] = False
+                k -= 1
+            k = j + 1
+            while k < len(peaks) and peaks[k] - peaks[j] < self.distance:
+                keep[k] = False
+                k += 1
+        return [p for p, kept in zip(peaks, keep) if kept]
+
+    def _swings_backward(self, series: _PivotSeries, min_prominence: float, window_start: int, provisional: float | None):
+        """ Positions of the find_peaks results in the window, newest first, computed lazily. """
+        end = series.size + (provisional is not None)
+        if provisional is not None:
+            series.values[series.size] = provisional
+
+        candidates = []
+        pending = series.pending_peak(provisional)
+        first = bisect.bisect_left(series.rise_starts, window_start + 1) # The rise must start inside the window
+        i = len(series.peaks) - 1
+        if pending is not None and pending[1] < window_start + 1:
+            pending = None
+        if pending is not None:
+            candidates.append(pending[0])
+        if not candidates and i >= first:
+            candidates.append(series.peaks[i])
+            i -= 1
+
+        window_rank = None
+        def priority_order(cluster):
+            nonlocal window_rank
+            heights = series.values[cluster]
+            if len(set(heights.tolist())) == len(cluster):
+                return np.argsort(heights)
+            # Equal heights: scipy's order comes from argsort over every peak in the window, so do the same
+            if window_rank is None:
+                window_peaks = series.peaks[first:] + ([pending[0]] if pending is not None else [])
+                order = np.argsort(series.values[window_peaks])
+                window_rank = {window_peaks[k]: rank for rank, k in enumerate(order)}
+            return np.argsort([window_rank[p] for p in cluster])
+
+        # Walk back one distance cluster at a time
+        while candidates:
+            cluster = candidates
+            while i >= first and cluster[-1] - series.peaks[i] < self.distance:
+                cluster.append(series.peaks[i])
+                i -= 1
+            cluster.reverse()
+            for peak in reversed(self._select_by_distance(cluster, priority_order(cluster))):
+                if series.prominence(peak, window_start, end) >= min_prominence:
+                    yield peak
+            candidates = []
+            if i >= first:
+                candidates.append(series.peaks[i])
+                i -= 1
+
+    def swing_points(self, min_prominence: float, window_start=None, provisional: tuple | None = None) -> tuple:
+        """
+        All swing highs and lows of the window as (high_positions, low_positions) arrays of timestamps,
+        i.e. what find_peaks returns over the window (mainly for verification).
+        provisional: (timestamp, high, low) of the still-forming candle, or None.
+        """
+        window = self._position(window_start) if window_start is not None else 0
+        prov_high, prov_low = (provisional[1], -provisional[2]) if provisional is not None else (None, None)
+        highs = sorted(self._swings_backward(self.highs, min_prominence, window, prov_high))
+        lows = sorted(self._swings_backward(self.lows, min_prominence, window, prov_low))
+        return self.timestamps[highs], self.timestamps[lows]
+
+    def last_swing_pair(self, trend: str, min_prominence: float, window_start=None, lookup_start=None, lookup_end=None, provisional: tuple | None = None) -> dict | None:
+        """
+        The swing pair V2's pullback strategy trades from:
+          trend "up":   the last swing high, and the last swing low before it.
+          trend "down": the last swing low, and the last swing high before it.
+        Swings are detected over candles from `window_start` (plus the provisional candle) and only
+        those with lookup_start <= time < lookup_end are eligible.
+        Returns {"swing_high", "swing_low", "high_time", "low_time"} or None.
+        """
+        window = self._position(window_start) if window_start is not None else 0
+        start = max(window, self._position(lookup_start)) if lookup_start is not None else window
+        end = self._position(lookup_end) if lookup_end is not None else self.size + 1
+        prov_high, prov_low = (provisional[1], -provisional[2]) if provisional is not None else (None, None)
+
+        def last_before(series, provisional_value, before):
+            for peak in self._swings_backward(series, min_prominence, window, provisional_value):
+                if peak < start:
+                    return None
+                if peak < before:
+                    return peak
+            return None
+
+        if trend == "up":
+            high = last_before(self.highs, prov_high, end)
+            low = last_before(self.lows, prov_low, high) if high is not None else None
+        else:
+            low = last_before(self.lows, prov_low, end)
+            high = last_before(self.highs, prov_high, low) if low is not None else None
+        if high is None or low is None:
+            return None
+        return {
+            "swing_high": self.highs.values[high],
+            "swing_low": -self.lows.values[low],
+            "high_time": pd.Timestamp(self.timestamps[high]),
+            "low_time": pd.Timestamp(self.timestamps[low]),
+        }
@@ -1,22 +1,29 @@
-import telegram
 import pandas as pd
 from datetime import datetime
 
+from services.alert_dispatcher import AlertDispatcher, TELEGRAM_API_URL
+
 class TelegramService:
-    def __init__(self, bot_token: str, channel_id: str):
+    def __init__(self, bot_token: str, channel_id: str, base_url: str = TELEGRAM_API_URL, spill_path: str = 'telegram_spill.jsonl'):
+        self.channel_id = channel_id
+        self.dispatcher = None
         try:
-            self.bot = telegram.Bot(token=bot_token)
-            self.channel_id = channel_id
+            # Sending happens on the dispatcher's worker thread so the scheduling loop never waits on Telegram
+            self.dispatcher = AlertDispatcher(bot_token, base_url=base_url, spill_path=spill_path)
+            self.dispatcher.start()
             print("TelegramService: Bot initialized successfully.")
         except Exception as e:
-            self.bot = None
+            print(f"TelegramService: Could not start the alert dispatcher: {e}")
 
     def send_text_message(self, message: str):
-        if not self.bot: return
-        try:
-            self.bot.send_message(chat_id=self.channel_id, text=message, parse_mode='Markdown')
-        except Exception as e:
-            print(f"TelegramService: An error occurred while sending message: {e}")
+        """ Queues the message for delivery and returns immediately. """
+        if not self.dispatcher: return
+        self.dispatcher.enqueue(self.channel_id, message, parse_mode='Markdown')
+
+    def close(self, timeout: float = 5.0):
+        """ Waits up to `timeout` seconds for queued alerts; anything left is kept in the spill file. """
+        if self.dispatcher:
+            self.dispatcher.stop(timeout)
 
     def send_bias_alert(self, bias_details: dict, symbol: str):
         bias = bias_details['bias']
@@ -31,7 +38,7 @@ class TelegramService:
             "_No action is needed. A final execution alert will be sent if an entry is confirmed._"
         )
         self.send_text_message(message)
-        print(f"TelegramService: Successfully sent H4 Bias alert for {symbol}.")
+        print(f"TelegramService: Queued H4 Bias alert for {symbol}.")
 
     def send_execution_alert(self, trade_details: dict, symbol: str):
         decision = trade_details['bias']
@@ -54,4 +61,4 @@ class TelegramService:
             f"🔴 **Stop Loss:** `{sl}`"
         )
         self.send_text_message(message)
-        print(f"TelegramService: Successfully sent final execution alert for {symbol}.")
\ No newline at end of file
+        print(f"TelegramService: Queued final execution alert for {symbol}.")
\ No newline at end of file
@@ -0,0 +1,218 @@
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+from services.clock import get_clock
+
+TRADE_COLUMNS = ['symbol', 'bias', 'signal_time', 'entry_time', 'entry', 'sl', 'tp1', 'tp2', 'tp3',
+                 'outcome', 'exit_time', 'exit_price', 'pnl', 'return_pct']
+STATS_COLUMNS = ['trades', 'wins', 'losses', 'win_rate', 'expectancy', 'avg_return_pct', 'total_pnl', 'total_return_pct', 'max_drawdown_pct']
+
+def _to_ms(value) -> int | None:
+    if value is None or pd.isna(value):
+        return None
+    return pd.Timestamp(value).value // 1_000_000
+
+def _ms_column(values: pd.Series) -> list:
+    """ _to_ms for a whole datetime column (NaT becomes None). """
+    times = pd.to_datetime(values)
+    ms = (times.astype('int64') // 1_000_000).astype(object)
+    return ms.where(times.notna(), None).tolist()
+
+def trade_stats(closed: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-symbol (and 'ALL') statistics of closed trades with symbol, exit_time, pnl and return_pct columns.
+    expectancy is the mean PnL per trade; max_drawdown_pct is the deepest fall of the summed
+    return_pct from its running peak, in exit order.
+    """
+    if closed.empty:
+        return pd.DataFrame(columns=STATS_COLUMNS)
+    closed = closed.sort_values(['symbol', 'exit_time'], kind='stable', ignore_index=True)
+    returns = closed['return_pct'].to_numpy(dtype=float)
+    wins = closed['pnl'].to_numpy(dtype=float) > 0
+
+    grouped = closed.assign(win=wins).groupby('symbol', sort=True)
+    stats = pd.DataFrame({
+        'trades': grouped.size(),
+        'wins': grouped['win'].sum(),
+        'expectancy': grouped['pnl'].mean(),
+        'avg_return_pct': grouped['return_pct'].mean(),
+        'total_pnl': grouped['pnl'].sum(),
+        'total_return_pct': grouped['return_pct'].sum(),
+    })
+    equity = grouped['return_pct'].cumsum()
+    peak = np.maximum(equity.groupby(closed['symbol']).cummax(), 0.0)
+    stats['max_drawdown_pct'] = (peak - equity).groupby(closed['symbol']).max()
+
+    # The combined curve: all symbols' trades in exit order
+    order = np.argsort(closed['exit_time'].to_numpy(), kind='stable')
+    equity_all = np.cumsum(returns[order])
+    stats.loc['ALL'] = {
+        'trades': len(closed), 'wins': int(wins.sum()), 'expectancy': closed['pnl'].mean(),
+        'avg_return_pct': returns.mean(), 'total_pnl': closed['pnl'].sum(), 'total_return_pct': returns.sum(),
+        'max_drawdown_pct': float((np.maximum(np.maximum.accumulate(equity_all), 0.0) - equity_all).max()),
+    }
+    stats['wins'] = stats['wins'].astype(int)
+    stats['trades'] = stats['trades'].astype(int)
+    stats['losses'] = stats['trades'] - stats['wins']
+    stats['win_rate'] = stats['wins'] / stats['trades']
+    return stats[STATS_COLUMNS]
+
+class TradeJournal:
+    """
+    Append-only journal of trade entries and exits in SQLite (WAL mode), shared by the live bot
+    and backtests (`source` tells them apart: 'live', or a label per backtest run).
+
+    An entry row is written when a trade opens and an exit row (with its PnL) when it closes;
+    rows are never updated. Times are stored as UTC epoch milliseconds and prices as REAL, so
+    the query helpers read plain numeric columns and compute the statistics with pandas/NumPy.
+    """
+    def __init__(self, db_path: str = 'trade_journal.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                bias TEXT NOT NULL,
+                signal_time INTEGER,
+                entry_time INTEGER NOT NULL,
+                entry REAL NOT NULL,
+                sl REAL NOT NULL,
+                tp1 REAL,
+                tp2 REAL,
+                tp3 REAL
+            )""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS exits (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trade_id INTEGER NOT NULL UNIQUE REFERENCES entries(id),
+                source TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                exit_time INTEGER NOT NULL,
+                exit_price REAL NOT NULL,
+                pnl REAL NOT NULL,
+                return_pct REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_source_symbol ON entries (source, symbol)")
+        self._closed = {} # (source, symbol) -> (last exit id read, closed trades frame); rows are never updated, so only newer exits are fetched
+        print(f"TradeJournal: Opened '{self.db_path}'.")
+
+    def record_entry(self, symbol: str, trade: dict, signal_time=None, entry_time=None, source: str = 'live') -> int:
+        """ Journals an opened trade (a trade_details dict with bias/entry/sl/tp1-3) and returns its trade id. """
+        row = (source, symbol, trade['bias'], _to_ms(signal_time), _to_ms(entry_time) or int(get_clock().time() * 1000),
+               float(trade['entry']), float(trade['sl']), *(float(trade[k]) if trade.get(k) is not None else None for k in ('tp1', 'tp2', 'tp3')))
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO entries (source, symbol, bias, signal_time, entry_time, entry, sl, tp1, tp2, tp3) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        print(f"TradeJournal: Logged new {trade['bias']} entry for {symbol} at {trade['entry']} (trade {cursor.lastrowid}).")
+        return cursor.lastrowid
+
+    def record_exit(self, trade_id: int, outcome: str, exit_price: float, exit_time=None) -> float | None:
+        """ Journals the close of trade `trade_id` and returns its PnL (None if unknown or already closed). """
+        with self._lock:
+            found = self._conn.execute("SELECT source, symbol, bias, entry FROM entries WHERE id = ?", (trade_id,)).fetchone()
+            if found is None:
+                print(f"TradeJournal: Unknown trade {trade_id}. Exit not recorded.")
+                return None
+            source, symbol, bias, entry = found
+            pnl = (float(exit_price) - entry) * (1.0 if bias == "BUY" else -1.0)
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO exits (trade_id, source, symbol, outcome, exit_time, exit_price, pnl, return_pct) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (trade_id, source, symbol, outcome, _to_ms(exit_time) or int(get_clock().time() * 1000), float(exit_price), pnl, 100 * pnl / entry))
+        if cursor.rowcount == 0:
+            return None
+        print(f"TradeJournal: Trade {trade_id} closed at {exit_price} ({outcome}), PnL {pnl:.4f}.")
+        return pnl
+
+    def record_trades(self, trades: pd.DataFrame, source: str) -> int:
+        """ Bulk-journals a trade list in the BacktestService format (open trades get no exit row). Returns the count. """
+        if trades.empty:
+            return 0
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE") # Holds the write lock from reading MAX(id) to the last insert
+            first_id = (self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM entries").fetchone()[0]) + 1
+            ids = np.arange(first_id, first_id + len(trades))
+            self._conn.executemany(
+                "INSERT INTO entries (id, source, symbol, bias, signal_time, entry_time, entry, sl, tp1, tp2, tp3) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                zip(ids.tolist(), [source] * len(trades), trades['symbol'].tolist(), trades['bias'].tolist(),
+                    _ms_column(trades['signal_time']), _ms_column(trades['entry_time']),
+                    *(trades[c].astype(float).tolist() for c in ('entry', 'sl', 'tp1', 'tp2', 'tp3'))))
+            closed = (trades['outcome'] != "OPEN").to_numpy()
+            done = trades[closed]
+            self._conn.executemany(
+                "INSERT INTO exits (trade_id, source, symbol, outcome, exit_time, exit_price, pnl, return_pct) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                zip(ids[closed].tolist(), [source] * len(done), done['symbol'].tolist(), done['outcome'].tolist(), _ms_column(done['exit_time']),
+                    *(done[c].astype(float).tolist() for c in ('exit_price', 'pnl', 'return_pct'))))
+        print(f"TradeJournal: Journaled {len(trades)} trades ({int(closed.sum())} closed) as '{source}'.")
+        return len(trades)
+
+    @staticmethod
+    def _filter(source: str | None, symbol: str | None, alias: str) -> tuple:
+        conditions, params = [], []
+        if source is not None:
+            conditions.append(f"{alias}.source = ?")
+            params.append(source)
+        if symbol is not None:
+            conditions.append(f"{alias}.symbol = ?")
+            params.append(symbol)
+        return conditions, params
+
+    def trades(self, source: str | None = 'live', symbol: str | None = None) -> pd.DataFrame:
+        """ Every journaled trade in the BacktestService trade-list format (open trades have outcome 'OPEN'). """
+        conditions, params = self._filter(source, symbol, 'e')
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT e.id, e.symbol, e.bias, e.signal_time, e.entry_time, e.entry, e.sl, e.tp1, e.tp2, e.tp3, "
+                "COALESCE(x.outcome, 'OPEN'), x.exit_time, x.exit_price, x.pnl, x.return_pct "
+                f"FROM entries e LEFT JOIN exits x ON x.trade_id = e.id{where} ORDER BY e.id", params).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=['id'] + TRADE_COLUMNS, index='id')
+        for column in ('signal_time', 'entry_time', 'exit_time'):
+            df[column] = pd.to_datetime(df[column].astype('Int64'), unit='ms').astype('datetime64[ns]')
+        return df
+
+    def open_trades(self, source: str | None = 'live', symbol: str | None = None) -> pd.DataFrame:
+        trades = self.trades(source, symbol)
+        return trades[trades['outcome'] == "OPEN"]
+
+    def closed_trades(self, source: str | None = 'live', symbol: str | None = None) -> pd.DataFrame:
+        """ symbol, exit_time (epoch ms), pnl and return_pct of every closed trade, in the order they were journaled. """
+        conditions, params = self._filter(source, symbol, 'x')
+        with self._lock:
+            last_id, cached = self._closed.get((source, symbol), (0, None))
+            rows = self._conn.execute(
+                f"SELECT id, symbol, exit_time, pnl, return_pct FROM exits x WHERE {' AND '.join(['x.id > ?'] + conditions)} ORDER BY id",
+                [last_id] + params).fetchall()
+            if rows or cached is None:
+                fresh = pd.DataFrame.from_records(rows, columns=['id', 'symbol', 'exit_time', 'pnl', 'return_pct'])
+                last_id = int(fresh['id'].iloc[-1]) if rows else last_id
+                fresh = fresh.drop(columns='id')
+                cached = fresh if cached is None or cached.empty else pd.concat([cached, fresh], ignore_index=True)
+                self._closed[(source, symbol)] = (last_id, cached)
+        return cached
+
+    def stats(self, source: str | None = 'live', symbol: str | None = None) -> pd.DataFrame:
+        """ Per-symbol (and 'ALL') win rate, expectancy and drawdown of the closed trades (see trade_stats). """
+        return trade_stats(self.closed_trades(source, symbol))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_trade_journal(db_path: str = 'trade_journal.db') -> TradeJournal:
+    """ The process-wide trade journal (created on first use). """
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = TradeJournal(db_path)
+        return _journal
@@ -1,63 +1,137 @@
 import pandas as pd
-import json
+import threading
+
+from services.state_store import HUNTING, IN_TRADE
 
 class TradeManagerService:
-    def __init__(self, data_svc, telegram_svc, trade_log_file: str, status_file: str, symbol: str):
+    def __init__(self, data_svc, telegram_svc, journal, state_store, symbol: str, market_stream=None, stream_max_age: float = 30.0):
         self.data_svc = data_svc
         self.telegram_svc = telegram_svc
-        self.trade_log_file = trade_log_file
-        self.status_file = status_file
+        self.journal = journal # TradeJournal receiving the exit of every closed trade
+        self.state_store = state_store # StrategyStateStore shared with the schedulers
         self.symbol = symbol
+        # Optional MarketStreamService: SL/TP are then checked on every tick, REST polling is the fallback
+        self.market_stream = market_stream
+        self.stream_max_age = stream_max_age
+        self._streamed_trade = None
+        self._tick_high = None
+        self._tick_low = None
+        self._lock = threading.Lock()
         print(f"TradeManagerService for H4 {self.symbol} Initialized.")
 
     def check_open_trade(self):
-        try:
-            with open(self.status_file, 'r') as f:
-                status = json.load(f)
-        except FileNotFoundError:
-            return
-
-        if not status.get('is_trade_open', False):
-            return
+        trade = self.get_open_trade()
+        if trade is None or self.is_streaming(trade):
+            return # Nothing open, or ticks are already checking this trade
 
         print(f"TradeManagerService ({self.symbol}): Open trade detected. Checking status...")
-        trade = status['current_trade']
         
         # We can fetch a faster timeframe like M1 for more precise checking
         latest_data = self.data_svc.get_market_data(symbol=self.symbol, timeframe='1m', limit=2)
+        self.evaluate_trade(trade, latest_data)
+
+    def get_open_trade(self) -> dict | None:
+        return self.state_store.get_open_trade(self.symbol)
+
+    def is_streaming(self, trade: dict | None) -> bool:
+        """
+        Makes sure the open trade is watched on the market stream (if there is one) and returns True
+        while ticks are arriving, i.e. when the REST check can be skipped.
+        """
+        if trade is None:
+            self._stop_streaming()
+            return False
+        if self.market_stream is None:
+            return False
+        self._start_streaming(trade)
+        if self.market_stream.is_live(self.symbol, self.stream_max_age):
+            return True
+        print(f"TradeManagerService ({self.symbol}): No recent ticks from the stream. Falling back to REST.")
+        return False
+
+    def evaluate_trade(self, trade: dict, latest_data: pd.DataFrame | None):
+        """ Checks the latest candle of already fetched market data against the trade's SL/TP levels. """
         if latest_data is None or latest_data.empty:
             print(f"TradeManagerService ({self.symbol}): Could not fetch latest market data to check trade.")
             return
             
         current_high = latest_data.iloc[-1]['high']
         current_low = latest_data.iloc[-1]['low']
-        
+
+        # Include any extremes already seen on the stream for this trade
+        with self._lock:
+            if self._streamed_trade == trade and self._tick_high is not None:
+                current_high = max(current_high, self._tick_high)
+                current_low = min(current_low, self._tick_low)
+
+        outcome, exit_price = self._check_levels(trade, current_high, current_low)
+        if outcome != "OPEN":
+            self._close_trade(trade, outcome, exit_price)
+
+    def on_tick(self, price: float, timestamp: float):
+        """ Stream callback: updates the trade's rolling high/low and checks SL/TP immediately. """
+        with self._lock:
+            trade = self._streamed_trade
+            if trade is None:
+                return
+            self._tick_high = price if self._tick_high is None else max(self._tick_high, price)
+            self._tick_low = price if self._tick_low is None else min(self._tick_low, price)
+            high, low = self._tick_high, self._tick_low
+
+        outcome, exit_price = self._check_levels(trade, high, low)
+        if outcome != "OPEN":
+            self._close_trade(trade, outcome, exit_price)
+
+    def _start_streaming(self, trade: dict):
+        with self._lock:
+            if self._streamed_trade == trade:
+                return
+            self._streamed_trade = trade
+            self._tick_high = self._tick_low = None
+        self.market_stream.watch(self.symbol, self.on_tick)
+        print(f"TradeManagerService ({self.symbol}): Watching live ticks for the open trade.")
+
+    def _stop_streaming(self):
+        if self.market_stream is None:
+            return
+        with self._lock:
+            if self._streamed_trade is None:
+                return
+            self._streamed_trade = None
+        self.market_stream.unwatch(self.symbol)
+
+    @staticmethod
+    def _check_levels(trade: dict, current_high: float, current_low: float) -> tuple:
         outcome, exit_price = "OPEN", None
 
-        if trade['decision'] == 'BUY':
+        if trade['bias'] == 'BUY':
             if current_low <= trade['sl']: outcome, exit_price = "SL", trade['sl']
             elif current_high >= trade.get('tp3', float('inf')): outcome, exit_price = "TP3", trade['tp3']
             elif current_high >= trade.get('tp2', float('inf')): outcome, exit_price = "TP2", trade['tp2']
             elif current_high >= trade.get('tp1', float('inf')): outcome, exit_price = "TP1", trade['tp1']
-        elif trade['decision'] == 'SELL':
+        elif trade['bias'] == 'SELL':
             if current_high >= trade['sl']: outcome, exit_price = "SL", trade['sl']
             elif current_low <= trade.get('tp3', float('-inf')): outcome, exit_price = "TP3", trade['tp3']
             elif current_low <= trade.get('tp2', float('-inf')): outcome, exit_price = "TP2", trade['tp2']
             elif current_low <= trade.get('tp1', float('-inf')): outcome, exit_price = "TP1", trade['tp1']
-        
-        if outcome != "OPEN":
-            print(f"TradeManagerService ({self.symbol}): {outcome} hit for {trade['decision']} trade at {exit_price}")
-            self.finalize_trade(trade, outcome, exit_price)
+        return outcome, exit_price
+
+    def _close_trade(self, trade: dict, outcome: str, exit_price: float):
+        # The stream thread and the REST poll can both see the hit; only the first transition out of IN_TRADE wins
+        if not self.state_store.transition(self.symbol, HUNTING, expected_state=IN_TRADE):
+            return
+        print(f"TradeManagerService ({self.symbol}): {outcome} hit for {trade['bias']} trade at {exit_price}")
+        self._stop_streaming()
+        self.finalize_trade(trade, outcome, exit_price)
 
     def finalize_trade(self, trade, outcome, exit_price):
-        message = f"🔔 **Trade Update ({self.symbol})** 🔔\n\nOur **{trade['decision']}** trade has hit **{outcome}** at `{exit_price}`!"
+        if self.journal is not None and trade.get('journal_id') is not None:
+            self.journal.record_exit(trade['journal_id'], outcome, exit_price)
+
+        message = f"🔔 **Trade Update ({self.symbol})** 🔔\n\nOur **{trade['bias']}** trade has hit **{outcome}** at `{exit_price}`!"
         
         try:
             self.telegram_svc.send_text_message(message)
         except Exception as e:
             print(f"TradeManagerService: Failed to send Telegram update: {e}")
-
-        new_status = {"is_trade_open": False, "current_trade": {}}
-        with open(self.status_file, 'w') as f:
-            json.dump(new_status, f, indent=2)
-        print(f"TradeManagerService ({self.symbol}): Trade closed. Bot memory at '{self.status_file}' has been reset.")
\ No newline at end of file
+        print(f"TradeManagerService ({self.symbol}): Trade closed. Strategy is HUNTING again.")
@@ -0,0 +1,234 @@
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import joblib
+import numpy as np
+import pandas as pd
+
+from services.indicator_service import IndicatorService
+from services.labeling import define_target
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+LABEL_PARAMS = {'atr_multiplier_tp': 3.0, 'atr_multiplier_sl': 1.5, 'lookahead_candles': 30}
+
+# The ranges the tuning notebook's grid explored (plus a few neighbours), sampled instead of exhausted
+PARAM_SPACE = {
+    'learning_rate': [0.01, 0.02, 0.05, 0.1],
+    'max_depth': [3, 4, 5, 6],
+    'gamma': [0, 1, 2, 5],
+    'reg_lambda': [1, 5, 10],
+    'subsample': [0.6, 0.7, 0.8, 0.9],
+    'colsample_bytree': [0.6, 0.7, 0.8, 0.9],
+    'min_child_weight': [1, 3, 5],
+}
+
+def model_path_for(symbol: str, models_dir: str = 'models') -> str:
+    """ The file MLService loads for `symbol`. """
+    return os.path.join(models_dir, f"{symbol.replace('/', '_').lower()}_h4.pkl")
+
+def walk_forward_folds(n: int, n_folds: int = 4, min_train_fraction: float = 0.5, gap: int = 0) -> list:
+    """
+    Expanding-window folds over n time-ordered rows: (train_end, test_start, test_end) each.
+    The rows after `min_train_fraction` are cut into `n_folds` consecutive test blocks; the `gap`
+    rows before every block are left out of its training set because their labels look into it.
+    """
+    first_test = int(n * min_train_fraction)
+    edges = np.linspace(first_test, n, n_folds + 1).astype(int)
+    return [(max(0, start - gap), start, end) for start, end in zip(edges[:-1], edges[1:]) if end > start]
+
+def hold_weights(y: np.ndarray) -> np.ndarray:
+    """ Sample weights that give the HOLD class as much total weight as BUY and SELL together (as in the training notebook). """
+    holds = (y == 0).sum()
+    weight_for_hold = (len(y) - holds) / max(holds, 1)
+    return np.where(y == 0, weight_for_hold, 1.0)
+
+# --- Worker side of the search (runs in the process pool) ---
+
+_worker_data = None
+
+def _init_worker(X: np.ndarray, y: np.ndarray, folds: list, n_threads: int):
+    global _worker_data
+    _worker_data = {'X': X, 'y': y, 'folds': folds, 'n_threads': n_threads}
+
+def _fit(params: dict, n_estimators: int, X_train, y_train, X_eval=None, y_eval=None, early_stopping_rounds: int | None = None, n_threads: int = 1):
+    import xgboost as xgb
+    model = xgb.XGBClassifier(objective='multi:softprob', eval_metric='mlogloss', n_estimators=n_estimators,
+                              early_stopping_rounds=early_stopping_rounds if X_eval is not None else None,
+                              tree_method='hist', n_jobs=n_threads, random_state=0, **params)
+    eval_set = [(X_eval, y_eval)] if X_eval is not None else None
+    model.fit(X_train, y_train, sample_weight=hold_weights(y_train), eval_set=eval_set, verbose=False)
+    return model
+
+def _evaluate_fold(params: dict, n_estimators: int, fold: int, early_stopping_rounds: int) -> tuple:
+    """ Trains on one walk-forward fold; returns (weighted F1 on its test block, boosting rounds used). """
+    from sklearn.metrics import f1_score
+    data = _worker_data
+    train_end, test_start, test_end = data['folds'][fold]
+    X, y = data['X'], data['y']
+    model = _fit(params, n_estimators, X[:train_end], y[:train_end], X[test_start:test_end], y[test_start:test_end],
+                 early_stopping_rounds, data['n_threads'])
+    predictions = model.predict(X[test_start:test_end])
+    rounds = (model.best_iteration + 1) if getattr(model, 'best_iteration', None) is not None else n_estimators
+    return f1_score(y[test_start:test_end], predictions, average='weighted', zero_division=0), rounds
+
+class TrainingService:
+    """
+    Scripted replacement for the feature / labeling / tuning / training notebooks.
+
+    Features come from the production IndicatorService on 4h candles, labels from define_target.
+    Hyperparameters are searched with successive halving over walk-forward folds: many sampled
+    configurations get a small boosting budget, and only the best third moves on to three times
+    the budget. Every (configuration, fold) fit runs in a process pool with early stopping.
+    The winner is scored on a final holdout, refit on all rows and saved as a versioned artifact
+    that MLService / ModelRegistry load directly.
+    """
+    def __init__(self, indicator_svc: IndicatorService | None = None, workers: int | None = None, n_configs: int = 27,
+                 n_folds: int = 4, holdout_fraction: float = 0.2, min_rounds: int = 50, max_rounds: int = 1350, eta: int = 3,
+                 early_stopping_rounds: int = 50, label_params: dict | None = None, seed: int = 42, feature_cache=None):
+        self.indicator_svc = indicator_svc or IndicatorService()
+        self.workers = workers or os.cpu_count() or 1
+        self.n_configs = n_configs
+        self.n_folds = n_folds
+        self.holdout_fraction = holdout_fraction
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.eta = eta
+        self.early_stopping_rounds = early_stopping_rounds
+        self.label_params = dict(LABEL_PARAMS, **(label_params or {}))
+        self.seed = seed
+        self.feature_cache = feature_cache # Optional FeatureCache shared with the backtester
+
+    def build_dataset(self, df_h4: pd.DataFrame, symbol: str | None = None) -> tuple:
+        """
+        (X, y) from closed 4h candles: the production features and define_target labels (-1/0/1).
+        The last `lookahead_candles` rows are dropped since their outcome is not known yet.
+        """
+        if self.feature_cache is not None and symbol is not None:
+            features = self.feature_cache.get(symbol, '4h', df_h4, self.indicator_svc)
+        else:
+            features = self.indicator_svc.add_all_indicators(df_h4.copy())
+        if features is None or features.empty:
+            raise ValueError("No feature rows left after the indicators were added.")
+        y = define_target(features, **self.label_params)
+        lookahead = self.label_params['lookahead_candles']
+        X = features.drop(columns=OHLCV_COLUMNS).iloc[:-lookahead]
+        return X, y.iloc[:-lookahead]
+
+    def sample_configs(self) -> list:
+        """ `n_configs` distinct combinations drawn from PARAM_SPACE. """
+        shape = [len(values) for values in PARAM_SPACE.values()]
+        rng = np.random.default_rng(self.seed)
+        picks = rng.choice(int(np.prod(shape)), size=min(self.n_configs, int(np.prod(shape))), replace=False)
+        return [{name: values[i] for (name, values), i in zip(PARAM_SPACE.items(), np.unravel_index(pick, shape))}
+                for pick in picks]
+
+    def search(self, X: np.ndarray, y: np.ndarray, folds: list) -> dict:
+        """ Successive halving over sampled configurations. Returns the best params, boosting rounds and the leaderboard. """
+        n_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        context = multiprocessing.get_context('spawn') # xgboost's OpenMP runtime does not survive fork()
+        configs = self.sample_configs()
+        budget = self.min_rounds
+        leaderboard = []
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker, initargs=(X, y, folds, n_threads)) as pool:
+            while True:
+                started = time.perf_counter()
+                futures = [[pool.submit(_evaluate_fold, config, budget, fold, self.early_stopping_rounds) for fold in range(len(folds))]
+                           for config in configs]
+                results = []
+                for config, config_futures in zip(configs, futures):
+                    scores, rounds = zip(*(f.result() for f in config_futures))
+                    results.append({'params': config, 'budget': budget, 'score': float(np.mean(scores)),
+                                    'fold_scores': [float(s) for s in scores], 'rounds': int(np.median(rounds))})
+                results.sort(key=lambda r: r['score'], reverse=True)
+                leaderboard.extend(results)
+                print(f"TrainingService: Rung with {len(configs)} configs x {len(folds)} folds at {budget} rounds took "
+                      f"{time.perf_counter() - started:.1f}s (best weighted F1 {results[0]['score']:.4f}).")
+
+                if len(results) == 1 or budget >= self.max_rounds:
+                    break
+                configs = [r['params'] for r in results[:max(1, len(results) // self.eta)]]
+                budget = min(self.max_rounds, budget * self.eta)
+
+        best = results[0]
+        return {'params': best['params'], 'n_estimators': best['rounds'], 'cv_score': best['score'],
+                'fold_scores': best['fold_scores'], 'leaderboard': leaderboard}
+
+    def train(self, symbol: str, df_h4: pd.DataFrame) -> tuple:
+        """ Runs the whole pipeline on closed 4h candles. Returns (model fitted on every labeled row, metadata). """
+        from sklearn.metrics import classification_report
+        started = time.perf_counter()
+        X_frame, y_labels = self.build_dataset(df_h4, symbol)
+        X = X_frame.to_numpy(dtype=np.float32)
+        y = y_labels.replace({-1: 2}).to_numpy() # Model classes: 0 = HOLD, 1 = BUY, 2 = SELL
+        gap = self.label_params['lookahead_candles']
+
+        holdout_start = int(len(X) * (1 - self.holdout_fraction))
+        search_end = holdout_start - gap
+        folds = walk_forward_folds(search_end, self.n_folds, gap=gap)
+        print(f"TrainingService ({symbol}): {len(X)} labeled rows, {len(X_frame.columns)} features, "
+              f"{len(folds)} walk-forward folds, holdout from {X_frame.index[holdout_start]}.")
+
+        result = self.search(X[:search_end], y[:search_end], folds)
+        print(f"TrainingService ({symbol}): Best params {result['params']} with {result['n_estimators']} rounds "
+              f"(walk-forward weighted F1 {result['cv_score']:.4f}).")
+
+        # Holdout: never seen by the search
+        holdout_model = _fit(result['params'], result['n_estimators'], X_frame.iloc[:search_end], y[:search_end], n_threads=os.cpu_count() or 1)
+        holdout_report = classification_report(y[holdout_start:], holdout_model.predict(X_frame.iloc[holdout_start:]),
+                                               labels=[0, 1, 2], target_names=['HOLD', 'BUY', 'SELL'], output_dict=True, zero_division=0)
+        print(f"TrainingService ({symbol}): Holdout weighted F1 {holdout_report['weighted avg']['f1-score']:.4f}, "
+              f"accuracy {holdout_report['accuracy']:.4f}.")
+
+        model = _fit(result['params'], result['n_estimators'], X_frame, y, n_threads=os.cpu_count() or 1)
+        import xgboost as xgb
+        metadata = {
+            'symbol': symbol,
+            'timeframe': '4h',
+            'trained_at': datetime.now(timezone.utc).isoformat(),
+            'data_start': str(X_frame.index[0]),
+            'data_end': str(X_frame.index[-1]),
+            'rows': len(X_frame),
+            'features': list(X_frame.columns),
+            'label_params': self.label_params,
+            'class_counts': {label: int((y_labels == value).sum()) for label, value in (('HOLD', 0), ('BUY', 1), ('SELL', -1))},
+            'params': result['params'],
+            'n_estimators': result['n_estimators'],
+            'cv_score': result['cv_score'],
+            'fold_scores': result['fold_scores'],
+            'holdout_report': holdout_report,
+            'search': {'configs': self.n_configs, 'folds': len(folds), 'eta': self.eta, 'min_rounds': self.min_rounds,
+                       'max_rounds': self.max_rounds, 'fits': len(result['leaderboard']) * len(folds)},
+            'xgboost_version': xgb.__version__,
+            'training_seconds': round(time.perf_counter() - started, 1),
+        }
+        return model, metadata
+
+    @staticmethod
+    def save(model, metadata: dict, model_path: str, promote: bool = True) -> str:
+        """
+        Writes the model and its metadata to <models dir>/versions/<name>_<UTC timestamp>.pkl/.json.
+        With `promote`, the version is also copied over `model_path` (atomically), where the
+        ModelRegistry picks it up on the next prediction. Returns the versioned model path.
+        """
+        models_dir, file_name = os.path.split(model_path)
+        versions_dir = os.path.join(models_dir, 'versions')
+        os.makedirs(versions_dir, exist_ok=True)
+        version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        base_name = os.path.splitext(file_name)[0]
+        version_path = os.path.join(versions_dir, f"{base_name}_{version}.pkl")
+
+        joblib.dump(model, version_path)
+        with open(os.path.join(versions_dir, f"{base_name}_{version}.json"), 'w') as f:
+            json.dump(dict(metadata, version=version), f, indent=2, default=str)
+        print(f"TrainingService: Saved model version '{version_path}'.")
+
+        if promote:
+            tmp_path = f"{model_path}.tmp"
+            shutil.copyfile(version_path, tmp_path)
+            os.replace(tmp_path, model_path)
+            print(f"TrainingService: Promoted '{version_path}' to '{model_path}'.")
+        return version_path
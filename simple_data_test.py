@@ -1,14 +1,14 @@
 # simple_data_test.py
 
-import ccxt
 from datetime import datetime
 
+from services import exchange_pool
+
 print("--- Starting Simple CCXT Coinbase Data Test ---")
 
 # 1. Initialize the exchange
 try:
-    exchange = ccxt.coinbaseadvanced()
-    exchange.load_markets()
+    exchange = exchange_pool.get_exchange('coinbaseadvanced')
     print("SUCCESS: Exchange initialized successfully.")
 except Exception as e:
     print(f"FATAL: Could not initialize exchange. Error: {e}")
@@ -24,6 +24,7 @@ print(f"\nAttempting to fetch the last {limit} '{timeframe}' candles for '{symbo
 # 3. Make the API call
 try:
     # This is the raw API call. We will inspect its direct output.
+    exchange_pool.get_rate_limiter(exchange.id).acquire()
     raw_ohlcv_data = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
 
     # 4. Analyze the raw response
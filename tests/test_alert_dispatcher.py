@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.alert_dispatcher import AlertDispatcher
+
+class StubTelegram:
+    """ Local stand-in for the Bot API: answers sendMessage with scripted (status, body, delay) replies, then 200. """
+    def __init__(self):
+        self.replies = []
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub.lock:
+                    stub.requests.append((self.path, payload))
+                    status, body, delay = stub.replies.pop(0) if stub.replies else (200, {"ok": True}, 0)
+                time.sleep(delay)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reply(self, status: int, body: dict | None = None, delay: float = 0.0, times: int = 1):
+        with self.lock:
+            self.replies += [(status, body or {"ok": False, "description": f"stub {status}"}, delay)] * times
+
+    def texts(self) -> list:
+        with self.lock:
+            return [payload['text'] for _, payload in self.requests]
+
+@pytest.fixture
+def telegram():
+    stub = StubTelegram()
+    yield stub
+    stub.server.shutdown()
+
+@pytest.fixture
+def make_dispatcher(telegram, tmp_path):
+    dispatchers = []
+    def make(**kwargs):
+        options = dict(base_url=telegram.url, spill_path=str(tmp_path / 'spill.jsonl'), max_retries=2, base_backoff=0.05,
+                       coalesce_window=0.05, per_chat_rate=100.0, request_timeout=10.0)
+        dispatcher = AlertDispatcher('TOKEN', **dict(options, **kwargs))
+        dispatchers.append(dispatcher)
+        dispatcher.start()
+        return dispatcher
+    yield make
+    for dispatcher in dispatchers:
+        dispatcher.stop(timeout=1.0)
+
+def spilled(tmp_path) -> list:
+    path = tmp_path / 'spill.jsonl'
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_delivers_with_200(telegram, make_dispatcher, tmp_path):
+    dispatcher = make_dispatcher()
+    dispatcher.enqueue(42, "*hello*")
+    dispatcher.stop()
+    assert telegram.requests == [('/botTOKEN/sendMessage', {"chat_id": 42, "text": "*hello*", "parse_mode": "Markdown"})]
+    assert spilled(tmp_path) == []
+
+def test_coalesces_messages_for_one_chat(telegram, make_dispatcher):
+    dispatcher = make_dispatcher(coalesce_window=0.3)
+    for text in ("one", "two", "three"):
+        dispatcher.enqueue(42, text)
+    dispatcher.stop()
+    assert telegram.texts() == ["one\n\ntwo\n\nthree"]
+
+def test_429_waits_retry_after(telegram, make_dispatcher, tmp_path):
+    telegram.reply(429, {"ok": False, "description": "Too Many Requests", "parameters": {"retry_after": 0.3}})
+    dispatcher = make_dispatcher()
+    started = time.monotonic()
+    dispatcher.enqueue(42, "rate limited")
+    wait_for(lambda: len(telegram.requests) == 2)
+    assert time.monotonic() - started >= 0.3
+    dispatcher.stop()
+    assert telegram.texts() == ["rate limited", "rate limited"]
+    assert spilled(tmp_path) == []
+
+def test_5xx_is_retried(telegram, make_dispatcher, tmp_path):
+    telegram.reply(502, times=2)
+    dispatcher = make_dispatcher()
+    dispatcher.enqueue(42, "flaky")
+    wait_for(lambda: len(telegram.requests) == 3)
+    dispatcher.stop()
+    assert spilled(tmp_path) == []
+
+def test_outage_spills_and_restart_reloads(telegram, make_dispatcher, tmp_path):
+    telegram.reply(503, times=3) # max_retries=2: three attempts
+    dispatcher = make_dispatcher()
+    dispatcher.enqueue(42, "during outage")
+    wait_for(lambda: spilled(tmp_path))
+    dispatcher.stop()
+    [record] = spilled(tmp_path)
+    assert record['text'] == "during outage" and record['status'] == 503
+
+    make_dispatcher().stop()
+    assert telegram.texts()[-1] == "during outage"
+    assert spilled(tmp_path) == []
+
+def test_permanent_rejection_is_not_reloaded(telegram, make_dispatcher, tmp_path):
+    telegram.reply(403, {"ok": False, "description": "Forbidden: bot was blocked by the user"})
+    dispatcher = make_dispatcher()
+    dispatcher.enqueue(42, "blocked", parse_mode=None)
+    wait_for(lambda: spilled(tmp_path))
+    dispatcher.stop()
+    assert len(telegram.requests) == 1
+
+    make_dispatcher().stop()
+    assert len(telegram.requests) == 1
+    [record] = spilled(tmp_path)
+    assert record['text'] == "blocked" and record['status'] == 403
+
+def test_stop_spills_the_message_being_sent(telegram, make_dispatcher, tmp_path):
+    telegram.reply(200, {"ok": True}, delay=3.0) # Slower than stop() waits
+    dispatcher = make_dispatcher()
+    dispatcher.enqueue(42, "in flight")
+    wait_for(lambda: telegram.requests)
+    started = time.monotonic()
+    dispatcher.stop(timeout=0.2)
+    assert time.monotonic() - started < 2.5
+    [record] = spilled(tmp_path)
+    assert record['text'] == "in flight" and record['status'] is None
+
+def test_stop_interrupts_backoff(telegram, make_dispatcher, tmp_path):
+    telegram.reply(500, times=10)
+    dispatcher = make_dispatcher(base_backoff=30.0, max_backoff=30.0)
+    dispatcher.enqueue(42, "backing off")
+    wait_for(lambda: telegram.requests)
+    started = time.monotonic()
+    dispatcher.stop(timeout=0.2)
+    assert time.monotonic() - started < 2.0
+    [record] = spilled(tmp_path)
+    assert record['text'] == "backing off" and record['status'] == 500
@@ -0,0 +1,83 @@
+import os
+import threading
+import numpy as np
+import pytest
+
+from benchmarks.fixtures import synthetic_ohlcv
+from services import candle_store
+from services.candle_store import CandleStore
+
+def candle_rows(n: int, seed: int = 0) -> np.ndarray:
+    df = synthetic_ohlcv(n, '1h', seed=seed)
+    return np.column_stack([df.index.asi8 // 1_000_000, df[['open', 'high', 'low', 'close', 'volume']].to_numpy()]).astype(np.float64)
+
+def full_merge(existing: np.ndarray, new_rows: np.ndarray) -> np.ndarray:
+    """ The original append: re-sort everything and keep the last row of every timestamp. """
+    combined = np.vstack([existing, new_rows])
+    combined = combined[np.argsort(combined[:, 0], kind='stable')]
+    return combined[np.append(combined[1:, 0] != combined[:-1, 0], True)]
+
+@pytest.fixture
+def store(tmp_path):
+    return CandleStore(str(tmp_path))
+
+def test_append_matches_full_merge(store):
+    rows = candle_rows(3000)
+    refetched = rows[1999:2000].copy()
+    refetched[:, 1:] += 1.0
+    batches = [rows[1000:2000],    # First sync
+               rows[2000:2500],    # Strictly after the stored candles
+               np.vstack([refetched, rows[2500:2600]]), # The forming candle again, plus new ones
+               rows[2550:2700],    # Overlapping tail
+               rows[1500:1510] * [1, 2, 2, 2, 2, 2], # Inside the stored range
+               rows[:1000],        # Before the first stored candle (full rewrite)
+               rows[2700:2701],
+               rows[:0]]
+    expected = np.empty((0, 6))
+    for batch in batches:
+        expected = full_merge(expected, batch)
+        assert store.append('BTC/USD', '1h', batch) == len(expected)
+        np.testing.assert_array_equal(store.load('BTC/USD', '1h'), expected)
+        np.testing.assert_array_equal(np.load(store._path('BTC/USD', '1h')), expected)
+    assert os.listdir(store.root_dir) == ['btc_usd_1h.npy']
+
+def test_tail_append_does_not_rewrite_the_file(store, monkeypatch):
+    rows = candle_rows(500)
+    store.append('BTC/USD', '1h', rows[:400])
+    monkeypatch.setattr(candle_store.tempfile, 'NamedTemporaryFile', None) # A full rewrite would fail
+    assert store.append('BTC/USD', '1h', rows[399:]) == 500
+    assert store.first_timestamp('BTC/USD', '1h') == rows[0, 0] and store.last_timestamp('BTC/USD', '1h') == rows[-1, 0]
+    np.testing.assert_array_equal(store.load('BTC/USD', '1h'), rows)
+
+def test_header_that_cannot_grow_falls_back_to_a_rewrite(store):
+    rows = candle_rows(300)
+    path = store._path('BTC/USD', '1h')
+    with open(path, 'wb') as f:
+        np.lib.format.write_array(f, rows[:200], version=(2, 0))
+    assert store.append('BTC/USD', '1h', rows[150:]) == 300
+    np.testing.assert_array_equal(np.load(path), rows)
+    assert os.listdir(store.root_dir) == ['btc_usd_1h.npy']
+
+def test_concurrent_appends_to_the_same_file(tmp_path):
+    rows = candle_rows(2000)
+    chunks = np.array_split(rows, 40)
+    stores = [CandleStore(str(tmp_path)) for _ in range(4)] # Separate instances share the per-file lock
+    barrier = threading.Barrier(len(stores))
+    errors = []
+
+    def writer(worker: int):
+        barrier.wait()
+        try:
+            for chunk in chunks[worker::len(stores)]:
+                stores[worker].append('ETH/USD', '1h', chunk)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(len(stores))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    np.testing.assert_array_equal(stores[0].load('ETH/USD', '1h'), rows)
+    assert os.listdir(str(tmp_path)) == ['eth_usd_1h.npy']
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fixtures import synthetic_ohlcv
+from services.incremental_indicators import FEATURE_COLUMNS, OUTPUT_COLUMNS, IncrementalIndicatorEngine
+from services.indicator_service import IndicatorService
+
+def candles(n: int, seed: int = 0) -> pd.DataFrame:
+    df = synthetic_ohlcv(n, '4h', seed=seed)
+    df.index.name = None
+    return df
+
+def assert_features_equal(actual: pd.DataFrame, expected: pd.DataFrame):
+    """ Same rows and columns; values equal up to floating-point summation order. """
+    assert list(actual.index) == list(expected.index)
+    for column in OUTPUT_COLUMNS:
+        np.testing.assert_allclose(actual[column].to_numpy(dtype=np.float64), expected[column].to_numpy(dtype=np.float64),
+                                   rtol=1e-9, atol=1e-9, err_msg=column)
+
+@pytest.fixture
+def indicator_svc():
+    return IndicatorService()
+
+@pytest.fixture
+def pandas_ta():
+    return pytest.importorskip('pandas_ta')
+
+def test_streaming_matches_full_recompute(indicator_svc, pandas_ta):
+    df = candles(900)
+    full = indicator_svc.add_all_indicators(df.copy())
+    streamed = indicator_svc.add_all_indicators(df, symbol='BTC/USD')
+    assert list(full.columns[:len(OUTPUT_COLUMNS)]) == OUTPUT_COLUMNS
+    # The engine keeps a bounded history: the newest rows of the full frame
+    assert_features_equal(streamed, full.iloc[-len(streamed):])
+
+def test_streaming_follows_a_sliding_window(indicator_svc, pandas_ta):
+    df = candles(900, seed=1)
+    window = 600
+    indicator_svc.add_all_indicators(df.iloc[:window], symbol='BTC/USD')
+    for end in range(window + 1, window + 40):
+        frame = df.iloc[end - window:end]
+        streamed = indicator_svc.add_all_indicators(frame, symbol='BTC/USD')
+        full = indicator_svc.add_all_indicators(frame.copy())
+        assert streamed.index[-1] == full.index[-1]
+        assert_features_equal(streamed.iloc[-100:], full.iloc[-100:])
+
+def test_provisional_last_candle_is_not_committed(indicator_svc, pandas_ta):
+    df = candles(700, seed=2)
+    forming = df.copy()
+    forming.iloc[-1, forming.columns.get_loc('close')] *= 1.03
+    forming.iloc[-1, forming.columns.get_loc('high')] = forming['close'].iloc[-1] * 1.001
+
+    indicator_svc.add_all_indicators(forming, symbol='BTC/USD')
+    # The same candle comes back with its final values
+    streamed = indicator_svc.add_all_indicators(df, symbol='BTC/USD')
+    assert_features_equal(streamed, indicator_svc.add_all_indicators(df.copy()).iloc[-len(streamed):])
+
+def test_batch_matches_full_recompute(indicator_svc, pandas_ta):
+    frames = {'A/USD': candles(900, seed=3), 'B/USD': candles(350, seed=4), 'C/USD': candles(60, seed=5)}
+    frames['B/USD'].iloc[100, frames['B/USD'].columns.get_loc('high')] = frames['B/USD']['low'].iloc[100] # Zero-range candle
+    batch = indicator_svc.add_all_indicators_batch(frames)
+    for symbol, df in frames.items():
+        full = indicator_svc.add_all_indicators(df.copy())
+        assert list(batch[symbol].columns) == list(full.columns)
+        assert_features_equal(batch[symbol], full)
+
+def test_batch_matches_streaming_engine(indicator_svc):
+    frames = {'A/USD': candles(900, seed=6), 'B/USD': candles(500, seed=7), 'C/USD': candles(300, seed=8)}
+    batch = indicator_svc.add_all_indicators_batch(frames)
+    for symbol, df in frames.items():
+        streamed = indicator_svc.add_all_indicators(df, symbol=symbol)
+        assert list(batch[symbol].columns) == OUTPUT_COLUMNS
+        assert len(streamed) > 0
+        assert_features_equal(batch[symbol].iloc[-len(streamed):], streamed)
+        for column in ('SQZ_ON', 'SQZ_OFF', 'SQZ_NO'):
+            assert batch[symbol][column].dtype.kind == 'i'
+
+def test_batch_skips_empty_and_too_short_histories(indicator_svc):
+    batch = indicator_svc.add_all_indicators_batch({'A/USD': candles(400), 'B/USD': candles(0), 'C/USD': None, 'D/USD': candles(50)})
+    assert set(batch) == {'A/USD', 'D/USD'}
+    assert batch['D/USD'].empty
+    assert list(batch['A/USD'].columns) == OUTPUT_COLUMNS
+    assert not batch['A/USD'][FEATURE_COLUMNS].isna().any().any()
+
+def test_flat_candles_give_nan_instead_of_raising(indicator_svc):
+    flat = candles(300)
+    flat[['open', 'high', 'low', 'close']] = 30000.0
+    # RSI and DMP/DMN are 0/0 here; like pandas, those rows are NaN and dropped
+    assert indicator_svc.add_all_indicators(flat, symbol='FLAT/USD').empty
+    assert indicator_svc.add_all_indicators_batch({'FLAT/USD': flat})['FLAT/USD'].empty
+
+    df = candles(900, seed=9)
+    df.iloc[300:360, :4] = df['close'].iloc[299]
+    streamed = indicator_svc.add_all_indicators(df, symbol='MIX/USD')
+    batch = indicator_svc.add_all_indicators_batch({'MIX/USD': df})['MIX/USD']
+    after_flat = streamed.index[streamed.index > df.index[600]]
+    assert len(after_flat) > 0
+    assert_features_equal(streamed.loc[after_flat], batch.loc[after_flat])
+
+def test_peek_leaves_the_engine_unchanged(indicator_svc):
+    df = candles(700, seed=10)
+    engine = IncrementalIndicatorEngine()
+    for row in df.iloc[:-1].itertuples():
+        engine.update(row.Index, row.open, row.high, row.low, row.close, row.volume)
+    before = engine.to_frame()
+    last = df.iloc[-1]
+    first = engine.peek(df.index[-1], last['open'], last['high'] * 1.02, last['low'], last['close'] * 1.01, last['volume'])
+    again = engine.peek(df.index[-1], last['open'], last['high'] * 1.02, last['low'], last['close'] * 1.01, last['volume'])
+    assert first == again
+    pd.testing.assert_frame_equal(engine.to_frame(), before)
+
+    committed = engine.update(df.index[-1], last['open'], last['high'], last['low'], last['close'], last['volume'])
+    peeked = IncrementalIndicatorEngine()
+    for row in df.iloc[:-1].itertuples():
+        peeked.update(row.Index, row.open, row.high, row.low, row.close, row.volume)
+    assert peeked.peek(df.index[-1], last['open'], last['high'], last['low'], last['close'], last['volume']) == committed
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fixtures import synthetic_ohlcv
+from services.labeling import define_target, triple_barrier_labels
+
+def define_target_reference(df: pd.DataFrame, atr_multiplier_tp: float = 3.0, atr_multiplier_sl: float = 1.5, lookahead_candles: int = 30) -> pd.Series:
+    """ Candle-by-candle port of the Target_Labeling notebooks' define_target loop. """
+    atr_column = next((col for col in df.columns if 'ATRr_' in col), None)
+    if not atr_column:
+        raise ValueError("ATR column not found in DataFrame.")
+    closes, atrs = df['close'].to_numpy(), df[atr_column].to_numpy()
+    highs, lows = df['high'].to_numpy(), df['low'].to_numpy()
+
+    target = np.zeros(len(df), dtype=np.int64)
+    for i in range(len(df) - lookahead_candles):
+        future_highs = highs[i + 1:i + 1 + lookahead_candles]
+        future_lows = lows[i + 1:i + 1 + lookahead_candles]
+
+        buy_tp = np.flatnonzero(future_highs >= closes[i] + atrs[i] * atr_multiplier_tp)
+        buy_sl = np.flatnonzero(future_lows <= closes[i] - atrs[i] * atr_multiplier_sl)
+        if len(buy_tp) and (not len(buy_sl) or buy_tp[0] < buy_sl[0]):
+            target[i] = 1
+            continue
+
+        sell_tp = np.flatnonzero(future_lows <= closes[i] - atrs[i] * atr_multiplier_tp)
+        sell_sl = np.flatnonzero(future_highs >= closes[i] + atrs[i] * atr_multiplier_sl)
+        if len(sell_tp) and (not len(sell_sl) or sell_tp[0] < sell_sl[0]):
+            target[i] = -1
+    return pd.Series(target, index=df.index, name='target')
+
+def labeling_frame(n: int, seed: int) -> pd.DataFrame:
+    """ Synthetic 4h OHLC with a rolling-range ATR, NaN for the first 13 rows and a few holes. """
+    df = synthetic_ohlcv(n, '4h', seed=seed)
+    df['ATRr_14'] = (df['high'] - df['low']).rolling(14).mean()
+    df.iloc[[200, 201, 555], df.columns.get_loc('ATRr_14')] = np.nan
+    return df
+
+PARAMS = [
+    {},
+    {'atr_multiplier_tp': 2.0, 'atr_multiplier_sl': 2.0, 'lookahead_candles': 12},
+    {'atr_multiplier_tp': 1.0, 'atr_multiplier_sl': 0.5, 'lookahead_candles': 48},
+]
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('params', PARAMS)
+def test_define_target_matches_notebook_loop(seed, params):
+    df = labeling_frame(1500, seed)
+    expected = define_target_reference(df, **params)
+    labels = define_target(df, **params)
+    pd.testing.assert_series_equal(labels, expected)
+    assert set(np.unique(labels)) == {-1, 0, 1}
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1000, 100_000])
+def test_chunk_size_does_not_change_labels(chunk_size):
+    df = labeling_frame(1500, 7)
+    expected = define_target_reference(df).to_numpy()
+    labels = triple_barrier_labels(df['close'], df['high'], df['low'], df['ATRr_14'], chunk_size=chunk_size)
+    np.testing.assert_array_equal(labels, expected)
+
+def test_nan_atr_rows_and_last_window_are_hold():
+    df = labeling_frame(600, 3)
+    labels = define_target(df)
+    assert (labels[df['ATRr_14'].isna()] == 0).all()
+    assert (labels.iloc[-30:] == 0).all()
+
+def test_frame_shorter_than_lookahead_is_all_hold():
+    df = labeling_frame(600, 3).iloc[:20]
+    assert (define_target(df) == 0).all()
+    pd.testing.assert_series_equal(define_target(df), define_target_reference(df))
+
+def test_missing_atr_column_raises():
+    with pytest.raises(ValueError):
+        define_target(synthetic_ohlcv(50, '4h'))
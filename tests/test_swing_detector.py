@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import find_peaks
+
+from benchmarks.fixtures import synthetic_ohlcv
+from services.swing_detector import SwingDetector
+
+WINDOW = 300
+
+def h1_candles(n: int, seed: int, tick: float = 0.0) -> pd.DataFrame:
+    """ Synthetic H1 candles; with `tick`, highs and lows are rounded to it, giving plateaus and equal-height swings. """
+    df = synthetic_ohlcv(n, '1h', seed=seed)
+    if tick:
+        df['high'] = np.ceil(df['high'] / tick) * tick
+        df['low'] = np.floor(df['low'] / tick) * tick
+    return df
+
+def prominence_of(frame: pd.DataFrame) -> float:
+    """ V2's prominence: the mean ATR-like range of the window. """
+    return (frame['high'] - frame['low']).rolling(14).mean().mean()
+
+def reference_swings(frame: pd.DataFrame, prominence: float) -> tuple:
+    peaks, _ = find_peaks(frame['high'], distance=5, prominence=prominence)
+    troughs, _ = find_peaks(-frame['low'], distance=5, prominence=prominence)
+    return frame.index[peaks], frame.index[troughs]
+
+def swing_columns(frame: pd.DataFrame, peaks, troughs) -> pd.DataFrame:
+    df = frame.copy()
+    df['swing_high'] = np.nan; df.loc[peaks, 'swing_high'] = df.loc[peaks, 'high']
+    df['swing_low'] = np.nan; df.loc[troughs, 'swing_low'] = df.loc[troughs, 'low']
+    return df
+
+def reference_pair(df: pd.DataFrame, trend: str, current_time) -> dict | None:
+    """ V2's previous lookup over the swing_high/swing_low columns, with boolean masks. """
+    h1_check = df[df.index < current_time]
+    last_highs = h1_check[h1_check['swing_high'].notna()]; last_lows = h1_check[h1_check['swing_low'].notna()]
+    if last_highs.empty or last_lows.empty:
+        return None
+    if trend == "up":
+        high_time = last_highs.index[-1]
+        relevant = last_lows[last_lows.index < high_time]
+        if relevant.empty:
+            return None
+        low_time = relevant.index[-1]
+    else:
+        low_time = last_lows.index[-1]
+        relevant = last_highs[last_highs.index < low_time]
+        if relevant.empty:
+            return None
+        high_time = relevant.index[-1]
+    return {"swing_high": h1_check['swing_high'].loc[high_time], "swing_low": h1_check['swing_low'].loc[low_time],
+            "high_time": high_time, "low_time": low_time}
+
+def check_window(detector: SwingDetector, frame: pd.DataFrame):
+    """ frame: the live window, last row still forming. """
+    provisional = detector.sync(frame)
+    prominence = prominence_of(frame)
+    highs, lows = detector.swing_points(prominence, window_start=frame.index[0], provisional=provisional)
+    expected_highs, expected_lows = reference_swings(frame, prominence)
+    np.testing.assert_array_equal(highs, expected_highs.values)
+    np.testing.assert_array_equal(lows, expected_lows.values)
+    df = swing_columns(frame, expected_highs, expected_lows)
+    for trend in ("up", "down"):
+        for current_time in (frame.index[-1], frame.index[-1] + pd.Timedelta(hours=1), frame.index[-40]):
+            pair = detector.last_swing_pair(trend, prominence, window_start=frame.index[0], lookup_start=frame.index[0],
+                                            lookup_end=current_time, provisional=provisional)
+            assert pair == reference_pair(df, trend, current_time)
+
+@pytest.mark.parametrize('seed,tick', [(0, 0.0), (1, 0.0), (2, 25.0), (3, 50.0)])
+def test_sliding_window_matches_find_peaks(seed, tick):
+    df = h1_candles(WINDOW + 150, seed, tick)
+    detector = SwingDetector(distance=5)
+    for end in range(WINDOW, len(df) + 1):
+        check_window(detector, df.iloc[end - WINDOW:end])
+
+def test_equal_height_ties_are_resolved_like_scipy():
+    df = h1_candles(WINDOW + 100, 4, tick=100.0)
+    highs = df['high'].to_numpy()
+    # Several swings of exactly the same height, closer together than the distance rule allows
+    assert len(highs) != len(np.unique(highs))
+    detector = SwingDetector(distance=5)
+    for end in range(WINDOW, len(df) + 1, 3):
+        check_window(detector, df.iloc[end - WINDOW:end])
+
+def test_history_trimming_and_rebuild():
+    df = h1_candles(1200, 5, tick=25.0)
+    detector = SwingDetector(distance=5, max_history=WINDOW + 20)
+    # The stored history is trimmed several times while the window slides
+    for end in range(WINDOW, len(df) + 1, 7):
+        check_window(detector, df.iloc[end - WINDOW:end])
+    assert detector.size <= 2 * detector.max_history
+
+    # A gap in the candles and a window longer than max_history both force a rebuild
+    check_window(detector, df.drop(df.index[-50]).iloc[-WINDOW:])
+    check_window(detector, df.iloc[-(WINDOW + 100):])
+    check_window(detector, df.iloc[-WINDOW:])
+
+def test_forming_candle_is_not_committed():
+    df = h1_candles(WINDOW + 1, 6)
+    detector = SwingDetector(distance=5)
+    forming = df.copy()
+    forming.iloc[-1, forming.columns.get_loc('high')] *= 1.05
+    check_window(detector, forming)
+    check_window(detector, df)
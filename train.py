@@ -0,0 +1,35 @@
+# train.py - Rebuilds the models in models/ from the local candle store (replaces the training notebooks)
+
+import argparse
+import configparser
+
+from services.data_service import DataService
+from services.training_service import TrainingService, model_path_for
+from services.feature_cache import FeatureCache
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Walk-forward training and hyperparameter search for the H4 models.")
+    parser.add_argument('--start', default='2018-01-01', help="First date of 4h history to train on (YYYY-MM-DD).")
+    parser.add_argument('--symbols', default=None, help="Comma separated symbols. Defaults to config.ini [parameters] symbols.")
+    parser.add_argument('--workers', type=int, default=None, help="Search processes (default: one per CPU).")
+    parser.add_argument('--configs', type=int, default=27, help="Hyperparameter combinations sampled for the first rung.")
+    parser.add_argument('--folds', type=int, default=4, help="Walk-forward folds.")
+    parser.add_argument('--models-dir', default='models', help="Where models/<symbol>_h4.pkl and models/versions/ live.")
+    parser.add_argument('--no-promote', action='store_true', help="Only write the versioned artifact; leave the live model untouched.")
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    symbols = [s.strip() for s in (args.symbols or config['parameters']['symbols']).split(',')]
+
+    data_svc = DataService()
+    training_svc = TrainingService(workers=args.workers, n_configs=args.configs, n_folds=args.folds, feature_cache=FeatureCache())
+    for symbol in symbols:
+        df_h4 = data_svc.get_all_historical_data(symbol, '4h', args.start)
+        if df_h4 is None or df_h4.empty:
+            print(f"Train: No history for {symbol}. Skipping.")
+            continue
+        # The newest 4h candle may still be forming
+        model, metadata = training_svc.train(symbol, df_h4.iloc[:-1])
+        training_svc.save(model, metadata, model_path_for(symbol, args.models_dir), promote=not args.no_promote)
+        print(f"Train: {symbol} done in {metadata['training_seconds']}s.")